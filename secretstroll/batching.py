@@ -0,0 +1,116 @@
+"""
+Batching of the signature checks of concurrent requests on the server.
+
+Requests handled by different threads submit their item to a `RequestBatcher`,
+which collects the items arriving within a short window, verifies them with a
+single call, and hands each thread its own result.
+
+Example:
+>>> batcher = RequestBatcher(lambda items: [item > 0 for item in items], window=0.005)
+>>> batcher.submit(42)
+True
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Generic, List, Tuple, TypeVar
+
+
+T = TypeVar("T")
+
+
+class RequestBatcher(Generic[T]):
+    """
+    Collect items submitted concurrently, and verify them in batches.
+
+    Attributes:
+        verify_batch: function returning the result of each item of a batch
+        window: time to wait for more items after the first item of a batch, in seconds
+        max_batch: maximal number of items in a batch
+        concurrency: number of batches verified concurrently, e.g. by worker processes
+    """
+
+    def __init__(
+            self,
+            verify_batch: Callable[[List[T]], List[bool]],
+            window: float,
+            max_batch: int = 64,
+            concurrency: int = 1
+        ):
+        self.verify_batch = verify_batch
+        self.window = window
+        self.max_batch = max_batch
+        self.executor = ThreadPoolExecutor(max_workers=concurrency) if concurrency > 1 else None
+        self.queue: "queue.Queue[Tuple[T, Future]]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+
+    def submit(self, item: T) -> bool:
+        """
+        Submit an item, and wait for the result of its verification.
+        """
+        future: Future = Future()
+        self.queue.put((item, future))
+        return future.result()
+
+
+    def _collect(self) -> List[Tuple[T, Future]]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=timeout))
+            except queue.Empty:
+                break
+        return batch
+
+
+    def _verify(self, batch: List[Tuple[T, Future]]) -> None:
+        try:
+            try:
+                results = self.verify_batch([item for item, _ in batch])
+            except Exception as err: # pylint: disable=broad-except
+                # Do not fail the whole batch for one bad item: verify each item on its own, so that
+                # only the items which raise by themselves get the exception.
+                if len(batch) > 1:
+                    for single in batch:
+                        self._verify([single])
+                    return
+                batch[0][1].set_exception(err)
+                return
+
+            if len(results) != len(batch):
+                error = RuntimeError(
+                    f"The batch verifier gave {len(results)} results for {len(batch)} items."
+                )
+                for _, future in batch:
+                    future.set_exception(error)
+                return
+
+            with self.lock:
+                self.batches += 1
+                self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+        finally:
+            # Never leave a submitter waiting forever.
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("The batch was not verified."))
+
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            if self.executor is not None:
+                self.executor.submit(self._verify, batch)
+            else:
+                self._verify(batch)
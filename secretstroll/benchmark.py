@@ -0,0 +1,502 @@
+"""
+Micro-benchmarks of the group operations used by PS credentials.
+
+Example:
+    python3 benchmark.py fixed-base -a 1 -a 5 -a 10 -a 20
+    python3 benchmark.py multi-exp -a 1 -a 5 -a 10 -a 20
+    python3 benchmark.py codec -a 1 -a 5 -a 10 -a 20
+    python3 benchmark.py sizes -a 10
+    python3 benchmark.py credentials -a 1 -a 10 -H 0.5 -H 1.0 -o results.json
+"""
+
+import argparse
+import copy
+import json
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from petrelic.multiplicative.pairing import G1, G2
+
+import codec
+import credential
+from credential import FixedBasePrecomputation, FixedBaseTable, multi_exponentiation
+from serialization import jsonpickle, message_size_report, point_to_binary, size_report
+
+
+def timeit(function: Callable[[], object], repetitions: int) -> float:
+    """Mean duration of a call to the function, in milliseconds."""
+    start = time.perf_counter()
+    for _ in range(repetitions):
+        function()
+    return (time.perf_counter() - start) * 1e3 / repetitions
+
+
+def product_of_powers(bases: List, exponents: List):
+    """Naive product of powers: one full exponentiation per base."""
+    result = bases[0] ** exponents[0]
+    for base, exponent in zip(bases[1:], exponents[1:]):
+        result = result * base ** exponent
+    return result
+
+
+class SampleProof:
+    """Disclosure proof with the usual fields, to compare serializations."""
+
+    def __init__(self, num_attributes: int):
+        self.sigma1 = G1.generator() ** G1.order().random()
+        self.sigma2 = G1.generator() ** G1.order().random()
+        self.commitment = self.sigma1.pair(G2.generator()) ** G1.order().random()
+        self.challenge = G1.order().random()
+        # Half of the attributes are hidden, and the others are disclosed.
+        self.responses = [G1.order().random() for _ in range(num_attributes // 2 + 1)]
+        self.disclosed = {i: G1.order().random() for i in range(num_attributes - num_attributes // 2)}
+
+
+# Schema of `SampleProof`, registered with the tag 255 during the benchmarks
+# which encode it only, so that importing this module registers nothing.
+SAMPLE_PROOF_TAG = 255
+SAMPLE_PROOF_FIELDS = dict(
+    sigma1=codec.G1_FIELD,
+    sigma2=codec.G1_FIELD,
+    commitment=codec.GT_FIELD,
+    challenge=codec.BN_FIELD,
+    responses=codec.ListOf(codec.BN_FIELD),
+    disclosed=codec.MapOf(codec.INT_FIELD, codec.BN_FIELD)
+)
+
+
+def bench_codec(args: argparse.Namespace) -> None:
+    """Handle `codec` subcommand."""
+
+    print(
+        f"{'attributes':>10} {'format':>10} {'size (B)':>9}"
+        f" {'encode (ms)':>12} {'decode (ms)':>12}"
+    )
+    formats = (
+        ("jsonpickle", lambda obj: jsonpickle.encode(obj).encode("utf-8"), jsonpickle.decode),
+        ("codec", codec.encode, codec.decode),
+    )
+    with codec.registered(SampleProof, SAMPLE_PROOF_TAG, **SAMPLE_PROOF_FIELDS):
+        for num_attributes in args.attributes:
+            proof = SampleProof(num_attributes)
+            for name, encode, decode in formats:
+                data = encode(proof)
+                assert decode(data).commitment == proof.commitment
+                encoding = timeit(lambda: encode(proof), args.repetitions)
+                decoding = timeit(lambda: decode(data), args.repetitions)
+                print(f"{num_attributes:>10} {name:>10} {len(data):>9} {encoding:>12.3f} {decoding:>12.3f}")
+
+
+def bench_sizes(args: argparse.Namespace) -> None:
+    """Handle `sizes` subcommand."""
+
+    # Measured sizes of the encodings of group elements, which also show
+    # whether the installed petrelic compresses points by default.
+    print(f"{'group':>5} {'default (B)':>12} {'serialized (B)':>15}")
+    gt_generator = G1.generator().pair(G2.generator())
+    for name, element in (("G1", G1.generator()), ("G2", G2.generator()), ("GT", gt_generator)):
+        print(f"{name:>5} {len(element.to_binary()):>12} {len(point_to_binary(element)):>15}")
+
+    without_commitment = {
+        name: field for name, field in SAMPLE_PROOF_FIELDS.items() if name != "commitment"
+    }
+    for num_attributes in args.attributes:
+        proof = SampleProof(num_attributes)
+        print(f"\nSample disclosure proof with {num_attributes} attributes:")
+        for name, size in sorted(size_report(proof).items(), key=lambda item: -item[1]):
+            print(f"{name:>12} {size:>7} B")
+
+        # The same proof without its GT commitment, which the verifier can
+        # recompute from the challenge.
+        light = copy.copy(proof)
+        del light.commitment
+        with codec.registered(SampleProof, SAMPLE_PROOF_TAG, **SAMPLE_PROOF_FIELDS):
+            full_codec = len(codec.encode(proof))
+        with codec.registered(SampleProof, SAMPLE_PROOF_TAG, **without_commitment):
+            light_codec = len(codec.encode(light))
+        full_jsonpickle = len(jsonpickle.encode(proof).encode("utf-8"))
+        light_jsonpickle = len(jsonpickle.encode(light).encode("utf-8"))
+        print(f"{'format':>12} {'with GT (B)':>12} {'without GT (B)':>15}")
+        print(f"{'jsonpickle':>12} {full_jsonpickle:>12} {light_jsonpickle:>15}")
+        print(f"{'codec':>12} {full_codec:>12} {light_codec:>15}")
+
+        try:
+            messages = credential_messages(num_attributes, 0.5)
+        except NotImplementedError:
+            print("\nImplement the credential scheme in `credential.py` to measure its messages.")
+            continue
+        print(f"\nMessages of the credential scheme with {num_attributes} attributes:")
+        print(f"{'message':>17} {'jsonpickle (B)':>15} {'codec.dumps (B)':>16}  elements (B)")
+        for name, report in message_size_report(messages).items():
+            elements = ", ".join(
+                f"{element} {size}" for element, size in sorted(report.items(), key=lambda item: -item[1])
+                if element not in ("total", "other")
+            )
+            print(f"{name:>17} {report['total']:>15} {serialized_size(messages[name]):>16}  {elements}")
+
+
+def bench_multi_exp(args: argparse.Namespace) -> None:
+    """Handle `multi-exp` subcommand."""
+
+    print(f"{'group':>5} {'attributes':>10} {'naive (ms)':>11} {'multi-exp (ms)':>15} {'speedup':>8}")
+    gt_generator = G1.generator().pair(G2.generator())
+    for name, generator in (("G1", G1.generator()), ("G2", G2.generator()), ("GT", gt_generator)):
+        for num_attributes in args.attributes:
+            bases = [generator ** G1.order().random() for _ in range(num_attributes + 1)]
+            exponents = [G1.order().random() for _ in bases]
+
+            assert multi_exponentiation(bases, exponents, args.window) == product_of_powers(bases, exponents)
+            naive = timeit(lambda: product_of_powers(bases, exponents), args.repetitions)
+            multi = timeit(lambda: multi_exponentiation(bases, exponents, args.window), args.repetitions)
+            print(f"{name:>5} {num_attributes:>10} {naive:>11.3f} {multi:>15.3f} {naive / multi:>7.2f}x")
+
+
+def bench_fixed_base(args: argparse.Namespace) -> None:
+    """Handle `fixed-base` subcommand."""
+
+    print(f"{'group':>5} {'attributes':>10} {'naive (ms)':>11} {'fixed-base (ms)':>16} {'speedup':>8} {'build (ms)':>11}")
+    for group in (G1, G2):
+        for num_attributes in args.attributes:
+            # One generator per attribute, plus g (or g̃) for the blinding exponent.
+            bases = [group.generator() ** group.order().random() for _ in range(num_attributes + 1)]
+            exponents = [group.order().random() for _ in bases]
+            tables = [FixedBaseTable(base, window=args.window) for base in bases]
+
+            start = time.perf_counter()
+            for table in tables:
+                table.pow(1)
+            build = (time.perf_counter() - start) * 1e3
+
+            def precomputed():
+                result = tables[0].pow(exponents[0])
+                for table, exponent in zip(tables[1:], exponents[1:]):
+                    result = result * table.pow(exponent)
+                return result
+
+            assert precomputed() == product_of_powers(bases, exponents)
+            naive = timeit(lambda: product_of_powers(bases, exponents), args.repetitions)
+            fixed = timeit(precomputed, args.repetitions)
+            print(
+                f"{group.__name__:>5} {num_attributes:>10} {naive:>11.3f} {fixed:>16.3f}"
+                f" {naive / fixed:>7.2f}x {build:>11.1f}"
+            )
+
+    print()
+    try:
+        bench_fixed_base_credentials(args)
+    except NotImplementedError:
+        print("Credential operations are not implemented yet, skipping their timings.")
+
+
+def bench_fixed_base_credentials(args: argparse.Namespace) -> None:
+    """Time the credential operations with and without the fixed-base tables of the keys."""
+
+    print(f"{'operation':>24} {'attributes':>10} {'naive (ms)':>11} {'fixed-base (ms)':>16} {'speedup':>8}")
+    for num_attributes in args.attributes:
+        attributes = [f"attribute-{i}".encode("utf-8") for i in range(num_attributes)]
+        user_attributes = {i: attributes[i] for i in range(num_attributes // 2)}
+        issuer_attributes = {i: attributes[i] for i in range(num_attributes // 2, num_attributes)}
+        sk, pk = credential.generate_key(attributes)
+        keys = [key for key in (sk, pk) if isinstance(key, FixedBasePrecomputation)]
+        if not keys:
+            print("The keys do not use fixed-base tables (see `FixedBasePrecomputation`).")
+            return
+
+        request = credential.create_issue_request(pk, user_attributes)
+        response = credential.sign_issue_request(sk, pk, request, issuer_attributes)
+        anon_credential = credential.obtain_credential(pk, response)
+        proof = credential.create_disclosure_proof(pk, anon_credential, list(user_attributes.values()), b"msg")
+        operations = (
+            ("sign", lambda: credential.sign(sk, attributes)),
+            ("create_issue_request", lambda: credential.create_issue_request(pk, user_attributes)),
+            ("sign_issue_request", lambda: credential.sign_issue_request(sk, pk, request, issuer_attributes)),
+            ("create_disclosure_proof", lambda: credential.create_disclosure_proof(
+                pk, anon_credential, list(user_attributes.values()), b"msg"
+            )),
+            ("verify_disclosure_proof", lambda: credential.verify_disclosure_proof(pk, proof, b"msg")),
+        )
+        for name, operation in operations:
+            for key in keys:
+                key.use_fixed_base_tables = False
+            naive = timeit(operation, args.repetitions)
+            for key in keys:
+                key.use_fixed_base_tables = True
+            # Build the tables before timing.
+            operation()
+            fixed = timeit(operation, args.repetitions)
+            print(f"{name:>24} {num_attributes:>10} {naive:>11.3f} {fixed:>16.3f} {naive / fixed:>7.2f}x")
+
+
+def measure(function: Callable[[], Any], repetitions: int) -> Tuple[Dict[str, float], Any]:
+    """Mean and standard deviation of the duration of a call, in milliseconds, and the last result."""
+    durations = []
+    result = None
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        result = function()
+        durations.append((time.perf_counter() - start) * 1e3)
+    stddev = statistics.stdev(durations) if len(durations) > 1 else 0.0
+    return {"mean_ms": statistics.mean(durations), "stddev_ms": stddev}, result
+
+
+def serialized_size(obj: Any) -> int:
+    """Size of an object serialized for a message with `codec.dumps`, in bytes."""
+    return len(codec.dumps(obj))
+
+
+def sample_attributes(
+        num_attributes: int,
+        hidden_fraction: float
+    ) -> Tuple[List[bytes], Dict[int, bytes], Dict[int, bytes]]:
+    """Attributes of the benchmarks, with those of the user and those of the issuer.
+
+    The attributes are byte strings, and attribute maps are dictionaries from
+    the index of an attribute to its value: adapt `credential.py` or these
+    definitions if your implementation uses other types. The user holds the
+    hidden attributes, and the issuer sets the others.
+    """
+    attributes = [f"attribute-{i}".encode("utf-8") for i in range(num_attributes)]
+    num_hidden = round(num_attributes * hidden_fraction)
+    user_attributes = {i: attributes[i] for i in range(num_hidden)}
+    issuer_attributes = {i: attributes[i] for i in range(num_hidden, num_attributes)}
+    return attributes, user_attributes, issuer_attributes
+
+
+def credential_messages(num_attributes: int, hidden_fraction: float) -> Dict[str, Any]:
+    """One message of each type of the credential scheme, by message type."""
+    attributes, user_attributes, issuer_attributes = sample_attributes(num_attributes, hidden_fraction)
+    sk, pk = credential.generate_key(attributes)
+    request = credential.create_issue_request(pk, user_attributes)
+    response = credential.sign_issue_request(sk, pk, request, issuer_attributes)
+    anon_credential = credential.obtain_credential(pk, response)
+    proof = credential.create_disclosure_proof(
+        pk, anon_credential, list(user_attributes.values()), b"46.52345,6.57890"
+    )
+    return {
+        "public_key": pk,
+        "issue_request": request,
+        "blind_signature": response,
+        "credential": anon_credential,
+        "disclosure_proof": proof,
+    }
+
+
+def bench_credential_operations(
+        num_attributes: int,
+        hidden_fraction: float,
+        repetitions: int
+    ) -> Tuple[Dict[str, Dict[str, float]], Dict[str, int]]:
+    """Time every operation of the credential scheme, and measure the size of its messages.
+
+    The attributes are those of `sample_attributes`.
+    """
+    attributes, user_attributes, issuer_attributes = sample_attributes(num_attributes, hidden_fraction)
+    hidden_attributes = list(user_attributes.values())
+    message = b"46.52345,6.57890"
+
+    timings = dict()
+    sizes = dict()
+
+    timings["generate_key"], (sk, pk) = measure(lambda: credential.generate_key(attributes), repetitions)
+    timings["sign"], signature = measure(lambda: credential.sign(sk, attributes), repetitions)
+    timings["verify"], _ = measure(lambda: credential.verify(pk, signature, attributes), repetitions)
+
+    timings["create_issue_request"], request = measure(
+        lambda: credential.create_issue_request(pk, user_attributes), repetitions
+    )
+    timings["sign_issue_request"], response = measure(
+        lambda: credential.sign_issue_request(sk, pk, request, issuer_attributes), repetitions
+    )
+    timings["obtain_credential"], anon_credential = measure(
+        lambda: credential.obtain_credential(pk, response), repetitions
+    )
+
+    timings["create_disclosure_proof"], proof = measure(
+        lambda: credential.create_disclosure_proof(pk, anon_credential, hidden_attributes, message),
+        repetitions
+    )
+    timings["verify_disclosure_proof"], _ = measure(
+        lambda: credential.verify_disclosure_proof(pk, proof, message), repetitions
+    )
+
+    for name, obj in (
+            ("public_key", pk),
+            ("signature", signature),
+            ("issue_request", request),
+            ("blind_signature", response),
+            ("credential", anon_credential),
+            ("disclosure_proof", proof),
+        ):
+        sizes[name] = serialized_size(obj)
+
+    return timings, sizes
+
+
+def bench_credentials(args: argparse.Namespace) -> None:
+    """Handle `credentials` subcommand."""
+
+    results = []
+    for num_attributes in args.attributes:
+        for hidden_fraction in args.hidden or [0.5]:
+            timings, sizes = bench_credential_operations(num_attributes, hidden_fraction, args.repetitions)
+            results.append({
+                "attributes": num_attributes,
+                "hidden_fraction": hidden_fraction,
+                "repetitions": args.repetitions,
+                "operations": timings,
+                "sizes": sizes,
+            })
+
+    report = json.dumps({"benchmark": "credentials", "results": results}, indent=2)
+    if args.out is None:
+        print(report)
+    else:
+        with open(args.out, "w") as fd:
+            fd.write(report + "\n")
+
+
+def main(args: List[str]) -> None:
+    """Parse the arguments given to the benchmark, and call the appropriate method."""
+
+    parser = argparse.ArgumentParser(description="Benchmarks for CS-523 project 2.")
+    subparsers = parser.add_subparsers(help="Command")
+
+    parser_fixed_base = subparsers.add_parser(
+        "fixed-base",
+        help="Compare fixed-base tables with plain exponentiations, alone and in the credential operations."
+    )
+    parser_fixed_base.add_argument(
+        "-a",
+        "--attributes",
+        help="Number of attributes (repeatable).",
+        type=int,
+        default=list(),
+        action="append"
+    )
+    parser_fixed_base.add_argument(
+        "-w",
+        "--window",
+        help="Window size of the fixed-base tables, in bits.",
+        type=int,
+        default=6
+    )
+    parser_fixed_base.add_argument(
+        "-r",
+        "--repetitions",
+        help="Number of repetitions of each measure.",
+        type=int,
+        default=20
+    )
+    parser_fixed_base.set_defaults(callback=bench_fixed_base)
+
+    parser_multi_exp = subparsers.add_parser(
+        "multi-exp", help="Compare multi-exponentiation with plain exponentiations."
+    )
+    parser_multi_exp.add_argument(
+        "-a",
+        "--attributes",
+        help="Number of attributes (repeatable).",
+        type=int,
+        default=list(),
+        action="append"
+    )
+    parser_multi_exp.add_argument(
+        "-w",
+        "--window",
+        help="Window size of the multi-exponentiation, in bits.",
+        type=int,
+        default=4
+    )
+    parser_multi_exp.add_argument(
+        "-r",
+        "--repetitions",
+        help="Number of repetitions of each measure.",
+        type=int,
+        default=20
+    )
+    parser_multi_exp.set_defaults(callback=bench_multi_exp)
+
+    parser_codec = subparsers.add_parser(
+        "codec", help="Compare the binary codec with jsonpickle."
+    )
+    parser_codec.add_argument(
+        "-a",
+        "--attributes",
+        help="Number of attributes (repeatable).",
+        type=int,
+        default=list(),
+        action="append"
+    )
+    parser_codec.add_argument(
+        "-r",
+        "--repetitions",
+        help="Number of repetitions of each measure.",
+        type=int,
+        default=100
+    )
+    parser_codec.set_defaults(callback=bench_codec)
+
+    parser_sizes = subparsers.add_parser(
+        "sizes",
+        help="Measure the encodings of group elements, and break down the size of each message type."
+    )
+    parser_sizes.add_argument(
+        "-a",
+        "--attributes",
+        help="Number of attributes (repeatable).",
+        type=int,
+        default=list(),
+        action="append"
+    )
+    parser_sizes.set_defaults(callback=bench_sizes)
+
+    parser_credentials = subparsers.add_parser(
+        "credentials", help="Time the operations of the credential scheme, as JSON."
+    )
+    parser_credentials.add_argument(
+        "-a",
+        "--attributes",
+        help="Number of attributes (repeatable).",
+        type=int,
+        default=list(),
+        action="append"
+    )
+    parser_credentials.add_argument(
+        "-H",
+        "--hidden",
+        help="Fraction of hidden attributes (repeatable, default: 0.5).",
+        type=float,
+        default=list(),
+        action="append"
+    )
+    parser_credentials.add_argument(
+        "-r",
+        "--repetitions",
+        help="Number of repetitions of each measure.",
+        type=int,
+        default=20
+    )
+    parser_credentials.add_argument(
+        "-o",
+        "--out",
+        help="Name of the file in which to write the results (default: standard output).",
+        type=str,
+        default=None
+    )
+    parser_credentials.set_defaults(callback=bench_credentials)
+
+    namespace = parser.parse_args(args)
+
+    if "callback" in namespace:
+        if "attributes" in namespace and not namespace.attributes:
+            namespace.attributes = [1, 5, 10, 20]
+        namespace.callback(namespace)
+
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,189 @@
+"""
+Cache of the results of signature verifications on the server.
+
+Clients retry their requests, especially over Tor, and the same signature of
+the same message is then verified again. Decorating a verification method
+with `cached_verification` keeps its recent results in a bounded LRU cache,
+keyed by a digest of its arguments, so that a retry costs a hash instead of
+pairings. Decorating the method verifying many signatures at once with
+`cached_batch_verification` makes it share this cache, and only verify the
+signatures missing from it.
+
+Example:
+>>> class Verifier:
+...     @cached_verification(maxsize=128, ttl=60)
+...     def check(self, server_pk, message, revealed_attributes, signature):
+...         return True
+>>> verifier = Verifier()
+>>> verifier.check(b"pk", b"msg", ["bar"], b"sig")
+True
+>>> verifier.check(b"pk", b"msg", ["bar"], b"sig")
+True
+>>> cache_of(verifier, "check").stats()["hits"]
+1
+"""
+
+import collections
+import functools
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Arguments of a verification after the public key: (message, revealed_attributes, signature)
+Request = Tuple[bytes, List[str], bytes]
+
+
+class VerificationCache:
+    """
+    Bounded LRU cache of verification results, whose entries expire after a time to live.
+
+    Attributes:
+        maxsize: maximal number of entries
+        ttl: time to live of the entries, in seconds
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: "collections.OrderedDict[bytes, Tuple[float, bool]]" = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+
+    def get(self, key: bytes) -> Optional[bool]:
+        """
+        Result cached for a key, or None if there is none.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self.entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+
+    def put(self, key: bytes, result: bool) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, result)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions,
+            }
+
+
+def verification_digest(
+        server_pk: bytes,
+        message: bytes,
+        revealed_attributes: List[str],
+        signature: bytes
+    ) -> bytes:
+    """
+    Digest of the arguments of a verification. Each field is prefixed with its length, so that
+    different arguments never give the same input to the hash function.
+    """
+    digest = hashlib.sha256()
+    for field in (server_pk, message, json.dumps(revealed_attributes).encode("utf-8"), signature):
+        digest.update(len(field).to_bytes(8, "big"))
+        digest.update(field)
+    return digest.digest()
+
+
+def cache_of(obj: Any, name: str) -> VerificationCache:
+    """
+    Cache of the method `name` of an object, decorated with `cached_verification`.
+    """
+    caches = obj.__dict__.setdefault("_verification_caches", dict())
+    cache = caches.get(name)
+    if cache is None:
+        method = getattr(type(obj), name)
+        cache = caches.setdefault(name, VerificationCache(method.maxsize, method.ttl))
+    return cache
+
+
+def cached_results(
+        cache: VerificationCache,
+        server_pk: bytes,
+        requests: Sequence[Request],
+        verify: Callable[[List[Request]], List[bool]]
+    ) -> List[bool]:
+    """
+    Whether each request has a valid signature, as cached. The requests missing from the cache are
+    verified with a single call of `verify`, and their results are cached.
+    """
+    keys = [verification_digest(server_pk, *request) for request in requests]
+    results = [cache.get(key) for key in keys]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        for i, result in zip(missing, verify([requests[i] for i in missing])):
+            results[i] = bool(result)
+            cache.put(keys[i], bool(result))
+    return [bool(result) for result in results]
+
+
+def cached_verification(maxsize: int = 4096, ttl: float = 300.0) -> Callable:
+    """
+    Decorate a method taking (server_pk, message, revealed_attributes, signature) and returning
+    whether the signature is valid, to cache its results per object.
+    """
+    def decorator(method: Callable[..., bool]) -> Callable[..., bool]:
+        @functools.wraps(method)
+        def wrapper(self, server_pk: bytes, message: bytes, revealed_attributes: List[str], signature: bytes) -> bool:
+            cache = cache_of(self, method.__name__)
+            key = verification_digest(server_pk, message, revealed_attributes, signature)
+            result = cache.get(key)
+            if result is None:
+                result = bool(method(self, server_pk, message, revealed_attributes, signature))
+                cache.put(key, result)
+            return result
+
+        wrapper.maxsize = maxsize # type: ignore
+        wrapper.ttl = ttl # type: ignore
+        return wrapper
+
+    return decorator
+
+
+def cached_batch_verification(single: str) -> Callable:
+    """
+    Decorate a method taking (server_pk, requests) and returning whether the signature of each
+    request is valid, to share the cache of the method `single`, decorated with
+    `cached_verification`. The method is only called with the requests missing from the cache.
+    """
+    def decorator(method: Callable[..., List[bool]]) -> Callable[..., List[bool]]:
+        @functools.wraps(method)
+        def wrapper(self, server_pk: bytes, requests: List[Request]) -> List[bool]:
+            return cached_results(
+                cache_of(self, single),
+                server_pk,
+                requests,
+                lambda missing: method(self, server_pk, missing)
+            )
+
+        return wrapper
+
+    return decorator
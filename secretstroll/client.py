@@ -14,6 +14,7 @@ from typing import List, Optional, Tuple
 
 import requests
 
+from precomputation import ProofPool, pool_binding
 from stroll import Client
 
 #
@@ -142,6 +143,13 @@ def main(args: List[str]) -> None:
         help="Use Tor to connect to the server.",
         action="store_true"
     )
+    parser_loc.add_argument(
+        "-P",
+        "--pool",
+        help="Name of the file holding precomputed proofs (see `precompute`).",
+        type=Path,
+        default=None
+    )
 
     parser_loc.set_defaults(callback=client_loc)
 
@@ -180,8 +188,57 @@ def main(args: List[str]) -> None:
         help="Use Tor to connect to the server.",
         action="store_true"
     )
+    parser_grid.add_argument(
+        "-P",
+        "--pool",
+        help="Name of the file holding precomputed proofs (see `precompute`).",
+        type=Path,
+        default=None
+    )
     parser_grid.set_defaults(callback=client_grid)
 
+    # Parser for the offline precomputation of proofs
+    parser_precompute = subparsers.add_parser(
+        "precompute", help="Precompute proofs for later requests."
+    )
+    parser_precompute.add_argument(
+        "-p",
+        "--pub",
+        help="Name of the file from which to read the public key.",
+        type=argparse.FileType("rb"),
+        default="key-client.pub"
+    )
+    parser_precompute.add_argument(
+        "-c",
+        "--credential",
+        help="Name of the file from which to read the attribute-based credential.",
+        type=argparse.FileType("rb"),
+        default="anon.cred"
+    )
+    parser_precompute.add_argument(
+        "-T",
+        "--types",
+        help="Types of services of the future requests.",
+        type=str,
+        default=list(),
+        action="append"
+    )
+    parser_precompute.add_argument(
+        "-n",
+        "--count",
+        help="Number of proofs to keep available.",
+        type=int,
+        default=10
+    )
+    parser_precompute.add_argument(
+        "-P",
+        "--pool",
+        help="Name of the file in which to store the precomputed proofs.",
+        type=Path,
+        default=Path("proofs.pool")
+    )
+    parser_precompute.set_defaults(callback=client_precompute)
+
     namespace = parser.parse_args(args)
 
     if "callback" in namespace:
@@ -303,6 +360,56 @@ def client_register(args: argparse.Namespace) -> None:
         args.out.close()
 
 
+def sign(
+        client: Client,
+        public_key: bytes,
+        credential: bytes,
+        message: bytes,
+        types: List[str],
+        pool_path: Optional[Path]
+    ) -> bytes:
+    """Sign a request, with a precomputed proof if a pool is given."""
+
+    if pool_path is None:
+        return client.sign_request(public_key, credential, message, types)
+
+    pool = ProofPool(
+        lambda pool_types: client.precompute_request(public_key, credential, pool_types),
+        pool_path,
+        pool_binding(credential, public_key)
+    )
+    return client.sign_request_with_pool(public_key, credential, message, types, pool)
+
+
+def client_precompute(args: argparse.Namespace) -> None:
+    """Handle `precompute` subcommand."""
+
+    try:
+        public_key = args.pub.read()
+        credential = args.credential.read()
+
+    finally:
+        args.pub.close()
+        args.credential.close()
+
+    client = Client()
+    pool = ProofPool(
+        lambda types: client.precompute_request(public_key, credential, types),
+        args.pool,
+        pool_binding(credential, public_key)
+    )
+    try:
+        pool.fill(args.types, args.count)
+    except NotImplementedError:
+        print(
+            "Precomputed proofs need `Client.precompute_request` and `Client.finish_request`"
+            " in `stroll.py`: implement them first.",
+            file=sys.stderr
+        )
+        sys.exit(1)
+    print(f"{pool.available(args.types)} proofs available in {args.pool}.")
+
+
 def client_loc(args: argparse.Namespace) -> None:
     """Handle `loc` subcommand."""
 
@@ -319,7 +426,7 @@ def client_loc(args: argparse.Namespace) -> None:
 
     client = Client()
     message = (f"{lat},{lon}").encode("utf-8")
-    signature = client.sign_request(public_key, credential, message, types)
+    signature = sign(client, public_key, credential, message, types, args.pool)
 
     host, proxy = get_conn_params(args.tor)
 
@@ -372,7 +479,7 @@ def client_grid(args: argparse.Namespace) -> None:
 
     client = Client()
     message = (f"{cell_id}").encode("utf-8")
-    signature = client.sign_request(public_key, credential, message, types)
+    signature = sign(client, public_key, credential, message, types, args.pool)
 
     host, proxy = get_conn_params(args.tor)
 
@@ -0,0 +1,336 @@
+"""
+Compact binary serialization for keys, requests, signatures, credentials and
+proofs.
+
+`jsonpickle` writes every group element as base64 inside JSON, along with the
+path of its class, which makes messages several times larger than their
+content. Here, each class to serialize is registered with a tag and a schema
+listing its fields, and objects are written as:
+
+    | magic "SC" | format version | tag | field 1 | field 2 | ... |
+
+where group elements have a fixed length (compressed points), and scalars,
+bytes, strings and lists are prefixed with their length. Fields are written in
+the order of the schema, so that no name or class path is ever sent.
+
+Messages exchanged by the client and the server are serialized with `dumps`,
+which uses this format for the registered classes and falls back on
+`jsonpickle` for the others, and parsed with `loads`, which recognizes both.
+Register the classes of keys, requests, signatures, credentials and proofs
+next to their definitions (e.g. in `credential.py`) to switch them to the
+compact format.
+
+Example:
+>>> class Signature:
+...     def __init__(self, sigma1, sigma2):
+...         self.sigma1 = sigma1
+...         self.sigma2 = sigma2
+>>> register(Signature, 1, sigma1=G1_FIELD, sigma2=G1_FIELD)
+>>> data = encode(Signature(G1.generator(), G1.generator()))
+>>> decode(data).sigma1 == G1.generator()
+True
+"""
+
+import contextlib
+import struct
+from typing import Any, Callable, Dict, Iterator, List, Tuple, Type
+
+from petrelic.bn import Bn
+from petrelic.multiplicative.pairing import G1, G1Element, G2, G2Element, GT, GTElement
+
+from serialization import jsonpickle, point_to_binary
+
+
+MAGIC = b"SC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("!2sBB")
+
+
+class CodecError(ValueError):
+    """The data cannot be encoded or decoded."""
+
+
+class Field:
+    """
+    Type of a field of a schema, with its binary encoding.
+    """
+
+    def encode(self, value: Any, out: bytearray) -> None:
+        raise NotImplementedError
+
+
+    def decode(self, data: memoryview, offset: int) -> Tuple[Any, int]:
+        """
+        Decode a value at an offset, and return it with the offset of the next field.
+        """
+        raise NotImplementedError
+
+
+def _read(data: memoryview, offset: int, size: int) -> Tuple[bytes, int]:
+    end = offset + size
+    if end > len(data):
+        raise CodecError("Truncated data.")
+    return bytes(data[offset:end]), end
+
+
+class LengthPrefixed(Field):
+    """
+    Values converted to byte strings, prefixed with their length.
+    """
+
+    def __init__(self, to_bytes: Callable[[Any], bytes], from_bytes: Callable[[bytes], Any], prefix: str = "!I"):
+        self.to_bytes = to_bytes
+        self.from_bytes = from_bytes
+        self.prefix = struct.Struct(prefix)
+
+
+    def encode(self, value: Any, out: bytearray) -> None:
+        raw = self.to_bytes(value)
+        out += self.prefix.pack(len(raw))
+        out += raw
+
+
+    def decode(self, data: memoryview, offset: int) -> Tuple[Any, int]:
+        raw, offset = _read(data, offset, self.prefix.size)
+        (size,) = self.prefix.unpack(raw)
+        raw, offset = _read(data, offset, size)
+        return self.from_bytes(raw), offset
+
+
+class FixedLength(Field):
+    """
+    Group elements, whose encoding has the same length for all elements of the group.
+    """
+
+    def __init__(self, group: Any, element_type: Type):
+        self.group = group
+        self.element_type = element_type
+        self._size = 0
+
+
+    @property
+    def size(self) -> int:
+        if not self._size:
+            self._size = len(point_to_binary(self.group.generator()))
+        return self._size
+
+
+    def encode(self, value: Any, out: bytearray) -> None:
+        raw = point_to_binary(value)
+        if len(raw) != self.size:
+            raise CodecError(f"Unexpected encoding of {self.element_type.__name__}.")
+        out += raw
+
+
+    def decode(self, data: memoryview, offset: int) -> Tuple[Any, int]:
+        raw, offset = _read(data, offset, self.size)
+        return self.element_type.from_binary(raw), offset
+
+
+class ListOf(Field):
+    """
+    Lists of values of the same field type.
+    """
+
+    COUNT = struct.Struct("!H")
+
+    def __init__(self, item: Field):
+        self.item = item
+
+
+    def encode(self, value: Any, out: bytearray) -> None:
+        out += self.COUNT.pack(len(value))
+        for item in value:
+            self.item.encode(item, out)
+
+
+    def decode(self, data: memoryview, offset: int) -> Tuple[Any, int]:
+        raw, offset = _read(data, offset, self.COUNT.size)
+        (count,) = self.COUNT.unpack(raw)
+        values = []
+        for _ in range(count):
+            value, offset = self.item.decode(data, offset)
+            values.append(value)
+        return values, offset
+
+
+class MapOf(Field):
+    """
+    Dictionaries, as lists of (key, value) pairs.
+    """
+
+    def __init__(self, key: Field, value: Field):
+        self.key = key
+        self.value = value
+
+
+    def encode(self, value: Any, out: bytearray) -> None:
+        out += ListOf.COUNT.pack(len(value))
+        for key, item in value.items():
+            self.key.encode(key, out)
+            self.value.encode(item, out)
+
+
+    def decode(self, data: memoryview, offset: int) -> Tuple[Any, int]:
+        raw, offset = _read(data, offset, ListOf.COUNT.size)
+        (count,) = ListOf.COUNT.unpack(raw)
+        values = dict()
+        for _ in range(count):
+            key, offset = self.key.decode(data, offset)
+            values[key], offset = self.value.decode(data, offset)
+        return values, offset
+
+
+class Nested(Field):
+    """
+    Objects of a registered class, without header.
+    """
+
+    def __init__(self, cls: Type):
+        self.cls = cls
+
+
+    def encode(self, value: Any, out: bytearray) -> None:
+        _encode_fields(value, REGISTRY.schema_of(self.cls), out)
+
+
+    def decode(self, data: memoryview, offset: int) -> Tuple[Any, int]:
+        return _decode_fields(self.cls, REGISTRY.schema_of(self.cls), data, offset)
+
+
+def _int_to_bytes(value: int) -> bytes:
+    return value.to_bytes((value.bit_length() + 8) // 8, "big", signed=True)
+
+
+# Scalars are non-negative, as they are reduced modulo the order of the groups.
+BN_FIELD = LengthPrefixed(lambda bn: bn.binary(), Bn.from_binary, "!B")
+INT_FIELD = LengthPrefixed(_int_to_bytes, lambda raw: int.from_bytes(raw, "big", signed=True), "!B")
+BYTES_FIELD = LengthPrefixed(bytes, bytes)
+STR_FIELD = LengthPrefixed(lambda value: value.encode("utf-8"), lambda raw: raw.decode("utf-8"))
+G1_FIELD = FixedLength(G1, G1Element)
+G2_FIELD = FixedLength(G2, G2Element)
+GT_FIELD = FixedLength(GT, GTElement)
+
+
+Schema = List[Tuple[str, Field]]
+
+
+class Registry:
+    """
+    Registered classes, with their tag and schema.
+    """
+
+    def __init__(self):
+        self.by_tag: Dict[int, Tuple[Type, Schema]] = dict()
+        self.by_class: Dict[Type, Tuple[int, Schema]] = dict()
+
+
+    def register(self, cls: Type, tag: int, schema: Schema) -> None:
+        if not 0 <= tag < 256:
+            raise CodecError("Tags must fit in a byte.")
+        if tag in self.by_tag and self.by_tag[tag][0] is not cls:
+            raise CodecError(f"Tag {tag} is already used by {self.by_tag[tag][0].__name__}.")
+        self.by_tag[tag] = (cls, schema)
+        self.by_class[cls] = (tag, schema)
+
+
+    def unregister(self, cls: Type) -> None:
+        tag, _ = self.by_class.pop(cls)
+        del self.by_tag[tag]
+
+
+    def schema_of(self, cls: Type) -> Schema:
+        if cls not in self.by_class:
+            raise CodecError(f"Class {cls.__name__} is not registered.")
+        return self.by_class[cls][1]
+
+
+REGISTRY = Registry()
+
+
+def register(cls: Type, tag: int, **fields: Field) -> None:
+    """
+    Register a class with a tag, unique among registered classes, and the fields of its objects.
+    The fields are encoded in the order of the arguments.
+    """
+    REGISTRY.register(cls, tag, list(fields.items()))
+
+
+@contextlib.contextmanager
+def registered(cls: Type, tag: int, **fields: Field) -> Iterator[None]:
+    """
+    Register a class as `register`, for the duration of a `with` block only.
+    """
+    REGISTRY.register(cls, tag, list(fields.items()))
+    try:
+        yield
+    finally:
+        REGISTRY.unregister(cls)
+
+
+def _encode_fields(obj: Any, schema: Schema, out: bytearray) -> None:
+    for name, field in schema:
+        try:
+            field.encode(getattr(obj, name), out)
+        except (AttributeError, TypeError, struct.error) as err:
+            raise CodecError(f"Cannot encode field {name} of {type(obj).__name__}: {err}") from err
+
+
+def _decode_fields(cls: Type, schema: Schema, data: memoryview, offset: int) -> Tuple[Any, int]:
+    obj = object.__new__(cls)
+    for name, field in schema:
+        value, offset = field.decode(data, offset)
+        setattr(obj, name, value)
+    return obj, offset
+
+
+def encode(obj: Any) -> bytes:
+    """
+    Serialize an object of a registered class.
+    """
+    if type(obj) not in REGISTRY.by_class:
+        raise CodecError(f"Class {type(obj).__name__} is not registered.")
+    tag, schema = REGISTRY.by_class[type(obj)]
+    out = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, tag))
+    _encode_fields(obj, schema, out)
+    return bytes(out)
+
+
+def decode(data: bytes) -> Any:
+    """
+    Deserialize an object serialized with `encode`.
+    """
+    view = memoryview(data)
+    raw, offset = _read(view, 0, HEADER.size)
+    magic, version, tag = HEADER.unpack(raw)
+    if magic != MAGIC:
+        raise CodecError("Not an encoded object.")
+    if version != FORMAT_VERSION:
+        raise CodecError(f"Unsupported format version {version}.")
+    if tag not in REGISTRY.by_tag:
+        raise CodecError(f"Unknown tag {tag}.")
+
+    cls, schema = REGISTRY.by_tag[tag]
+    obj, offset = _decode_fields(cls, schema, view, offset)
+    if offset != len(view):
+        raise CodecError("Trailing data.")
+    return obj
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize an object for a message: with `encode` if its class is registered, and with
+    `jsonpickle` otherwise.
+    """
+    if type(obj) in REGISTRY.by_class:
+        return encode(obj)
+    return jsonpickle.encode(obj).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    """
+    Deserialize an object serialized with `dumps`, in either format.
+    """
+    if bytes(data[:len(MAGIC)]) == MAGIC:
+        return decode(data)
+    return jsonpickle.decode(data)
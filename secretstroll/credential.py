@@ -15,7 +15,8 @@ resembles the original scheme definition. However, you are free to restructure
 the functions provided to resemble a more object-oriented interface.
 """
 
-from typing import Any, List, Tuple
+import secrets
+from typing import Any, Dict, List, Optional, Tuple
 
 from serialization import jsonpickle
 
@@ -32,6 +33,9 @@ IssueRequest = Any
 BlindSignature = Any
 AnonymousCredential = Any
 DisclosureProof = Any
+# Pairs (P, Q) of G1 and G2 elements, and target T in GT (or None for the
+# identity), standing for the equation Π e(P, Q) = T.
+PairingEquation = Tuple[List[Tuple[Any, Any]], Any]
 
 
 ######################
@@ -114,7 +118,13 @@ def create_disclosure_proof(
         hidden_attributes: List[Attribute],
         message: bytes
     ) -> DisclosureProof:
-    """ Create a disclosure proof """
+    """ Create a disclosure proof
+
+    Hint: Elements of GT are much larger than elements of G1 once serialized.
+    Do not send values that the verifier can recompute, such as the
+    commitment of the Fiat-Shamir proof when the challenge is sent, and check
+    the size of the proof with `serialization.size_report`.
+    """
     raise NotImplementedError()
 
 
@@ -128,3 +138,378 @@ def verify_disclosure_proof(
     Hint: The verifier may also want to retrieve the disclosed attributes
     """
     raise NotImplementedError()
+
+
+def disclosure_proof_equations(
+        pk: PublicKey,
+        disclosure_proof: DisclosureProof,
+        message: bytes
+    ) -> Optional[List[PairingEquation]]:
+    """ Split the verification of a disclosure proof for batch verification
+
+    Run the checks of `verify_disclosure_proof` which do not need pairings,
+    and return the pairing equations left to check, or None if a check failed.
+    For instance, if the proof carries the commitment of its Fiat-Shamir proof
+    instead of the challenge, the check comparing a product of pairings of σ1
+    and σ2 with this commitment in GT becomes a single equation.
+
+    By default, the whole proof is checked with `verify_disclosure_proof`, and
+    no equation is left: batch verification is then correct, but no faster
+    than verifying each proof on its own.
+    """
+    if not verify_disclosure_proof(pk, disclosure_proof, message):
+        return None
+    return []
+
+
+####################
+## PRECOMPUTATION ##
+####################
+
+# Exponents are scalars modulo the order of the pairing groups, which fits in 256 bits.
+EXPONENT_BITS = 256
+
+
+class FixedBaseTable:
+    """ Windowed precomputation table for a group element used as a fixed base
+
+    Row i of the table holds base^(d * 2^(w*i)) for every digit d of w bits, so
+    that base^e is the product of one table entry per window of e instead of a
+    full square-and-multiply. The table is built on first use, and is not
+    serialized.
+    """
+
+    def __init__(self, base: Any, window: int = 6, bits: int = EXPONENT_BITS):
+        self.base = base
+        self.window = window
+        self.bits = bits
+        self.table: Optional[List[List[Any]]] = None
+
+
+    def _build(self) -> List[List[Any]]:
+        table = []
+        identity = self.base ** 0
+        row_base = self.base
+        for _ in range(-(-self.bits // self.window)):
+            row = [identity]
+            for _ in range((1 << self.window) - 1):
+                row.append(row[-1] * row_base)
+            table.append(row)
+            row_base = row[-1] * row_base
+        return table
+
+
+    def pow(self, exponent: Any) -> Any:
+        """ Compute base^exponent """
+        e = int(exponent)
+        if e < 0 or e.bit_length() > self.bits:
+            return self.base ** exponent
+
+        if self.table is None:
+            self.table = self._build()
+
+        mask = (1 << self.window) - 1
+        result = self.table[0][0]
+        i = 0
+        while e:
+            digit = e & mask
+            if digit:
+                result = result * self.table[i][digit]
+            e >>= self.window
+            i += 1
+        return result
+
+
+    def __getstate__(self):
+        return {"base": self.base, "window": self.window, "bits": self.bits}
+
+
+    def __setstate__(self, state):
+        self.__init__(state["base"], state["window"], state["bits"])
+
+
+class FixedBasePrecomputation:
+    """ Mixin for keys whose generators are exponentiated over and over
+
+    Inherit from this class in the public key class, and compute powers of its
+    generators (g, g̃, Y_i, Ỹ_i, ...) with `fixed_base_pow`, or get the table of
+    a generator once with `fixed_base_table` and call its `pow` method. A table
+    is built lazily for each base, and the tables are left out of the
+    serialized key.
+
+    Tables are looked up by the identity of the base, not by its value, so that
+    a lookup does not serialize the base: pass the generators stored in the key
+    itself, not copies of them. Setting `use_fixed_base_tables` to False on a
+    key falls back to plain exponentiations, e.g. to benchmark the tables.
+    """
+
+    use_fixed_base_tables = True
+
+    def fixed_base_table(self, base: Any) -> FixedBaseTable:
+        """ Return the precomputation table of a base of this key """
+        tables = self.__dict__.setdefault("_fixed_base_tables", {})
+        table = tables.get(id(base))
+        # The table keeps its base alive, so its id cannot be reused by another object.
+        if table is None or table.base is not base:
+            table = tables[id(base)] = FixedBaseTable(base)
+        return table
+
+
+    def fixed_base_pow(self, base: Any, exponent: Any) -> Any:
+        """ Compute base^exponent with the precomputation table of the base """
+        if not self.use_fixed_base_tables:
+            return base ** exponent
+        return self.fixed_base_table(base).pow(exponent)
+
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop("_fixed_base_tables", None)
+        return state
+
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+
+def multi_exponentiation(bases: List[Any], exponents: List[Any], window: int = 4) -> Any:
+    """ Compute the product of bases[i]^exponents[i] with Straus' method
+
+    All exponentiations share the same sequence of squarings, and each base
+    only costs one multiplication per window of its exponent, so the product
+    is much cheaper than one full exponentiation per base. Use it for the
+    commitments g^t · Π Y_i^{a_i} and their counterparts in G2 and GT.
+    """
+    if len(bases) != len(exponents) or not bases:
+        raise ValueError("Expected as many exponents as bases, and at least one base.")
+
+    ints = [int(exponent) for exponent in exponents]
+    if any(e < 0 for e in ints):
+        result = bases[0] ** exponents[0]
+        for base, exponent in zip(bases[1:], exponents[1:]):
+            result = result * base ** exponent
+        return result
+
+    # Powers base^0, ..., base^(2^w - 1) of every base.
+    identity = bases[0] ** 0
+    powers = []
+    for base in bases:
+        row = [identity, base]
+        for _ in range((1 << window) - 2):
+            row.append(row[-1] * base)
+        powers.append(row)
+
+    mask = (1 << window) - 1
+    num_windows = -(-max(e.bit_length() for e in ints) // window)
+    result = identity
+    for i in reversed(range(num_windows)):
+        if i != num_windows - 1:
+            for _ in range(window):
+                result = result * result
+        shift = i * window
+        for row, e in zip(powers, ints):
+            digit = (e >> shift) & mask
+            if digit:
+                result = result * row[digit]
+    return result
+
+
+##############
+## PAIRINGS ##
+##############
+
+
+def fixed_pairings(
+        pk: PublicKey
+    ) -> List[Tuple[Any, Any]]:
+    """ Pairs of elements of the public key paired in every verification
+
+    For instance (g, g̃), (g, X̃) and (g, Ỹ_i). Their pairings are computed
+    once per key by `PairingCache`.
+
+    By default, no pair is fixed, and every pairing is computed as usual.
+    """
+    return []
+
+
+class PairingCache:
+    """ Pairings of fixed pairs of elements, computed on first use
+
+    Build one cache per loaded public key with `PairingCache(fixed_pairings(pk))`,
+    and pass it to `pairing_product`. Pairings of other pairs are computed as
+    usual.
+
+    Pairs are recognized by the identity of their elements, which avoids
+    serializing them on every lookup: write the verification equations with
+    the elements stored in the key, not with copies of them.
+    """
+
+    def __init__(self, pairs: Optional[List[Tuple[Any, Any]]] = None):
+        # The registered elements are kept alive, so their ids cannot be reused by other objects.
+        self.fixed = {(id(p), id(q)): (p, q) for p, q in pairs or []}
+        self.pairings: Dict[Tuple[int, int], Any] = dict()
+        self.hits = 0
+
+
+    def is_fixed(self, p: Any, q: Any) -> bool:
+        """ Whether e(p, q) is one of the cached pairings """
+        pair = self.fixed.get((id(p), id(q)))
+        return pair is not None and pair[0] is p and pair[1] is q
+
+
+    def pair(self, p: Any, q: Any) -> Any:
+        """ Compute e(p, q) """
+        if not self.is_fixed(p, q):
+            return p.pair(q)
+        key = (id(p), id(q))
+        if key not in self.pairings:
+            self.pairings[key] = p.pair(q)
+        else:
+            self.hits += 1
+        return self.pairings[key]
+
+
+def pairing_product(
+        pairs: List[Tuple[Any, Any]],
+        cache: Optional[PairingCache] = None
+    ) -> Any:
+    """ Compute the product of the pairings e(P, Q) of a list of pairs
+
+    The pairings of the fixed pairs of the cache are taken from the cache.
+    The other pairs sharing the same G2 element, then those sharing the same
+    G1 element, are merged first, since e(P1, Q) · e(P2, Q) = e(P1 · P2, Q).
+    Thus, a verification equation such as e(σ1, X̃ · Π Ỹ_i^{m_i}) · e(σ2^-1, g̃) = 1
+    costs one pairing per distinct element. Write verification equations as a
+    single product compared with the identity rather than as several
+    independent pairings.
+    """
+    if not pairs:
+        raise ValueError("Expected at least one pair.")
+
+    result = None
+    by_g2: Dict[bytes, Tuple[Any, Any]] = dict()
+    for p, q in pairs:
+        # Merging a fixed pair with another one would lose its cached pairing.
+        if cache is not None and cache.is_fixed(p, q):
+            term = cache.pair(p, q)
+            result = term if result is None else result * term
+            continue
+        key = q.to_binary()
+        by_g2[key] = (by_g2[key][0] * p, q) if key in by_g2 else (p, q)
+
+    by_g1: Dict[bytes, Tuple[Any, Any]] = dict()
+    for p, q in by_g2.values():
+        key = p.to_binary()
+        by_g1[key] = (p, by_g1[key][1] * q) if key in by_g1 else (p, q)
+
+    for p, q in by_g1.values():
+        term = p.pair(q)
+        result = term if result is None else result * term
+    return result
+
+
+########################
+## BATCH VERIFICATION ##
+########################
+
+# Bits of the random coefficients of the batched equations. A batch containing
+# an invalid equation is accepted with probability at most 2^-BATCH_SECURITY_BITS.
+BATCH_SECURITY_BITS = 64
+
+
+def batch_verify_pairing_equations(
+        equations: List[PairingEquation],
+        security_bits: int = BATCH_SECURITY_BITS,
+        cache: Optional["PairingCache"] = None
+    ) -> bool:
+    """ Check many pairing equations at once
+
+    The equations are raised to random powers and multiplied together. The
+    pairs sharing the same G2 element, such as g̃ or X̃, are merged into a
+    single pairing of a G1 multi-exponentiation, so that a batch costs about
+    one pairing per distinct G2 element instead of per pair. The fixed pairs
+    of the cache are not merged: their cached pairings are raised to the sum
+    of their coefficients instead, which is much cheaper than a pairing.
+    """
+    if any(not pairs for pairs, _ in equations):
+        raise ValueError("Every equation must contain at least one pairing.")
+    if not equations:
+        return True
+
+    merged: Dict[bytes, Tuple[Any, List[Any], List[int]]] = dict()
+    # Summed coefficients of the fixed pairs of the cache, whose pairings are raised to them.
+    fixed: Dict[Tuple[int, int], Tuple[Any, Any, int]] = dict()
+    targets = []
+    target_coefficients = []
+    for pairs, target in equations:
+        coefficient = secrets.randbits(security_bits) | 1
+        for p, q in pairs:
+            if cache is not None and cache.is_fixed(p, q):
+                _, _, total = fixed.get((id(p), id(q)), (p, q, 0))
+                fixed[(id(p), id(q))] = (p, q, total + coefficient)
+                continue
+            _, bases, coefficients = merged.setdefault(q.to_binary(), (q, [], []))
+            bases.append(p)
+            coefficients.append(coefficient)
+        if target is not None:
+            targets.append(target)
+            target_coefficients.append(coefficient)
+
+    terms = []
+    if merged:
+        terms.append(pairing_product(
+            [(multi_exponentiation(bases, coefficients), q) for q, bases, coefficients in merged.values()]
+        ))
+    if fixed:
+        terms.append(multi_exponentiation(
+            [cache.pair(p, q) for p, q, _ in fixed.values()], # type: ignore
+            [total for _, _, total in fixed.values()]
+        ))
+    lhs = terms[0] if len(terms) == 1 else terms[0] * terms[1]
+    if not targets:
+        return lhs == lhs ** 0
+    return lhs == multi_exponentiation(targets, target_coefficients)
+
+
+def batch_verify_disclosure_proofs(
+        pk: PublicKey,
+        proofs: List[Tuple[DisclosureProof, bytes]],
+        cache: Optional["PairingCache"] = None
+    ) -> List[bool]:
+    """ Verify many (disclosure proof, message) pairs at once
+
+    The pairing equations of all proofs are checked as one batch. If the batch
+    fails, it is split in halves which are checked recursively, so that a few
+    invalid proofs only cost a few more batches to isolate. A proof whose
+    checks raise an error, e.g. because it is malformed, is invalid, and does
+    not affect the others.
+    """
+    equations: List[Optional[List[PairingEquation]]] = []
+    for proof, message in proofs:
+        try:
+            equations.append(disclosure_proof_equations(pk, proof, message))
+        except NotImplementedError:
+            raise
+        except Exception: # pylint: disable=broad-except
+            equations.append(None)
+    results = [eqs is not None for eqs in equations]
+
+    def check(indices: List[int]) -> None:
+        if not indices:
+            return
+        batch = [eq for i in indices for eq in equations[i]] # type: ignore
+        try:
+            if batch_verify_pairing_equations(batch, cache=cache):
+                return
+        except Exception: # pylint: disable=broad-except
+            # Same as a failed batch: isolate the equations which raise.
+            pass
+        if len(indices) == 1:
+            results[indices[0]] = False
+            return
+        middle = len(indices) // 2
+        check(indices[:middle])
+        check(indices[middle:])
+
+    check([i for i, valid in enumerate(results) if valid])
+    return results
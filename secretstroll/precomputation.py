@@ -0,0 +1,191 @@
+"""
+Pool of precomputed disclosure proofs for the client.
+
+Most of the work of signing a request does not depend on the message:
+rerandomizing the credential and committing to the hidden attributes. The pool
+keeps such precomputations, produced offline or by a background thread, so
+that signing a request online only costs the end of the proof.
+
+Each precomputation must be used for one request only: reusing the randomness
+of a proof for two messages leaks the hidden attributes. A precomputation is
+therefore removed from the pool, and from its file, before it is returned.
+Processes sharing a pool file hold an exclusive lock on it while they read,
+update and write it back, so that two of them never take the same
+precomputation. The file is only readable by its owner, and its entries are
+bound to the credential and the public key they were computed with.
+"""
+
+import base64
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+
+Key = Tuple[str, ...]
+
+
+def pool_binding(credential: bytes, public_key: bytes) -> str:
+    """
+    Digest of a credential and a public key, identifying the precomputations made with them.
+    Each field is prefixed with its length, so that different pairs never give the same digest.
+    """
+    digest = hashlib.sha256()
+    for field in (credential, public_key):
+        digest.update(len(field).to_bytes(8, "big"))
+        digest.update(field)
+    return digest.hexdigest()
+
+
+class ProofPool:
+    """
+    Single-use precomputations, grouped by the revealed attributes they were made for.
+
+    Attributes:
+        produce: function computing a precomputation for the given revealed attributes
+        path: file in which the pool is persisted (default: not persisted)
+        binding: `pool_binding` of the credential and the public key of the precomputations.
+            Entries of the file made with others are dropped (default: no binding)
+    """
+
+    def __init__(
+            self,
+            produce: Callable[[List[str]], bytes],
+            path: Optional[Path] = None,
+            binding: str = ""
+        ):
+        self.produce = produce
+        self.path = path
+        self.binding = binding
+        self.lock = threading.Lock()
+        self.changed = threading.Condition(self.lock)
+        self.items: Dict[Key, List[bytes]] = dict()
+        self.stopped = threading.Event()
+
+
+    @staticmethod
+    def _key(types: Sequence[str]) -> Key:
+        return tuple(sorted(types))
+
+
+    @contextlib.contextmanager
+    def _locked_file(self) -> Iterator[None]:
+        """
+        Hold an exclusive lock on the pool file, and reload the pool from it. Must be called with
+        the lock held.
+        """
+        if self.path is None:
+            yield
+            return
+        lock_path = self.path.with_name(self.path.name + ".lock")
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            self._load()
+            yield
+        finally:
+            os.close(fd)
+
+
+    def _load(self) -> None:
+        if not self.path.exists(): # type: ignore
+            self.items = dict()
+            return
+        with open(self.path, "r") as fd: # type: ignore
+            content = json.load(fd)
+        self.items = {
+            tuple(entry["types"]): [base64.b64decode(item) for item in entry["items"]]
+            for entry in content
+            if entry.get("binding", "") == self.binding
+        }
+
+
+    def _save(self) -> None:
+        """
+        Write the pool to its file, atomically. Must be called within `_locked_file`.
+        """
+        if self.path is None:
+            return
+        content = [
+            {
+                "types": list(key),
+                "binding": self.binding,
+                "items": [base64.b64encode(item).decode("utf-8") for item in items],
+            }
+            for key, items in self.items.items()
+        ]
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        # Precomputations hold the randomness of proofs: only the owner may read them.
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.fchmod(fd, 0o600)
+        with os.fdopen(fd, "w") as tmp:
+            json.dump(content, tmp)
+            tmp.flush()
+            os.fsync(tmp.fileno())
+        os.replace(tmp_path, self.path)
+
+
+    def available(self, types: Sequence[str]) -> int:
+        """
+        Number of precomputations available for the given revealed attributes.
+        """
+        with self.lock, self._locked_file():
+            return len(self.items.get(self._key(types), []))
+
+
+    def take(self, types: Sequence[str]) -> Optional[bytes]:
+        """
+        Remove a precomputation for the given revealed attributes from the pool, and return it,
+        or None if the pool is empty.
+        """
+        with self.changed, self._locked_file():
+            items = self.items.get(self._key(types))
+            if not items:
+                return None
+            item = items.pop(0)
+            self._save()
+            self.changed.notify_all()
+            return item
+
+
+    def fill(self, types: Sequence[str], count: int) -> None:
+        """
+        Produce precomputations until `count` of them are available for the given revealed attributes.
+        """
+        key = self._key(types)
+        while self.available(types) < count and not self.stopped.is_set():
+            item = self.produce(list(types))
+            with self.lock, self._locked_file():
+                self.items.setdefault(key, []).append(item)
+                self._save()
+
+
+    def start(self, types: Sequence[str], count: int) -> threading.Thread:
+        """
+        Keep `count` precomputations available for the given revealed attributes in the background,
+        until `stop` is called.
+        """
+        def refill():
+            while not self.stopped.is_set():
+                self.fill(types, count)
+                with self.changed:
+                    self.changed.wait_for(
+                        lambda: self.stopped.is_set() or len(self.items.get(self._key(types), [])) < count
+                    )
+
+        thread = threading.Thread(target=refill, daemon=True)
+        thread.start()
+        return thread
+
+
+    def stop(self) -> None:
+        """
+        Stop the background threads.
+        """
+        self.stopped.set()
+        with self.changed:
+            self.changed.notify_all()
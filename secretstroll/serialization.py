@@ -38,6 +38,8 @@ this file. As such, if you need to serialize an object containing some
 """
 
 import base64
+import json
+from typing import Any, Dict
 
 import jsonpickle
 
@@ -63,6 +65,20 @@ from petrelic.petlib.pairing import G1Elem as G1EP, G2Elem as G2EP, GTElem as Gt
 # Define handlers for jsonpickle.
 #
 
+
+def point_to_binary(obj):
+    """Encode a group element, in its compressed form when the type supports it.
+
+    The compressed form is requested explicitly rather than left to the
+    default of the installed petrelic, which may already be compressed: run
+    `benchmark.py sizes` to compare the sizes of both forms. `from_binary`
+    decodes both.
+    """
+    try:
+        return obj.to_binary(compressed=True)
+    except TypeError:
+        return obj.to_binary()
+
 # Handler for big number ised intrnally by RELIC.
 
 
@@ -84,7 +100,7 @@ class G1EAHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for G1Element"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -95,7 +111,7 @@ class G2EAHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for G2Element"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -106,7 +122,7 @@ class GtEAHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for GtElement"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -120,7 +136,7 @@ class G1EMHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for G1Element"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -131,7 +147,7 @@ class G2EMHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for G2Element"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -142,7 +158,7 @@ class GtEMHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for GtElement"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -156,7 +172,7 @@ class G1ENHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for G1Element"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -167,7 +183,7 @@ class G2ENHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for G2Element"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -178,7 +194,7 @@ class GtENHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for GtElement"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -192,7 +208,7 @@ class G1EPHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for G1Element"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -203,7 +219,7 @@ class G2EPHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for G2Element"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -214,7 +230,7 @@ class GtEPHandler(jsonpickle.handlers.BaseHandler):
     """JSONPickle handler for GtElement"""
 
     def flatten(self, obj, data):
-        data["b64repr"] = base64.b64encode(obj.to_binary()).decode("utf-8")
+        data["b64repr"] = base64.b64encode(point_to_binary(obj)).decode("utf-8")
         return data
 
     def restore(self, obj):
@@ -240,3 +256,45 @@ jsonpickle.handlers.register(GtEN, GtENHandler, base=True)
 jsonpickle.handlers.register(G1EP, G1EPHandler, base=True)
 jsonpickle.handlers.register(G2EP, G2EPHandler, base=True)
 jsonpickle.handlers.register(GtEP, GtEPHandler, base=True)
+
+
+#
+# Size of serialized objects.
+#
+
+
+def size_report(obj: Any) -> Dict[str, int]:
+    """Number of bytes taken by each type of value in the serialization of an object.
+
+    Petrelic values are reported by class name (e.g. "G1Element"), and the
+    rest of the serialization (class paths, field names, JSON syntax, ...)
+    under "other". Use it to find out what makes a message large.
+    """
+    flattened = jsonpickle.Pickler().flatten(obj)
+    report = {"total": len(json.dumps(flattened))}
+
+    def visit(node):
+        if isinstance(node, dict):
+            if "b64repr" in node and "py/object" in node:
+                name = node["py/object"].rsplit(".", 1)[-1]
+                report[name] = report.get(name, 0) + len(json.dumps(node))
+                return
+            for value in node.values():
+                visit(value)
+        elif isinstance(node, list):
+            for value in node:
+                visit(value)
+
+    visit(flattened)
+    report["other"] = report["total"] - sum(size for name, size in report.items() if name != "total")
+    return report
+
+
+def message_size_report(messages: Dict[str, Any]) -> Dict[str, Dict[str, int]]:
+    """Size report of each message of a protocol, by message type.
+
+    `messages` maps the type of each message (e.g. "issue_request" or
+    "disclosure_proof") to an instance of it, and the result maps it to the
+    `size_report` of this instance.
+    """
+    return {name: size_report(message) for name, message in messages.items()}
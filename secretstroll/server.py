@@ -6,6 +6,7 @@ Server entrypoint.
 """
 
 import argparse
+import base64
 import json
 from pathlib import Path
 import random
@@ -15,7 +16,9 @@ from typing import Dict, List, Union
 from flask import Flask, jsonify, make_response, request
 from flask_sqlalchemy import SQLAlchemy
 
-from stroll import Server
+from batching import RequestBatcher
+from caching import cache_of
+from stroll import Server, WorkerPool
 
 
 APP = Flask(__name__)
@@ -25,6 +28,8 @@ DB = SQLAlchemy()
 PUBLIC_KEY = None
 SECRET_KEY = None
 SERVER = None
+BATCHER = None
+POOL = None
 
 
 def main(args: List[str]) -> None:
@@ -85,6 +90,27 @@ def main(args: List[str]) -> None:
         type=argparse.FileType("rb")
     )
 
+    parser_run.add_argument(
+        "-b",
+        "--batch-window",
+        help="Verify the signatures of requests arriving within this window (in ms) as a batch.",
+        default=0.0,
+        type=float
+    )
+    parser_run.add_argument(
+        "--batch-size",
+        help="Maximal number of signatures verified in a batch.",
+        default=64,
+        type=int
+    )
+    parser_run.add_argument(
+        "-w",
+        "--workers",
+        help="Number of worker processes verifying signatures and registrations.",
+        default=1,
+        type=int
+    )
+
     parser_run.set_defaults(callback=server_run)
 
     namespace = parser.parse_args(args)
@@ -121,30 +147,83 @@ def server_setup(args: argparse.Namespace) -> None:
 def server_run(args: argparse.Namespace) -> None:
     """Handle `run` subcommand."""
 
-    # pylint: disable=global-statement
-    global PUBLIC_KEY
-    global SECRET_KEY
-    global SERVER
-
     try:
-        PUBLIC_KEY = args.pub.read()
-        SECRET_KEY = args.sec.read()
+        public_key = args.pub.read()
+        secret_key = args.sec.read()
 
     finally:
         args.pub.close()
         args.sec.close()
 
-    db_path = args.database.resolve()
+    configure(
+        public_key,
+        secret_key,
+        args.database,
+        workers=args.workers,
+        batch_window=args.batch_window,
+        batch_size=args.batch_size
+    )
+
+    host = "0.0.0.0"
+    port = 8080
+
+    # Requests are handled concurrently so that the workers and batches are used.
+    threaded = args.workers > 1 or args.batch_window > 0
+    APP.run(host=host, port=port, debug=True, threaded=threaded, processes=1)
+
+
+def configure(
+        public_key: bytes,
+        secret_key: bytes,
+        database: Path,
+        workers: int = 1,
+        batch_window: float = 0.0,
+        batch_size: int = 64
+    ) -> None:
+    """Set up the keys, the database, the worker processes and the batching of the application."""
+
+    # pylint: disable=global-statement
+    global PUBLIC_KEY
+    global SECRET_KEY
+    global SERVER
+    global BATCHER
+    global POOL
+
+    PUBLIC_KEY = public_key
+    SECRET_KEY = secret_key
+
+    db_path = database.resolve()
     APP.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{db_path}"
     APP.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     DB.init_app(APP)
 
     SERVER = Server()
+    SERVER.load_keys(SECRET_KEY, PUBLIC_KEY)
 
-    host = "0.0.0.0"
-    port = 8080
+    if workers > 1:
+        POOL = WorkerPool(SECRET_KEY, PUBLIC_KEY, workers)
+
+    if batch_window > 0:
+        if POOL is not None:
+            verify_batch = POOL.check_request_signatures
+        else:
+            verify_batch = lambda batch: get_server().check_request_signatures(PUBLIC_KEY, batch)
+        BATCHER = RequestBatcher(verify_batch, batch_window / 1000, batch_size, concurrency=workers)
+
+
+def get_server() -> Server:
+    """The server handling the requests, set up by `configure`."""
+    assert SERVER is not None, "The application is not configured."
+    return SERVER
 
-    APP.run(host=host, port=port, debug=True, threaded=False, processes=1)
+
+def check_signature(message: bytes, types: List[str], signature: bytes) -> bool:
+    """Verify the signature of a request, in a batch if batching is enabled."""
+    if BATCHER is not None:
+        return BATCHER.submit((message, types, signature))
+    if POOL is not None:
+        return POOL.check_request_signature(message, types, signature)
+    return get_server().check_request_signature(PUBLIC_KEY, message, types, signature)
 
 
 
@@ -189,6 +268,20 @@ def get_public_key():
     return PUBLIC_KEY, 200
 
 
+@APP.route("/stats", methods=["GET"])
+def get_stats():
+    """Statistics of the cache of signature verifications, and of the batches."""
+    if POOL is not None:
+        cache = POOL.cache
+    else:
+        cache = cache_of(SERVER, "check_request_signature")
+    stats = {"verification_cache": cache.stats()}
+    if BATCHER is not None:
+        with BATCHER.lock:
+            stats["batches"] = {"batches": BATCHER.batches, "items": BATCHER.items}
+    return jsonify(stats)
+
+
 @APP.route("/register", methods=["POST"])
 def register():
     """Handle registrations."""
@@ -196,18 +289,67 @@ def register():
     subscriptions_raw = request.files.get("subscriptions").read().decode("utf-8")
     issuance_req = request.files.get("issuance_req").read()
     subscriptions = json.loads(subscriptions_raw)
-    registration_res = SERVER.process_registration(
-        SECRET_KEY,
-        PUBLIC_KEY,
-        issuance_req,
-        username,
-        subscriptions
-    )
+    try:
+        if POOL is not None:
+            registration_res = POOL.process_registration(issuance_req, username, subscriptions)
+        else:
+            registration_res = get_server().process_registration(
+                SECRET_KEY,
+                PUBLIC_KEY,
+                issuance_req,
+                username,
+                subscriptions
+            )
+    except ValueError:
+        # `Server.process_registration` rejects a registration with a ValueError, also raised
+        # back by the worker pool.
+        return "Registration rejected", 400
+    get_server().record_registration(username, subscriptions)
 
     server_res = make_response(registration_res)
     return server_res
 
 
+@APP.route("/register-batch", methods=["POST"])
+def register_batch():
+    """Handle batches of registrations.
+
+    The body is a JSON list of objects with the fields "username",
+    "subscriptions" and "issuance_req" (base64). The answer is the list of
+    registration responses (base64), with null for rejected registrations.
+    """
+    entries = request.get_json(silent=True)
+    if not isinstance(entries, list):
+        return "Expected a JSON list of registrations", 400
+    registrations = []
+    for entry in entries:
+        if not (
+                isinstance(entry, dict)
+                and isinstance(entry.get("issuance_req"), str)
+                and isinstance(entry.get("username"), str)
+                and isinstance(entry.get("subscriptions"), list)
+                and all(isinstance(subscription, str) for subscription in entry["subscriptions"])
+            ):
+            return "Malformed registration", 400
+        try:
+            issuance_req = base64.b64decode(entry["issuance_req"], validate=True)
+        except ValueError:
+            return "Malformed registration", 400
+        registrations.append((issuance_req, entry["username"], entry["subscriptions"]))
+
+    if POOL is not None:
+        responses = POOL.process_registrations(registrations)
+        for (_, username, subscriptions), response in zip(registrations, responses):
+            if response is not None:
+                SERVER.record_registration(username, subscriptions)
+    else:
+        responses = SERVER.process_registrations(SECRET_KEY, PUBLIC_KEY, registrations, workers=1)
+    return jsonify([
+        None if response is None else base64.b64encode(response).decode("utf-8")
+        for response in responses
+    ])
+
+
 def convert_loc_to_gridval(loc):
     """Placeholder function. Final function would convert the location to a grid value."""
     return int(loc)
@@ -223,9 +365,7 @@ def get_poi_loc():
     signature = request.files.get("signature").read()
     message = (f"{lat},{lon}").encode("utf-8")
 
-    valid = SERVER.check_request_signature(
-        PUBLIC_KEY, message, types, signature
-    )
+    valid = check_signature(message, types, signature)
 
     if not valid:
         return "Invalid signature", 401
@@ -258,9 +398,7 @@ def get_poi_list():
     signature = request.files.get("signature").read()
     message = (f"{cell_id}").encode("utf-8")
 
-    valid = SERVER.check_request_signature(
-        PUBLIC_KEY, message, types, signature
-    )
+    valid = check_signature(message, types, signature)
 
     if not valid:
         return "Invalid signature", 401
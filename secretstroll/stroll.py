@@ -2,13 +2,34 @@
 Classes that you need to complete.
 """
 
-from typing import Any, Dict, List, Union, Tuple
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Union, Tuple
 
-# Optional import
-from serialization import jsonpickle
+# Serialize the messages with `dumps` and parse them with `loads`: registered
+# classes use the compact binary format of `codec.py`, others use jsonpickle.
+from codec import dumps, loads
+
+from caching import VerificationCache, cached_batch_verification, cached_results, cached_verification
+from credential import PairingCache, fixed_pairings
+from precomputation import ProofPool
 
 # Type aliases
 State = Any
+Registration = Tuple[bytes, str, List[str]]
+
+
+@functools.lru_cache(maxsize=16)
+def decode_key(key: bytes) -> Any:
+    """Deserialize a key, only once per distinct serialized key.
+
+    The server receives its serialized keys with every request. Use this
+    function rather than `loads` to parse them, so that they are parsed once
+    and that their precomputations are kept between requests. The returned
+    object is shared between callers: do not modify it.
+    """
+    return loads(key)
 
 
 class Server:
@@ -42,7 +63,7 @@ class Server:
                 - server's secret key
                 - server's public information
             You are free to design this as you see fit, but the return types
-            should be encoded as bytes.
+            should be encoded as bytes, e.g. with `dumps`.
         """
         ###############################################
         # TODO: Complete this function.
@@ -71,6 +92,11 @@ class Server:
         Return:
             serialized response (the client should be able to build a
                 credential with this response).
+
+        With `--workers`, this method runs on a copy of the server in a worker
+        process, whose state is lost: keep the state of the registrations in
+        `record_registration`, which runs on the server handling the requests.
+        Raise a ValueError to reject a registration.
         """
         ###############################################
         # TODO: Complete this function.
@@ -78,6 +104,88 @@ class Server:
         raise NotImplementedError
 
 
+    def record_registration(self, username: str, subscriptions: List[str]) -> None:
+        """ Keep the state of an accepted registration on this server
+
+        Args:
+            username: username
+            subscriptions: attributes
+
+        Called on the server handling the requests after `process_registration`
+        accepted a registration, wherever it ran. The registrations are kept in
+        `self.registrations`, by username.
+        """
+        self.__dict__.setdefault("registrations", dict())[username] = list(subscriptions)
+
+
+    def process_registrations(
+            self,
+            server_sk: bytes,
+            server_pk: bytes,
+            registrations: List[Registration],
+            workers: Optional[int] = None
+        ) -> List[Optional[bytes]]:
+        """ Registers many new accounts on the server at once.
+
+        Args:
+            server_sk: the server's secret key (serialized)
+            server_pk: the server's public key (serialized)
+            registrations: list of (issuance request, username, subscriptions)
+                as given to `process_registration`
+            workers: number of worker processes (default: number of CPUs)
+
+        Return:
+            the serialized response to each registration, or None if it was
+                rejected.
+
+        The registrations are split between worker processes, each parsing
+        the keys once and calling `process_registration`. The worker processes
+        are started by the first call, and kept for the next ones. A
+        registration is rejected if `process_registration` raises a
+        ValueError, and the accepted ones are passed to `record_registration`.
+        """
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(registrations) <= 1:
+            responses = [self._try_registration(server_sk, server_pk, *reg) for reg in registrations]
+        else:
+            responses = self.worker_pool(server_sk, server_pk, workers).process_registrations(registrations)
+
+        for (_, username, subscriptions), response in zip(registrations, responses):
+            if response is not None:
+                self.record_registration(username, subscriptions)
+        return responses
+
+
+    def worker_pool(self, server_sk: bytes, server_pk: bytes, workers: int) -> "WorkerPool":
+        """ Pool of worker processes for the given keys, started once
+
+        Args:
+            server_sk: the server's secret key (serialized)
+            server_pk: the server's public key (serialized)
+            workers: number of worker processes
+        """
+        pools = self.__dict__.setdefault("_worker_pools", dict())
+        if (server_sk, server_pk, workers) not in pools:
+            pools[(server_sk, server_pk, workers)] = WorkerPool(server_sk, server_pk, workers)
+        return pools[(server_sk, server_pk, workers)]
+
+
+    def _try_registration(
+            self,
+            server_sk: bytes,
+            server_pk: bytes,
+            issuance_request: bytes,
+            username: str,
+            subscriptions: List[str]
+        ) -> Optional[bytes]:
+        try:
+            return self.process_registration(server_sk, server_pk, issuance_request, username, subscriptions)
+        except ValueError:
+            # Rejected registration, e.g. a `codec.CodecError` for a malformed request.
+            return None
+
+
+    @cached_verification(maxsize=4096, ttl=300)
     def check_request_signature(
         self,
         server_pk: bytes,
@@ -95,6 +203,11 @@ class Server:
 
         Returns:
             whether a signature is valid
+
+        The results are cached for retried requests, with those of
+        `check_request_signatures`: the hit rate is given by
+        `caching.cache_of(self, "check_request_signature").stats()`, and by the
+        `/stats` endpoint of the server.
         """
         ###############################################
         # TODO: Complete this function.
@@ -102,6 +215,176 @@ class Server:
         raise NotImplementedError
 
 
+    def load_keys(self, server_sk: bytes, server_pk: bytes) -> None:
+        """ Parse the server's keys once, when the server starts.
+
+        Args:
+            server_sk: the server's secret key (serialized)
+            server_pk: the server's public key (serialized)
+
+        The parsed keys are kept in `self.secret_key` and `self.public_key`,
+        and `decode_key` returns them for the serialized keys passed to the
+        other methods.
+        """
+        self.secret_key = decode_key(server_sk)
+        self.public_key = decode_key(server_pk)
+
+
+    def pairing_cache(self, server_pk: bytes) -> PairingCache:
+        """ Cache of the fixed pairings of a public key, built once per key
+
+        Args:
+            server_pk: the server's public key (serialized)
+
+        Returns:
+            a `credential.PairingCache` to pass to `credential.pairing_product`
+            in `check_request_signature` and `check_request_signatures`.
+
+        The cache recognizes the elements of the key returned by `decode_key`:
+        write the verification equations with this object.
+        """
+        caches = self.__dict__.setdefault("_pairing_caches", dict())
+        key = decode_key(server_pk)
+        if server_pk not in caches or caches[server_pk][0] is not key:
+            caches[server_pk] = (key, PairingCache(fixed_pairings(key)))
+        return caches[server_pk][1]
+
+
+    @cached_batch_verification("check_request_signature")
+    def check_request_signatures(
+        self,
+        server_pk: bytes,
+        requests: List[Tuple[bytes, List[str], bytes]]
+        ) -> List[bool]:
+        """ Verify the signatures of many location requests at once
+
+        Args:
+            server_pk: the server's public key (serialized)
+            requests: list of (message, revealed attributes, signature) as
+                given to `check_request_signature`
+
+        Returns:
+            whether each signature is valid
+
+        By default, each signature is verified on its own. Check the revealed
+        attributes and use `credential.batch_verify_disclosure_proofs`, with
+        `self.pairing_cache(server_pk)`, to verify them as a batch. Deserialize
+        each signature in its own try block, so that a malformed request is
+        invalid without failing the others.
+
+        The results are cached with those of `check_request_signature`: this
+        method is only called with the requests missing from the cache.
+        """
+        # The decorator caches the results: verify each signature without looking it up again.
+        check_request_signature = Server.check_request_signature.__wrapped__ # type: ignore
+        results = []
+        for message, revealed_attributes, signature in requests:
+            try:
+                results.append(
+                    check_request_signature(self, server_pk, message, revealed_attributes, signature)
+                )
+            except NotImplementedError:
+                raise
+            except Exception: # pylint: disable=broad-except
+                # A malformed request is invalid, it must not fail the other requests of the batch.
+                results.append(False)
+        return results
+
+
+# Server of a worker process of a `WorkerPool`, with its keys.
+_WORKER: Optional[Tuple[Server, bytes, bytes]] = None
+
+
+def _init_worker(server_sk: bytes, server_pk: bytes) -> None:
+    # pylint: disable=global-statement
+    global _WORKER
+    server = Server()
+    server.load_keys(server_sk, server_pk)
+    _WORKER = (server, server_sk, server_pk)
+
+
+def _process_registration_in_worker(registration: Registration) -> bytes:
+    server, server_sk, server_pk = _WORKER # type: ignore
+    return server.process_registration(server_sk, server_pk, *registration)
+
+
+def _try_registration_in_worker(registration: Registration) -> Optional[bytes]:
+    server, server_sk, server_pk = _WORKER # type: ignore
+    return server._try_registration(server_sk, server_pk, *registration) # pylint: disable=protected-access
+
+
+def _check_request_signatures_in_worker(requests: List[Tuple[bytes, List[str], bytes]]) -> List[bool]:
+    server, _, server_pk = _WORKER # type: ignore
+    if len(requests) == 1:
+        return [server.check_request_signature(server_pk, *requests[0])]
+    return server.check_request_signatures(server_pk, requests)
+
+
+class WorkerPool:
+    """Pool of worker processes, each with its own `Server` and parsed keys.
+
+    Registrations and signature checks are sent to the workers, so that they
+    run on several cores. Each worker parses the keys when it starts, and
+    keeps their precomputations for all the requests it handles. The state
+    of the workers' servers is lost: pass the accepted registrations to
+    `Server.record_registration` of the server handling the requests.
+
+    The results of the signature checks are cached in this process, in
+    `self.cache`, so that retried requests are not sent to the workers.
+    """
+
+    def __init__(self, server_sk: bytes, server_pk: bytes, workers: Optional[int] = None):
+        self.server_pk = server_pk
+        self.cache = VerificationCache(maxsize=4096, ttl=300)
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(server_sk, server_pk)
+        )
+
+
+    def process_registration(
+            self,
+            issuance_request: bytes,
+            username: str,
+            subscriptions: List[str]
+        ) -> bytes:
+        """Run `Server.process_registration` in a worker."""
+        registration = (issuance_request, username, subscriptions)
+        return self.executor.submit(_process_registration_in_worker, registration).result()
+
+
+    def process_registrations(self, registrations: List[Registration]) -> List[Optional[bytes]]:
+        """Split registrations between the workers, as `Server.process_registrations`."""
+        chunksize = max(1, len(registrations) // (4 * self.workers))
+        return list(self.executor.map(_try_registration_in_worker, registrations, chunksize=chunksize))
+
+
+    def check_request_signature(
+            self,
+            message: bytes,
+            revealed_attributes: List[str],
+            signature: bytes
+        ) -> bool:
+        """Run `Server.check_request_signature` in a worker."""
+        return self.check_request_signatures([(message, revealed_attributes, signature)])[0]
+
+
+    def check_request_signatures(self, requests: List[Tuple[bytes, List[str], bytes]]) -> List[bool]:
+        """Run `Server.check_request_signatures` in a worker, for the requests missing from the cache."""
+        return cached_results(
+            self.cache,
+            self.server_pk,
+            requests,
+            lambda missing: self.executor.submit(_check_request_signatures_in_worker, missing).result()
+        )
+
+
+    def shutdown(self) -> None:
+        self.executor.shutdown()
+
+
 class Client:
     """Client"""
 
@@ -186,3 +469,84 @@ class Client:
         # TODO: Complete this function.
         ###############################################
         raise NotImplementedError
+
+
+    def precompute_request(
+            self,
+            server_pk: bytes,
+            credentials: bytes,
+            types: List[str]
+        ) -> bytes:
+        """Precompute the part of a request signature which does not depend
+        on the message, e.g. the rerandomized credential and the commitments
+        of the proof.
+
+        Arg:
+            server_pk: a server's public key (serialized)
+            credential: client's credential (serialized)
+            types: which attributes should be sent along with the request?
+
+        Returns:
+            A precomputation (serialized), to be used for a single request.
+        """
+        ###############################################
+        # TODO: Complete this function.
+        ###############################################
+        raise NotImplementedError
+
+
+    def finish_request(
+            self,
+            server_pk: bytes,
+            credentials: bytes,
+            precomputation: bytes,
+            message: bytes
+        ) -> bytes:
+        """Signs the request with a precomputation from `precompute_request`.
+
+        Arg:
+            server_pk: a server's public key (serialized)
+            credential: client's credential (serialized)
+            precomputation: precomputation (serialized)
+            message: message to sign
+
+        Returns:
+            A message's signature (serialized), as from `sign_request`.
+        """
+        ###############################################
+        # TODO: Complete this function.
+        ###############################################
+        raise NotImplementedError
+
+
+    def sign_request_with_pool(
+            self,
+            server_pk: bytes,
+            credentials: bytes,
+            message: bytes,
+            types: List[str],
+            pool: ProofPool
+        ) -> bytes:
+        """Signs the request with a precomputation from the pool, or as usual
+        if the pool holds none for these types.
+
+        Arg:
+            server_pk: a server's public key (serialized)
+            credential: client's credential (serialized)
+            message: message to sign
+            types: which attributes should be sent along with the request?
+            pool: pool of precomputations from `precompute_request`
+
+        Returns:
+            A message's signature (serialized)
+
+        The request is also signed as usual while `finish_request` is not
+        implemented.
+        """
+        precomputation = pool.take(types)
+        if precomputation is not None:
+            try:
+                return self.finish_request(server_pk, credentials, precomputation, message)
+            except NotImplementedError:
+                pass
+        return self.sign_request(server_pk, credentials, message, types)
@@ -0,0 +1,38 @@
+"""
+WSGI entrypoint of the server, for production WSGI servers.
+
+The server is configured with environment variables:
+    SECRETSTROLL_PUB: file containing the public key (default: key.pub)
+    SECRETSTROLL_SEC: file containing the secret key (default: key.sec)
+    SECRETSTROLL_DATABASE: path to the PoI database (default: fingerprint.db)
+    SECRETSTROLL_WORKERS: number of worker processes verifying signatures and
+        registrations (default: 1)
+    SECRETSTROLL_BATCH_WINDOW: window in ms within which signatures are
+        verified as a batch (default: 0, no batching)
+    SECRETSTROLL_BATCH_SIZE: maximal number of signatures in a batch (default: 64)
+
+Example, with a threaded WSGI server:
+    SECRETSTROLL_WORKERS=4 gunicorn --threads 32 -b 0.0.0.0:8080 wsgi:app
+"""
+
+import os
+from pathlib import Path
+
+import server
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as fd:
+        return fd.read()
+
+
+server.configure(
+    _read(os.environ.get("SECRETSTROLL_PUB", "key.pub")),
+    _read(os.environ.get("SECRETSTROLL_SEC", "key.sec")),
+    Path(os.environ.get("SECRETSTROLL_DATABASE", "fingerprint.db")),
+    workers=int(os.environ.get("SECRETSTROLL_WORKERS", "1")),
+    batch_window=float(os.environ.get("SECRETSTROLL_BATCH_WINDOW", "0")),
+    batch_size=int(os.environ.get("SECRETSTROLL_BATCH_SIZE", "64"))
+)
+
+app = server.APP
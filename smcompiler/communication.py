@@ -3,13 +3,19 @@ Utilities for client communication with the trusted server.
 You should not need to change this file.
 """
 
+import base64
+import copy
 import json
 import time
-from typing import Union, Tuple
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Dict, List, Optional, Union, Tuple
 
 import requests
 
-from secret_sharing import Share
+from compression import ACCEPT_HEADER, CompressionStats, decode_body, encode_body, ENCODINGS
+from multiplex import MultiplexClient
+from secret_sharing import expand_seeded_shares, Share
+from shamir import ShamirShare
 
 
 def sanitize_url_param(url_param: Union[bytes, str]) -> str:
@@ -36,6 +42,13 @@ class Communication:
         client_id: Identifier of this client
         poll_delay: delay between requests in seconds (default: 0.2 s)
         protocol: network protocol to use (default: "http")
+        label_prefix: prefix namespacing labels and operation IDs, allowing the same protocol to
+            be executed several times (default: no prefix)
+        multiplex_port: port of the multiplexed endpoint of the server. If given, all messages go
+            through a single persistent connection, over which the server pushes messages as soon as
+            they are available, instead of HTTP requests (default: use HTTP)
+        compression: encoding of the large bodies sent to the server ("deflate", or "zstd" if
+            available), also enabling compressed answers (default: no compression)
     """
 
     def __init__(
@@ -44,11 +57,105 @@ class Communication:
             server_port: int,
             client_id: str,
             poll_delay: float = 0.2,
-            protocol: str = "http"
+            protocol: str = "http",
+            label_prefix: str = "",
+            multiplex_port: Optional[int] = None,
+            compression: Optional[str] = None
     ):
+        if compression is not None and compression not in ENCODINGS:
+            raise ValueError(f"Unsupported compression {compression}.")
+
         self.base_url = f"{protocol}://{server_host}:{server_port}"
         self.client_id = client_id
         self.poll_delay = poll_delay
+        self.label_prefix = label_prefix
+        self.compression = compression
+        self.compression_stats = CompressionStats()
+        self.decompression_stats = CompressionStats()
+        self.multiplex = (
+            MultiplexClient(server_host, multiplex_port, self.decompression_stats)
+            if multiplex_port is not None else None
+        )
+
+
+    def _prefixed(self, label: Union[bytes, str]) -> str:
+        """
+        Sanitize a label or operation ID, and namespace it with the label prefix.
+        """
+        label_san = sanitize_url_param(label)
+        if self.label_prefix:
+            return f"{sanitize_url_param(self.label_prefix)}-{label_san}"
+        return label_san
+
+
+    def with_prefix(self, prefix: str) -> "Communication":
+        """
+        Return a view of this communication whose labels are further namespaced by `prefix`.
+
+        The view shares the multiplexed connection and the compression statistics of this
+        communication, so that concurrent executions do not each open their own connection.
+        """
+        view = copy.copy(self)
+        view.label_prefix = f"{self.label_prefix}-{prefix}" if self.label_prefix else prefix
+        return view
+
+
+    def _post(self, url: str, message: Union[bytes, str]) -> None:
+        """
+        Send a body to the server, compressed if large enough.
+        """
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        body, encoding = encode_body(message, self.compression, self.compression_stats)
+        headers = {"Content-Encoding": encoding} if encoding is not None else None
+        requests.post(url, body, headers=headers)
+
+
+    def _get(self, url: str) -> Tuple[int, bytes]:
+        """
+        Retrieve a body from the server, and return the status code and the decompressed body.
+        """
+        if self.compression is None:
+            res = requests.get(url)
+            return res.status_code, res.content
+
+        # Read the raw body, to decompress it and record statistics ourselves.
+        res = requests.get(url, headers={ACCEPT_HEADER: ", ".join(ENCODINGS)}, stream=True)
+        raw = res.raw.read(decode_content=False)
+        return res.status_code, decode_body(
+            raw, res.headers.get("Content-Encoding"), self.decompression_stats
+        )
+
+
+    def _submit_multiplexed(
+            self,
+            header: Dict[str, Any],
+            message: Union[bytes, str] = b""
+        ) -> Future:
+        """
+        Send a request over the multiplexed connection.
+        """
+        if isinstance(message, str):
+            message = message.encode("utf-8")
+        header = dict(header)
+        if self.compression is not None:
+            header["accept"] = ", ".join(ENCODINGS)
+            message, encoding = encode_body(message, self.compression, self.compression_stats)
+            if encoding is not None:
+                header["encoding"] = encoding
+        print(f"MUX  {header}")
+        return self.multiplex.request(header, message) # type: ignore
+
+
+    def _request_multiplexed(
+            self,
+            header: Dict[str, Any],
+            message: Union[bytes, str] = b""
+        ) -> bytes:
+        """
+        Send a request over the multiplexed connection, and wait for its answer.
+        """
+        return self._submit_multiplexed(header, message).result()
 
 
     def send_private_message(
@@ -63,11 +170,18 @@ class Communication:
 
         client_id_san = sanitize_url_param(self.client_id)
         receiver_id_san = sanitize_url_param(receiver_id)
-        label_san = sanitize_url_param(label)
+        label_san = self._prefixed(label)
+
+        if self.multiplex is not None:
+            self._request_multiplexed(
+                {"op": "send", "sender": client_id_san, "receiver": receiver_id_san, "label": label_san},
+                message
+            )
+            return
 
         url = f"{self.base_url}/private/{client_id_san}/{receiver_id_san}/{label_san}"
         print(f"POST {url}")
-        requests.post(url, message)
+        self._post(url, message)
 
 
     def retrieve_private_message(
@@ -79,16 +193,61 @@ class Communication:
         """
 
         client_id_san = sanitize_url_param(self.client_id)
-        label_san = sanitize_url_param(label)
+        label_san = self._prefixed(label)
+
+        if self.multiplex is not None:
+            return self._request_multiplexed(
+                {"op": "retrieve_private", "receiver": client_id_san, "label": label_san}
+            )
 
         url = f"{self.base_url}/private/{client_id_san}/{label_san}"
         # We can either use a websocket, or do some polling, but websockets would require asyncio.
         # So we are doing polling to avoid introducing a new programming paradigm.
         while True:
             print(f"GET  {url}")
-            res = requests.get(url)
-            if res.status_code == 200:
-                return res.content
+            status, content = self._get(url)
+            if status == 200:
+                return content
+            time.sleep(self.poll_delay)
+
+
+    def retrieve_first_private_messages(
+            self,
+            labels: List[str],
+            count: int
+        ) -> Dict[str, bytes]:
+        """
+        Retrieve at least `count` available private messages among the given labels, without
+        waiting for the others. This lets a party ignore stragglers.
+        """
+
+        client_id_san = sanitize_url_param(self.client_id)
+        received: Dict[str, bytes] = dict()
+
+        if self.multiplex is not None:
+            pending = {
+                self._submit_multiplexed(
+                    {"op": "retrieve_private", "receiver": client_id_san, "label": self._prefixed(label)}
+                ): label
+                for label in labels
+            }
+            while len(received) < count:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    received[pending.pop(future)] = future.result()
+            return received
+
+        remaining = list(labels)
+        while True:
+            for label in list(remaining):
+                url = f"{self.base_url}/private/{client_id_san}/{self._prefixed(label)}"
+                print(f"GET  {url}")
+                status, content = self._get(url)
+                if status == 200:
+                    received[label] = content
+                    remaining.remove(label)
+                    if len(received) >= count:
+                        return received
             time.sleep(self.poll_delay)
 
 
@@ -102,11 +261,18 @@ class Communication:
         """
 
         client_id_san = sanitize_url_param(self.client_id)
-        label_san = sanitize_url_param(label)
+        label_san = self._prefixed(label)
+
+        if self.multiplex is not None:
+            self._request_multiplexed(
+                {"op": "publish", "sender": client_id_san, "label": label_san},
+                message
+            )
+            return
 
         url = f"{self.base_url}/public/{client_id_san}/{label_san}"
         print(f"POST {url}")
-        requests.post(url, message)
+        self._post(url, message)
 
 
     def retrieve_public_message(
@@ -120,7 +286,12 @@ class Communication:
 
         client_id_san = sanitize_url_param(self.client_id)
         sender_id_san = sanitize_url_param(sender_id)
-        label_san = sanitize_url_param(label)
+        label_san = self._prefixed(label)
+
+        if self.multiplex is not None:
+            return self._request_multiplexed(
+                {"op": "retrieve_public", "sender": sender_id_san, "label": label_san}
+            )
 
         url = f"{self.base_url}/public/{client_id_san}/{sender_id_san}/{label_san}"
 
@@ -128,9 +299,9 @@ class Communication:
         # So we are doing polling to avoid introducing a new programming paradigm.
         while True:
             print(f"GET  {url}")
-            res = requests.get(url)
-            if res.status_code == 200:
-                return res.content
+            status, content = self._get(url)
+            if status == 200:
+                return content
             time.sleep(self.poll_delay)
 
 
@@ -143,10 +314,96 @@ class Communication:
         """
 
         client_id_san = sanitize_url_param(self.client_id)
-        op_id_san = sanitize_url_param(op_id)
+        op_id_san = self._prefixed(op_id)
+
+        if self.multiplex is not None:
+            content = json.loads(self._request_multiplexed(
+                {"op": "shares", "client": client_id_san, "op_id": op_id_san}
+            ))
+        else:
+            url = f"{self.base_url}/shares/{client_id_san}/{op_id_san}"
+            print(f"GET  {url}")
+            content = json.loads(self._get(url)[1])
+
+        return tuple([Share.deserialize(s) for s in content]) # type: ignore
+
+
+    def retrieve_inner_product_shares(
+            self,
+            op_id: str,
+            length: int
+        ) -> Tuple[List[int], List[int], int]:
+        """
+        Retrieve shares of two random vectors and of their inner product generated by the trusted
+        server. The shares are given by their values modulo `TrustedParamGenerator.modulus`.
+        """
+
+        client_id_san = sanitize_url_param(self.client_id)
+        op_id_san = self._prefixed(op_id)
+
+        if self.multiplex is not None:
+            content = json.loads(self._request_multiplexed(
+                {"op": "inner_product_shares", "client": client_id_san, "op_id": op_id_san, "length": length}
+            ))
+        else:
+            url = f"{self.base_url}/shares/{client_id_san}/{op_id_san}/{length}"
+            print(f"GET  {url}")
+            content = json.loads(self._get(url)[1])
+
+        a_shares, b_shares, c_share = content
+        return [int(s) for s in a_shares], [int(s) for s in b_shares], int(c_share)
+
+
+    def retrieve_seeded_beaver_triplet_shares(
+            self,
+            op_id: str
+        ) -> Tuple[int, int, int]:
+        """
+        Retrieve a seed-compressed triplet of shares generated by the trusted server, and expand it
+        locally. The shares are given by their values modulo `TrustedParamGenerator.modulus`.
+        """
 
-        url = f"{self.base_url}/shares/{client_id_san}/{op_id_san}"
-        print(f"GET  {url}")
+        client_id_san = sanitize_url_param(self.client_id)
+        op_id_san = self._prefixed(op_id)
+
+        if self.multiplex is not None:
+            content = json.loads(self._request_multiplexed(
+                {"op": "seeded_shares", "client": client_id_san, "op_id": op_id_san}
+            ))
+        else:
+            url = f"{self.base_url}/seeded-shares/{client_id_san}/{op_id_san}"
+            print(f"GET  {url}")
+            content = json.loads(self._get(url)[1])
+
+        a_share, b_share, c_share = expand_seeded_shares(
+            base64.b64decode(content["seed"]), 3, int(content["modulus"])
+        )
+        if content["correction"] is not None:
+            c_share = int(content["correction"])
+        return a_share, b_share, c_share
+
+
+    def retrieve_double_shares(
+            self,
+            op_id: str,
+            threshold: int
+        ) -> Tuple[ShamirShare, ShamirShare]:
+        """
+        Retrieve shares of degree threshold and 2 * threshold of a random value generated by the
+        trusted server, for the degree reduction of the Shamir backend.
+        """
+
+        client_id_san = sanitize_url_param(self.client_id)
+        op_id_san = self._prefixed(op_id)
+
+        if self.multiplex is not None:
+            content = json.loads(self._request_multiplexed(
+                {"op": "double_shares", "client": client_id_san, "op_id": op_id_san, "threshold": threshold}
+            ))
+        else:
+            url = f"{self.base_url}/double-shares/{client_id_san}/{op_id_san}/{threshold}"
+            print(f"GET  {url}")
+            content = json.loads(self._get(url)[1])
 
-        res = requests.get(url)
-        return tuple([Share.deserialize(s) for s in json.loads(res.text)]) # type: ignore
+        r_share, r2_share = content
+        return ShamirShare.deserialize(r_share), ShamirShare.deserialize(r2_share)
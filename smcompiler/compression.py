@@ -0,0 +1,188 @@
+"""
+Compression of large message bodies exchanged with the trusted server.
+You should not need to change this file.
+
+Bodies smaller than a threshold are sent as is. Larger bodies are compressed with the best
+encoding supported by both sides: "zstd" if the `zstandard` library is installed, and "deflate"
+(zlib) otherwise. Request bodies carry the standard `Content-Encoding` HTTP header. Responses
+are only compressed for clients listing the encodings they accept in the `ACCEPT_HEADER` header:
+HTTP libraries send `Accept-Encoding` by default, which must not turn compression on.
+"""
+
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Bodies smaller than this number of bytes are not compressed.
+COMPRESSION_THRESHOLD = 1024
+
+# Bodies decompressing to more than this number of bytes are rejected, so that a small compressed
+# body cannot exhaust the memory of its receiver.
+MAX_DECOMPRESSED_SIZE = 64 * 2 ** 20
+
+# Header in which a client opts in to compressed responses, listing the encodings it accepts.
+ACCEPT_HEADER = "X-SMC-Accept-Encoding"
+
+# Supported encodings, by order of preference.
+ENCODINGS = ("zstd", "deflate") if zstandard is not None else ("deflate",)
+
+
+class CompressionStats:
+    """
+    Compression ratio and CPU cost of the compressed and decompressed bodies.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.messages = 0
+        self.compressed_messages = 0
+        self.raw_bytes = 0
+        self.wire_bytes = 0
+        self.cpu_seconds = 0.0
+
+
+    def record(self, raw_size: int, wire_size: int, cpu_seconds: float, compressed: bool) -> None:
+        with self.lock:
+            self.messages += 1
+            self.compressed_messages += int(compressed)
+            self.raw_bytes += raw_size
+            self.wire_bytes += wire_size
+            self.cpu_seconds += cpu_seconds
+
+
+    @property
+    def ratio(self) -> float:
+        """
+        Ratio of the raw size to the transmitted size of the bodies.
+        """
+        return self.raw_bytes / self.wire_bytes if self.wire_bytes else 1.0
+
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "messages": self.messages,
+                "compressed_messages": self.compressed_messages,
+                "raw_bytes": self.raw_bytes,
+                "wire_bytes": self.wire_bytes,
+                "ratio": self.ratio,
+                "cpu_seconds": self.cpu_seconds,
+                "cpu_seconds_per_message": self.cpu_seconds / self.messages if self.messages else 0.0,
+            }
+
+
+def negotiate(accepted: Optional[str], supported: Iterable[str] = ENCODINGS) -> Optional[str]:
+    """
+    Choose the preferred supported encoding among a comma-separated list of accepted encodings.
+    """
+    if not accepted:
+        return None
+    names = {part.split(";")[0].strip().lower() for part in accepted.split(",")}
+    for encoding in supported:
+        if encoding in names:
+            return encoding
+    return None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "deflate":
+        return zlib.compress(data)
+    if encoding == "zstd" and zstandard is not None:
+        return zstandard.ZstdCompressor().compress(data)
+    raise ValueError(f"Unsupported encoding {encoding}.")
+
+
+class BodyTooLarge(ValueError):
+    """
+    A compressed body decompresses to more than the maximal size.
+    """
+
+
+def decompress(data: bytes, encoding: str, max_size: int = MAX_DECOMPRESSED_SIZE) -> bytes:
+    """
+    Decompress data, without ever holding more than max_size + 1 decompressed bytes.
+    """
+    if encoding == "deflate":
+        decompressor = zlib.decompressobj()
+        raw = decompressor.decompress(data, max_size + 1)
+        if len(raw) > max_size or decompressor.unconsumed_tail:
+            raise BodyTooLarge(f"The body decompresses to more than {max_size} bytes.")
+        if not decompressor.eof:
+            raise ValueError("The compressed body is truncated.")
+        return raw
+    if encoding == "zstd" and zstandard is not None:
+        chunks = []
+        size = 0
+        with zstandard.ZstdDecompressor().stream_reader(data) as reader:
+            while True:
+                chunk = reader.read(max_size + 1 - size)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > max_size:
+                    raise BodyTooLarge(f"The body decompresses to more than {max_size} bytes.")
+        return b"".join(chunks)
+    raise ValueError(f"Unsupported encoding {encoding}.")
+
+
+def encode_body(
+        data: bytes,
+        encoding: Optional[str],
+        stats: Optional[CompressionStats] = None,
+        threshold: int = COMPRESSION_THRESHOLD
+    ) -> Tuple[bytes, Optional[str]]:
+    """
+    Compress a body if an encoding is given and the body is large enough.
+
+    Returns the body to send and the encoding actually used, if any.
+    """
+    if encoding is None or len(data) < threshold:
+        if stats is not None:
+            stats.record(len(data), len(data), 0.0, False)
+        return data, None
+
+    # CPU time of this thread only, so that concurrent requests do not inflate each other's time.
+    start = time.thread_time()
+    compressed = compress(data, encoding)
+    elapsed = time.thread_time() - start
+
+    # Incompressible data is sent as is.
+    if len(compressed) >= len(data):
+        if stats is not None:
+            stats.record(len(data), len(data), elapsed, False)
+        return data, None
+
+    if stats is not None:
+        stats.record(len(data), len(compressed), elapsed, True)
+    return compressed, encoding
+
+
+def decode_body(
+        data: bytes,
+        encoding: Optional[str],
+        stats: Optional[CompressionStats] = None,
+        max_size: int = MAX_DECOMPRESSED_SIZE
+    ) -> bytes:
+    """
+    Decompress a body sent with the given encoding, if any.
+
+    Raises `BodyTooLarge` if the body decompresses to more than max_size bytes.
+    """
+    if not encoding or encoding == "identity":
+        if stats is not None:
+            stats.record(len(data), len(data), 0.0, False)
+        return data
+
+    start = time.thread_time()
+    raw = decompress(data, encoding, max_size)
+    if stats is not None:
+        stats.record(len(raw), len(data), time.thread_time() - start, True)
+    return raw
@@ -0,0 +1,375 @@
+"""
+Static cost estimation of an SMC protocol before its execution.
+
+Example:
+>>> alice_secret, bob_secret = Secret(), Secret()
+>>> spec = ProtocolSpec(["Alice", "Bob"], InnerProduct([alice_secret], [bob_secret]))
+>>> report = estimate_cost(spec)
+>>> report.secret_inputs, report.inner_products, report.multiplicative_depth, report.rounds
+(2, 1, 1, 3)
+
+The estimator visits the expression tree of the protocol, and needs a visitor method for each
+class of expression, named after the class (e.g. `visit_inner_product` for `InnerProduct`).
+Binary operations named `Addition`/`Add`, `Subtraction`/`Sub` and `Multiplication`/`Mul`, whose
+operands are in `left` and `right` attributes, are supported.
+
+MODIFY THIS FILE to add visitor methods for other expression classes you defined.
+"""
+
+import argparse
+import importlib
+import json
+import re
+import sys
+from typing import Any, Dict, List, Set
+
+from expression import Expression, InnerProduct, Scalar, Secret
+from protocol import ProtocolSpec
+from secret_sharing import SEED_BYTES
+
+
+# Default size of a serialized share in a message, in bytes.
+SHARE_BYTES = 32
+
+# Rough size of the HTTP headers of a request and of its response, in bytes.
+MESSAGE_OVERHEAD_BYTES = 400
+
+# Rough size of the frame prefixes and JSON headers of a request and of its answer over the
+# multiplexed connection, in bytes (see `multiplex.py`).
+MULTIPLEX_OVERHEAD_BYTES = 150
+
+
+class CostReport:
+    """
+    Estimated cost of a protocol.
+
+    Attributes:
+        num_parties: number of participants
+        secret_inputs: number of distinct secrets
+        additions: number of additions and subtractions
+        scalar_multiplications: number of multiplications by a public value, computed locally
+        beaver_multiplications: number of multiplications of two secrets
+        inner_products: number of inner products with at least one product of two secrets
+        inner_product_terms: total number of products of two secrets in the inner products
+        multiplicative_depth: largest number of interactive multiplications on a path of the circuit
+    """
+
+    def __init__(self, num_parties: int):
+        self.num_parties = num_parties
+        self.secret_inputs = 0
+        self.additions = 0
+        self.scalar_multiplications = 0
+        self.beaver_multiplications = 0
+        self.inner_products = 0
+        self.inner_product_terms = 0
+        self.multiplicative_depth = 0
+
+
+    @property
+    def rounds(self) -> int:
+        """
+        Communication rounds: input sharing, one round per multiplicative layer, and output.
+        """
+        return self.multiplicative_depth + 2
+
+
+    @property
+    def opened_values(self) -> int:
+        """
+        Number of masked values each party publishes for multiplications.
+        """
+        return 2 * self.beaver_multiplications + 2 * self.inner_product_terms
+
+
+    def input_owners(self) -> int:
+        """
+        Number of parties sharing secrets, assuming the secrets are spread over the parties.
+        """
+        return min(self.secret_inputs, self.num_parties)
+
+
+    def messages(self, seeded_inputs: bool = False) -> int:
+        """
+        Number of requests a party sends to the server, ignoring polling retries.
+
+        With `seeded_inputs`, each party sends a single seed to each other party for all its
+        secrets, instead of a share of each secret.
+        """
+        others = self.num_parties - 1
+        inputs = self.input_owners() if seeded_inputs else self.secret_inputs
+        input_messages = inputs * others / self.num_parties * 2
+        opening_messages = (self.beaver_multiplications + self.inner_products) * (1 + others)
+        triplet_messages = self.beaver_multiplications + self.inner_products
+        output_messages = 1 + others
+        return round(input_messages + opening_messages + triplet_messages + output_messages)
+
+
+    @property
+    def messages_per_party(self) -> int:
+        """
+        Number of requests a party sends to the server, ignoring polling retries.
+        """
+        return self.messages()
+
+
+    def bytes_per_party(
+            self,
+            share_bytes: int = SHARE_BYTES,
+            message_overhead: int = MESSAGE_OVERHEAD_BYTES,
+            seeded_inputs: bool = False,
+            compression_ratio: float = 1.0,
+            multiplexed: bool = False
+        ) -> int:
+        """
+        Bytes a party sends and receives, on average, including the correlated randomness.
+
+        Args:
+            seeded_inputs: whether secrets are shared with seeds (see `share_secrets_seeded`)
+            compression_ratio: ratio of raw to compressed size of the shares in the bodies, as
+                reported by the compression statistics of a run (1 without compression)
+            multiplexed: whether messages go through the multiplexed connection, whose framing
+                replaces the HTTP headers counted by `message_overhead`
+        """
+        others = self.num_parties - 1
+        if seeded_inputs:
+            input_bytes = 2 * self.input_owners() * others / self.num_parties * SEED_BYTES
+            input_shares = 0.0
+        else:
+            input_bytes = 0.0
+            input_shares = 2 * self.secret_inputs * others / self.num_parties
+        opened_shares = self.opened_values * (1 + others)
+        randomness_shares = 3 * self.beaver_multiplications + 2 * self.inner_product_terms + self.inner_products
+        output_shares = 1 + others
+        shares = input_shares + opened_shares + randomness_shares + output_shares
+        overhead = MULTIPLEX_OVERHEAD_BYTES if multiplexed else message_overhead
+        return round(
+            shares * share_bytes / compression_ratio
+            + input_bytes
+            + self.messages(seeded_inputs) * overhead
+        )
+
+
+    def bytes_ttp(
+            self,
+            share_bytes: int = SHARE_BYTES,
+            message_overhead: int = MESSAGE_OVERHEAD_BYTES,
+            compression_ratio: float = 1.0,
+            multiplexed: bool = False
+        ) -> int:
+        """
+        Bytes the trusted parameter generator sends to all parties.
+        """
+        randomness_shares = 3 * self.beaver_multiplications + 2 * self.inner_product_terms + self.inner_products
+        requests = self.beaver_multiplications + self.inner_products
+        overhead = MULTIPLEX_OVERHEAD_BYTES if multiplexed else message_overhead
+        return round(
+            self.num_parties * (randomness_shares * share_bytes / compression_ratio + requests * overhead)
+        )
+
+
+    def to_dict(
+            self,
+            share_bytes: int = SHARE_BYTES,
+            message_overhead: int = MESSAGE_OVERHEAD_BYTES,
+            seeded_inputs: bool = False,
+            compression_ratio: float = 1.0,
+            multiplexed: bool = False
+        ) -> Dict[str, Any]:
+        return {
+            "num_parties": self.num_parties,
+            "secret_inputs": self.secret_inputs,
+            "additions": self.additions,
+            "scalar_multiplications": self.scalar_multiplications,
+            "beaver_multiplications": self.beaver_multiplications,
+            "inner_products": self.inner_products,
+            "inner_product_terms": self.inner_product_terms,
+            "multiplicative_depth": self.multiplicative_depth,
+            "rounds": self.rounds,
+            "messages_per_party": self.messages(seeded_inputs),
+            "bytes_per_party": self.bytes_per_party(
+                share_bytes, message_overhead, seeded_inputs, compression_ratio, multiplexed
+            ),
+            "bytes_ttp": self.bytes_ttp(share_bytes, message_overhead, compression_ratio, multiplexed),
+        }
+
+
+class CostEstimator:
+    """
+    Visitor counting the operations of an expression.
+
+    Each `visit_*` method updates the report and returns the multiplicative depth of the visited
+    sub-expression.
+    """
+
+    def __init__(self, num_parties: int):
+        self.report = CostReport(num_parties)
+        self.seen_secrets: Set[bytes] = set()
+        self.public: Dict[int, bool] = dict()
+
+
+    def visit(self, expr: Expression) -> int:
+        name = re.sub(r"(?<!^)(?=[A-Z])", "_", expr.__class__.__name__).lower()
+        visitor = getattr(self, f"visit_{name}", None)
+        if visitor is None:
+            raise NotImplementedError(
+                f"You need to implement `{self.__class__.__name__}.visit_{name}`."
+            )
+        return visitor(expr)
+
+
+    def is_public(self, expr: Expression) -> bool:
+        """
+        Whether an expression only depends on scalars, so that operations with it are local.
+        """
+        known = self.public.get(id(expr))
+        if known is not None:
+            return known
+        if isinstance(expr, Secret):
+            result = False
+        elif isinstance(expr, Scalar):
+            result = True
+        else:
+            result = all(self.is_public(child) for child in children(expr))
+        self.public[id(expr)] = result
+        return result
+
+
+    def visit_secret(self, expr: Secret) -> int:
+        if expr.id not in self.seen_secrets:
+            self.seen_secrets.add(expr.id)
+            self.report.secret_inputs += 1
+        return 0
+
+
+    def visit_scalar(self, expr: Scalar) -> int:
+        return 0
+
+
+    def visit_addition(self, expr: Expression) -> int:
+        self.report.additions += 1
+        return max(self.visit(expr.left), self.visit(expr.right)) # type: ignore
+
+
+    visit_add = visit_addition
+    visit_subtraction = visit_addition
+    visit_sub = visit_addition
+
+
+    def visit_multiplication(self, expr: Expression) -> int:
+        left, right = expr.left, expr.right # type: ignore
+        depth = max(self.visit(left), self.visit(right))
+        left_public, right_public = self.is_public(left), self.is_public(right)
+        if left_public and right_public:
+            return depth
+        if left_public or right_public:
+            self.report.scalar_multiplications += 1
+            return depth
+        self.report.beaver_multiplications += 1
+        return depth + 1
+
+
+    visit_mul = visit_multiplication
+
+
+    def visit_inner_product(self, expr: InnerProduct) -> int:
+        # Products with a public term are computed locally, only the others use the opening.
+        secret_terms = 0
+        for left, right in zip(expr.left, expr.right):
+            left_public, right_public = self.is_public(left), self.is_public(right)
+            if left_public != right_public:
+                self.report.scalar_multiplications += 1
+            elif not left_public:
+                secret_terms += 1
+        if secret_terms:
+            self.report.inner_products += 1
+            self.report.inner_product_terms += secret_terms
+        # The terms are summed locally.
+        self.report.additions += len(expr) - 1
+        depth = max(self.visit(term) for term in expr.left + expr.right)
+        return depth + 1 if secret_terms else depth
+
+
+def children(expr: Expression) -> List[Expression]:
+    """
+    Operands of an expression, found in its `left` and `right` attributes.
+    """
+    operands: List[Expression] = []
+    for attribute in ("left", "right"):
+        value = getattr(expr, attribute, None)
+        if isinstance(value, Expression):
+            operands.append(value)
+        elif isinstance(value, list):
+            operands.extend(value)
+    return operands
+
+
+def estimate_cost(protocol_spec: ProtocolSpec) -> CostReport:
+    """
+    Estimate the cost of executing a protocol.
+    """
+    estimator = CostEstimator(len(protocol_spec.participant_ids))
+    estimator.report.multiplicative_depth = estimator.visit(protocol_spec.expr)
+    return estimator.report
+
+
+def main(args: List[str]) -> None:
+    """
+    Print the estimated cost of a protocol specification defined in a module.
+    """
+    parser = argparse.ArgumentParser(description="Estimate the cost of an SMC protocol.")
+    parser.add_argument(
+        "spec",
+        help="Protocol specification to analyse, as `module:attribute`.",
+        type=str
+    )
+    parser.add_argument(
+        "-s",
+        "--share-bytes",
+        help="Size of a serialized share in bytes.",
+        type=int,
+        default=SHARE_BYTES
+    )
+    parser.add_argument(
+        "-o",
+        "--overhead-bytes",
+        help="Size of the headers of a request and its response in bytes.",
+        type=int,
+        default=MESSAGE_OVERHEAD_BYTES
+    )
+    parser.add_argument(
+        "--seeded",
+        help="Share the secrets with seeds.",
+        action="store_true"
+    )
+    parser.add_argument(
+        "-c",
+        "--compression-ratio",
+        help="Ratio of raw to compressed size of the shares in the bodies.",
+        type=float,
+        default=1.0
+    )
+    parser.add_argument(
+        "-m",
+        "--multiplexed",
+        help="Send the messages over the multiplexed connection.",
+        action="store_true"
+    )
+    namespace = parser.parse_args(args)
+
+    module_name, _, attribute = namespace.spec.partition(":")
+    protocol_spec = getattr(importlib.import_module(module_name), attribute)
+    report = estimate_cost(protocol_spec)
+    print(json.dumps(
+        report.to_dict(
+            namespace.share_bytes,
+            namespace.overhead_bytes,
+            namespace.seeded,
+            namespace.compression_ratio,
+            namespace.multiplexed
+        ),
+        indent=4
+    ))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
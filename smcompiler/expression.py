@@ -11,7 +11,7 @@ MODIFY THIS FILE.
 
 import base64
 import random
-from typing import Optional
+from typing import List, Optional
 
 
 ID_BYTES = 4
@@ -99,4 +99,40 @@ class Secret(Expression):
     # Feel free to add as many methods as you like.
 
 
+class InnerProduct(Expression):
+    """
+    Term representing the inner product of two vectors of expressions.
+
+    Computing sum(x_i * y_i) with this node only needs a single vector of
+    correlated randomness from the trusted parameter generator, and the masked
+    vectors (x - a) and (y - b) can be opened in a single message per party
+    instead of one message per multiplication.
+    """
+
+    def __init__(
+            self,
+            left: List[Expression],
+            right: List[Expression],
+            id: Optional[bytes] = None
+        ):
+        if len(left) != len(right):
+            raise ValueError(
+                f"Vectors of an inner product must have the same length, got {len(left)} and {len(right)}."
+            )
+        if not left:
+            raise ValueError("Vectors of an inner product must not be empty.")
+        self.left = list(left)
+        self.right = list(right)
+        super().__init__(id)
+
+
+    def __len__(self):
+        return len(self.left)
+
+
+    def __repr__(self):
+        terms = " + ".join(f"{repr(x)} * {repr(y)}" for x, y in zip(self.left, self.right))
+        return f"{self.__class__.__name__}({terms})"
+
+
 # Feel free to add as many classes as you like.
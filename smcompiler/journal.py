@@ -0,0 +1,78 @@
+"""
+Durable journal of the messages stored by the trusted server.
+You should not need to change this file.
+
+The journal is an SQLite database in write-ahead-logging mode. Every message is written to it
+before being made available to the clients, and a restarted server replays the journal to restore
+its store, so that running protocols can resume where they stopped.
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterator, Tuple, Union
+
+
+class Journal:
+    """
+    Append-only journal of the server store.
+
+    Attributes:
+        path: path of the SQLite database
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            " pool TEXT NOT NULL,"
+            " first TEXT NOT NULL,"
+            " second TEXT NOT NULL,"
+            " data BLOB NOT NULL,"
+            " PRIMARY KEY (pool, first, second)"
+            ")"
+        )
+        self.conn.commit()
+
+
+    def append(self, pool: str, channel: Tuple[str, str], data: bytes) -> None:
+        """
+        Durably record a message.
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO messages (pool, first, second, data) VALUES (?, ?, ?, ?)",
+                (pool, channel[0], channel[1], data)
+            )
+            self.conn.commit()
+
+
+    def delete(self, pool: str, channel: Tuple[str, str]) -> None:
+        """
+        Durably forget a message.
+        """
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM messages WHERE pool = ? AND first = ? AND second = ?",
+                (pool, channel[0], channel[1])
+            )
+            self.conn.commit()
+
+
+    def replay(self) -> Iterator[Tuple[str, Tuple[str, str], bytes]]:
+        """
+        Iterate over all the recorded messages.
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT pool, first, second, data FROM messages").fetchall()
+        for pool, first, second, data in rows:
+            yield pool, (first, second), bytes(data)
+
+
+    def close(self) -> None:
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,258 @@
+"""
+Load generator for the trusted server.
+
+Simulates virtual parties exchanging messages through the server, and reports the throughput, the
+latency percentiles per route, and the growth of the server over time: the number and total size
+of the stored payloads, and the peak resident memory of the process.
+
+By default, the server runs in this process, so that its store can be inspected:
+    python3 loadtest.py --parties 1000 --messages 10 --size 1024 --concurrency 64
+An already running server can be targeted instead with `--url`, without store statistics.
+
+The peak resident memory is the one of this process, which includes the load generator.
+"""
+
+import argparse
+import collections
+import contextlib
+import logging
+import os
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import requests
+from werkzeug.serving import make_server
+
+import server
+
+
+ROUTES = ("private", "public", "double-shares")
+
+
+class LoadStats:
+    """
+    Latencies of the requests per route, and samples of the size of the store and of the peak
+    resident memory.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = collections.defaultdict(list)
+        self.errors: Dict[str, int] = collections.defaultdict(int)
+        self.store_samples: List[Tuple[float, int, int, int]] = list()
+
+
+    def record(self, route: str, latency: float, ok: bool) -> None:
+        with self.lock:
+            self.latencies[route].append(latency)
+            if not ok:
+                self.errors[route] += 1
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """
+    Percentile of a list of values, by the nearest-rank method.
+    """
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def store_size() -> Tuple[int, int]:
+    """
+    Number of entries and total bytes of the messages in the server store.
+    """
+    with server.store_lock:
+        pools = list(server.store.values())
+        entries = sum(len(pool) for pool in pools)
+        size = sum(len(data) for pool in pools for data in pool.values())
+    return entries, size
+
+
+def peak_rss() -> int:
+    """
+    Peak resident memory of this process, in bytes.
+    """
+    # Linux reports kilobytes, macOS bytes.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def sample_store(stats: LoadStats, start: float, interval: float, stop: threading.Event) -> None:
+    """
+    Periodically record the size of the store and the peak resident memory, until stopped, and
+    once more when stopped.
+    """
+    while True:
+        stopped = stop.wait(interval) if stats.store_samples else False
+        entries, size = store_size()
+        stats.store_samples.append((time.perf_counter() - start, entries, size, peak_rss()))
+        if stopped:
+            return
+
+
+def virtual_party(
+        base_url: str,
+        party: int,
+        num_parties: int,
+        num_messages: int,
+        payload: bytes,
+        routes: List[str],
+        stats: LoadStats
+    ) -> None:
+    """
+    Send and retrieve messages as one party. Each private message is sent to the next party, and
+    then retrieved on its behalf, so that virtual parties never wait for each other.
+
+    The "double-shares" route asks the TTP for the correlated randomness of the Shamir backend,
+    which is the one implemented by the server itself.
+    """
+    session = requests.Session()
+    party_id = f"party{party}"
+    peer_id = f"party{(party + 1) % num_parties}"
+
+    def timed(route: str, method: str, url: str, data: Optional[bytes] = None) -> None:
+        start = time.perf_counter()
+        res = session.request(method, url, data=data)
+        stats.record(route, time.perf_counter() - start, res.status_code == 200)
+
+    for i in range(num_messages):
+        label = f"load-{party}-{i}"
+        if "private" in routes:
+            timed("POST /private", "POST", f"{base_url}/private/{party_id}/{peer_id}/{label}", payload)
+            timed("GET /private", "GET", f"{base_url}/private/{peer_id}/{label}")
+        if "public" in routes:
+            timed("POST /public", "POST", f"{base_url}/public/{party_id}/{label}", payload)
+            timed("GET /public", "GET", f"{base_url}/public/{peer_id}/{party_id}/{label}")
+        if "double-shares" in routes:
+            threshold = (num_parties - 1) // 3
+            url = f"{base_url}/double-shares/{party_id}/{label}/{threshold}"
+            timed("GET /double-shares", "GET", url)
+
+
+def run_load(
+        base_url: str,
+        num_parties: int,
+        num_messages: int,
+        size: int,
+        concurrency: int,
+        routes: List[str],
+        stats: LoadStats
+    ) -> float:
+    """
+    Run all virtual parties, and return the elapsed time in seconds.
+    """
+    payload = os.urandom(size)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [
+            executor.submit(
+                virtual_party, base_url, party, num_parties, num_messages, payload, routes, stats
+            )
+            for party in range(num_parties)
+        ]
+        for future in futures:
+            future.result()
+    return time.perf_counter() - start
+
+
+def report(stats: LoadStats, elapsed: float) -> None:
+    """
+    Print the statistics of a load test.
+    """
+    total = sum(len(latencies) for latencies in stats.latencies.values())
+    errors = sum(stats.errors.values())
+    succeeded = total - errors
+    print(f"{succeeded} successful requests in {elapsed:.2f} s: {succeeded / elapsed:.1f} requests/s")
+    if errors:
+        print(f"{errors} failed requests are not counted in the throughput.")
+    print(f"{'route':>18} {'requests':>9} {'errors':>7} {'p50 (ms)':>9} {'p99 (ms)':>9}")
+    for route, latencies in sorted(stats.latencies.items()):
+        flag = "  <- every request failed" if stats.errors[route] == len(latencies) else ""
+        print(
+            f"{route:>18} {len(latencies):>9} {stats.errors[route]:>7}"
+            f" {percentile(latencies, 0.5) * 1e3:>9.2f} {percentile(latencies, 0.99) * 1e3:>9.2f}{flag}"
+        )
+
+    if stats.store_samples:
+        print(f"{'time (s)':>9} {'entries':>9} {'payloads (kB)':>14} {'peak RSS (MB)':>14}")
+        for timestamp, entries, size, rss in stats.store_samples:
+            print(f"{timestamp:>9.2f} {entries:>9} {size / 1024:>14.1f} {rss / 2 ** 20:>14.1f}")
+
+
+def main(args: List[str]) -> None:
+    """
+    Entrypoint of the program.
+    """
+    parser = argparse.ArgumentParser(description="Load test the trusted server.")
+    parser.add_argument("-n", "--parties", help="Number of virtual parties.", type=int, default=1000)
+    parser.add_argument("-m", "--messages", help="Messages per party.", type=int, default=10)
+    parser.add_argument("-s", "--size", help="Message size in bytes.", type=int, default=1024)
+    parser.add_argument("-c", "--concurrency", help="Concurrent connections.", type=int, default=64)
+    parser.add_argument(
+        "-r",
+        "--route",
+        help="Route to exercise (repeatable, default: private and public).",
+        choices=ROUTES,
+        action="append"
+    )
+    parser.add_argument("-u", "--url", help="URL of a running server.", type=str, default=None)
+    parser.add_argument("-p", "--port", help="Port of the in-process server.", type=int, default=5000)
+    parser.add_argument(
+        "--threaded",
+        help="Let the in-process server handle requests concurrently.",
+        action="store_true"
+    )
+    parser.add_argument(
+        "-i",
+        "--interval",
+        help="Interval between samples of the store, in seconds.",
+        type=float,
+        default=1.0
+    )
+    namespace = parser.parse_args(args)
+
+    routes = namespace.route or ["private", "public"]
+    stats = LoadStats()
+
+    if namespace.url is not None:
+        elapsed = run_load(
+            namespace.url, namespace.parties, namespace.messages, namespace.size,
+            namespace.concurrency, routes, stats
+        )
+        report(stats, elapsed)
+        return
+
+    for party in range(namespace.parties):
+        server.ttp.add_participant(f"party{party}")
+    http_server = make_server("localhost", namespace.port, server.app, threaded=namespace.threaded)
+    threading.Thread(target=http_server.serve_forever, daemon=True).start()
+
+    stop = threading.Event()
+    sampler = threading.Thread(
+        target=sample_store, args=(stats, time.perf_counter(), namespace.interval, stop), daemon=True
+    )
+    sampler.start()
+    # Silence the log lines of the server, which would dominate the cost of each request: werkzeug
+    # logs each request to stderr, and the routes print to stdout.
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            elapsed = run_load(
+                f"http://localhost:{namespace.port}", namespace.parties, namespace.messages,
+                namespace.size, namespace.concurrency, routes, stats
+            )
+    finally:
+        stop.set()
+        sampler.join()
+        http_server.shutdown()
+
+    report(stats, elapsed)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
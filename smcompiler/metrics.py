@@ -0,0 +1,177 @@
+"""
+Minimal metrics exposed by the trusted server in the Prometheus text format.
+You should not need to change this file.
+
+Example:
+>>> registry = Registry()
+>>> requests = registry.register(Counter("requests_total", "Requests.", ("route",)))
+>>> requests.inc(route="/public")
+>>> print(registry.render(), end="")
+# HELP requests_total Requests.
+# TYPE requests_total counter
+requests_total{route="/public"} 1.0
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple, TypeVar
+
+
+# Upper bounds of the buckets of latency histograms, in seconds.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """
+    Base class of a metric.
+
+    Attributes:
+        name: name of the metric
+        documentation: description of the metric
+        labelnames: names of the labels of the metric
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Metric {self.name} expects labels {self.labelnames}.")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """
+        Iterate over the samples of the metric, as (suffixed name, formatted labels, value).
+        """
+        raise NotImplementedError
+
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{labels} {float(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing value.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[LabelValues, float] = dict()
+
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self.lock:
+            items = sorted(self.values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Gauge(Metric):
+    """
+    Value computed by a function when the metrics are collected.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float]):
+        super().__init__(name, documentation)
+        self.function = function
+
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        yield self.name, "", self.function()
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values in cumulative buckets.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labelnames: Sequence[str] = (),
+            buckets: Sequence[float] = DEFAULT_BUCKETS
+        ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # For each label values: count per bucket (the last one is +Inf), and sum.
+        self.values: Dict[LabelValues, Tuple[List[int], List[float]]] = dict()
+
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts, total = self.values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self.lock:
+            items = sorted((key, (list(counts), total[0])) for key, (counts, total) in self.values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                labels = _format_labels(self.labelnames + ("le",), key + (le,))
+                yield f"{self.name}_bucket", labels, cumulative
+            yield f"{self.name}_sum", _format_labels(self.labelnames, key), total
+            yield f"{self.name}_count", _format_labels(self.labelnames, key), cumulative
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Registry:
+    """
+    Collection of metrics rendered together.
+    """
+
+    def __init__(self):
+        self.metrics: List[Metric] = list()
+
+
+    def register(self, metric: M) -> M:
+        self.metrics.append(metric)
+        return metric
+
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self.metrics)
@@ -0,0 +1,152 @@
+"""
+Persistent multiplexed connection between a client and the trusted server.
+You should not need to change this file.
+
+Every message is sent in a frame made of a JSON header and of a binary body:
+
+    | header length (4 bytes) | body length (4 bytes) | header | body |
+
+Each request carries an "id" in its header, and the server answers with a frame carrying the same
+"id" and a "status". Answers can arrive in any order: a request for a message which is not yet
+available is answered by the server as soon as the message is stored, while other requests keep
+flowing over the same connection.
+"""
+
+import itertools
+import json
+import socket
+import struct
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, Optional, Tuple
+
+from compression import CompressionStats, decode_body
+
+
+FRAME_PREFIX = struct.Struct("!II")
+
+
+class MultiplexError(Exception):
+    """The server answered a request with an error."""
+
+
+def send_frame(sock: socket.socket, header: Dict[str, Any], body: bytes = b"") -> None:
+    """
+    Send a frame over a socket.
+    """
+    header_bytes = json.dumps(header).encode("utf-8")
+    sock.sendall(FRAME_PREFIX.pack(len(header_bytes), len(body)) + header_bytes + body)
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    """
+    Receive exactly `size` bytes from a socket.
+    """
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by peer.")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def recv_frame(sock: socket.socket) -> Tuple[Dict[str, Any], bytes]:
+    """
+    Receive a frame from a socket.
+    """
+    header_len, body_len = FRAME_PREFIX.unpack(_recv_exactly(sock, FRAME_PREFIX.size))
+    header = json.loads(_recv_exactly(sock, header_len))
+    body = _recv_exactly(sock, body_len)
+    return header, body
+
+
+class MultiplexClient:
+    """
+    Client side of the multiplexed connection. The connection is opened on the first request.
+
+    Attributes:
+        server_host: hostname of the server
+        server_port: port of the multiplexed endpoint of the server
+        stats: statistics of the decompressed answers (default: not recorded)
+    """
+
+    def __init__(self, server_host: str, server_port: int, stats: Optional[CompressionStats] = None):
+        self.address = (server_host, server_port)
+        self.stats = stats
+        self.sock: Optional[socket.socket] = None
+        self.lock = threading.Lock()
+        self.pending: Dict[int, Future] = dict()
+        self.request_ids = itertools.count()
+
+
+    def request(self, header: Dict[str, Any], body: bytes = b"") -> Future:
+        """
+        Send a request, and return a future resolving to the body of the answer.
+        """
+        future: Future = Future()
+        with self.lock:
+            if self.sock is None:
+                self._connect()
+            request_id = next(self.request_ids)
+            self.pending[request_id] = future
+            send_frame(self.sock, dict(header, id=request_id), body) # type: ignore
+        return future
+
+
+    def _connect(self) -> None:
+        sock = socket.create_connection(self.address)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock = sock
+        threading.Thread(target=self._read_answers, args=(sock,), daemon=True).start()
+
+
+    def _read_answers(self, sock: socket.socket) -> None:
+        """
+        Dispatch the answers of the server to the pending requests.
+        """
+        error: BaseException = ConnectionError("Connection closed.")
+        try:
+            while True:
+                header, body = recv_frame(sock)
+                request_id = header.get("id")
+                with self.lock:
+                    future = self.pending.pop(request_id, None) if isinstance(request_id, int) else None
+                if future is None:
+                    print(f"MUX  ignoring answer to unknown request {request_id!r}")
+                    continue
+                if header.get("status", 200) == 200:
+                    try:
+                        future.set_result(decode_body(body, header.get("encoding"), self.stats))
+                    except Exception as err: # pylint: disable=broad-except
+                        future.set_exception(err)
+                else:
+                    future.set_exception(MultiplexError(header.get("error", "")))
+        except Exception as err: # pylint: disable=broad-except
+            error = err
+        finally:
+            # Whatever stopped the reader, no other answer will arrive on this connection.
+            with self.lock:
+                pending = list(self.pending.values())
+                self.pending.clear()
+                if self.sock is sock:
+                    self.sock = None
+            sock.close()
+            for future in pending:
+                future.set_exception(error)
+
+
+    def close(self) -> None:
+        """
+        Close the connection.
+        """
+        with self.lock:
+            if self.sock is not None:
+                # Shut the connection down first: closing alone does not interrupt the reader.
+                try:
+                    self.sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+                self.sock.close()
+                self.sock = None
@@ -0,0 +1,395 @@
+"""
+Process-pool evaluation of the local share arithmetic of an SMC circuit.
+
+Gates of a circuit layer which do not require communication (additions, subtractions and
+operations with scalars) are independent from each other, and can be evaluated in parallel. The
+values of all the wires of the circuit are kept in a shared-memory buffer, so that worker processes
+read and write them in place instead of receiving pickled copies of the share vectors.
+
+The wires and the packed layers of a circuit should stay resident across layers: allocate them
+once, and only send the workers the indices of the gates to evaluate. Workers attach to a vector
+the first time they see it, and keep it attached for the following layers.
+
+Example:
+>>> layer = [(ADD, 2, 0, 1), (MUL_SCALAR, 3, 0, 5)]
+>>> with SharedVector.create([3, 4, 0, 0]) as wires, pack_gates(layer) as gates:
+...     with ParallelEvaluator(2, 101) as evaluator:
+...         evaluator.evaluate_layer(wires, gates)
+...     wires.to_list()
+[3, 4, 7, 15]
+"""
+
+import argparse
+import array
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+
+# Gate opcodes. A gate is a tuple (opcode, output wire, first operand wire, second operand), where
+# the second operand is a wire for ADD and SUB, and a scalar for ADD_SCALAR and MUL_SCALAR.
+ADD = 0
+SUB = 1
+ADD_SCALAR = 2
+MUL_SCALAR = 3
+
+Gate = Tuple[int, int, int, int]
+GATE_WORDS = 4
+
+# Wire values are stored as unsigned 64-bit integers.
+WORD_BYTES = 8
+WORD_FORMAT = "Q"
+MAX_MODULUS = 2 ** 64
+
+
+class SharedVector:
+    """
+    Vector of field elements stored in shared memory.
+
+    Attributes:
+        shm: Underlying shared memory block
+        length: Number of elements in the vector
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, length: int, owner: bool):
+        self.shm = shm
+        self.length = length
+        self.owner = owner
+        self._words: memoryview = shm.buf.cast(WORD_FORMAT)
+        self.values: memoryview = self._words[:length]
+
+
+    @classmethod
+    def create(cls, values: Sequence[int], modulus: Optional[int] = None) -> "SharedVector":
+        """
+        Allocate a shared vector holding the given values, reduced modulo `modulus` if given.
+        Otherwise, values must fit in an unsigned 64-bit integer.
+        """
+        if modulus is not None:
+            values = [value % modulus for value in values]
+        try:
+            words = array.array(WORD_FORMAT, values)
+        except OverflowError as err:
+            raise ValueError("Values of a shared vector must be in [0, 2^64), reduce them first.") from err
+
+        vector = cls.zeros(len(words))
+        vector.values[:] = words
+        return vector
+
+
+    @classmethod
+    def zeros(cls, length: int) -> "SharedVector":
+        """
+        Allocate a shared vector of zeros.
+        """
+        shm = shared_memory.SharedMemory(create=True, size=max(1, length) * WORD_BYTES)
+        shm.buf[:] = bytes(shm.size)
+        return cls(shm, length, owner=True)
+
+
+    @classmethod
+    def attach(cls, name: str, length: int) -> "SharedVector":
+        """
+        Attach to a shared vector created by another process.
+        """
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(shm, length, owner=False)
+
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+
+    def __len__(self) -> int:
+        return self.length
+
+
+    def to_list(self) -> List[int]:
+        return self.values.tolist()
+
+
+    def close(self) -> None:
+        """
+        Release the vector, and free the shared memory if this process created it.
+        """
+        self.values.release()
+        self._words.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+    def __enter__(self) -> "SharedVector":
+        return self
+
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+def pack_gates(gates: Sequence[Gate], modulus: Optional[int] = None) -> SharedVector:
+    """
+    Pack a layer of gates into a shared vector, so that it is sent to the workers only once.
+    Scalar operands are reduced modulo `modulus` if given.
+
+    Packing costs about as much as evaluating the layer: pack the layers of a circuit once, before
+    evaluating it.
+    """
+    if modulus is not None:
+        gates = [
+            (opcode, out, left, right % modulus if opcode in (ADD_SCALAR, MUL_SCALAR) else right)
+            for opcode, out, left, right in gates
+        ]
+    return SharedVector.create([field for gate in gates for field in gate])
+
+
+def evaluate_gates(values: memoryview, gates: memoryview, start: int, stop: int, modulus: int) -> None:
+    """
+    Evaluate in place the gates of index start to stop of a packed layer over a mutable sequence of
+    wire values.
+    """
+    fields = iter(gates[start * GATE_WORDS:stop * GATE_WORDS].tolist())
+    for opcode, out, left, right in zip(fields, fields, fields, fields):
+        if opcode == ADD:
+            values[out] = (values[left] + values[right]) % modulus
+        elif opcode == SUB:
+            values[out] = (values[left] - values[right]) % modulus
+        elif opcode == ADD_SCALAR:
+            values[out] = (values[left] + right) % modulus
+        elif opcode == MUL_SCALAR:
+            values[out] = (values[left] * right) % modulus
+        else:
+            raise ValueError(f"Unknown gate opcode {opcode}.")
+
+
+# Shared vectors attached by a worker process, by name, kept attached for the following layers.
+_ATTACHED: Dict[str, SharedVector] = dict()
+
+
+def _attached(name: str, length: int) -> SharedVector:
+    vector = _ATTACHED.get(name)
+    if vector is None or len(vector) != length:
+        if vector is not None:
+            vector.close()
+        vector = SharedVector.attach(name, length)
+        _ATTACHED[name] = vector
+    return vector
+
+
+def _evaluate_chunk(
+        wires_name: str,
+        num_wires: int,
+        gates_name: str,
+        num_gates: int,
+        start: int,
+        stop: int,
+        modulus: int
+    ) -> None:
+    """
+    Worker entrypoint: evaluate a chunk of a packed layer over a shared vector of wires.
+    """
+    wires = _attached(wires_name, num_wires)
+    gates = _attached(gates_name, num_gates * GATE_WORDS)
+    evaluate_gates(wires.values, gates.values, start, stop, modulus)
+
+
+def _noop() -> None:
+    """
+    Worker entrypoint used to start the worker processes ahead of time.
+    """
+
+
+class ParallelEvaluator:
+    """
+    Evaluate layers of local gates across a pool of worker processes.
+
+    Attributes:
+        num_workers: number of worker processes
+        modulus: size of the finite field, must fit in an unsigned 64-bit integer
+        min_chunk: layers with fewer gates per worker are evaluated in this process (default: 1024)
+    """
+
+    def __init__(self, num_workers: int, modulus: int, min_chunk: int = 1024):
+        if modulus > MAX_MODULUS:
+            raise ValueError("Shared vectors only support fields of at most 64 bits.")
+        self.num_workers = num_workers
+        self.modulus = modulus
+        self.min_chunk = min_chunk
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+
+    def start(self) -> None:
+        """
+        Start the worker processes, if they are not running yet.
+        """
+        if self.num_workers > 1 and self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.num_workers)
+            for future in [self.executor.submit(_noop) for _ in range(self.num_workers)]:
+                future.result()
+
+
+    def close(self) -> None:
+        """
+        Stop the worker processes, which releases the vectors they attached.
+        """
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+    def __enter__(self) -> "ParallelEvaluator":
+        self.start()
+        return self
+
+
+    def __exit__(self, *args: Any) -> None:
+        self.close()
+
+
+    def evaluate(self, values: Sequence[int], gates: Sequence[Gate]) -> List[int]:
+        """
+        Evaluate a layer of gates over a list of wire values, and return the new wire values.
+        Values and scalar operands are reduced modulo the field size first.
+
+        The values and the gates are copied to shared memory and back: to evaluate the layers of a
+        circuit, keep its wires and packed layers resident and use `evaluate_layer` instead.
+        """
+        with SharedVector.create(values, self.modulus) as wires, pack_gates(gates, self.modulus) as packed:
+            self.evaluate_layer(wires, packed)
+            return wires.to_list()
+
+
+    def evaluate_layer(self, wires: SharedVector, gates: SharedVector) -> None:
+        """
+        Evaluate a layer of gates packed with `pack_gates`. Gates of a layer must not read the
+        output of another gate of the same layer.
+        """
+        num_gates = len(gates) // GATE_WORDS
+        if self.executor is None or num_gates < self.num_workers * self.min_chunk:
+            evaluate_gates(wires.values, gates.values, 0, num_gates, self.modulus)
+            return
+
+        chunk_size = -(-num_gates // self.num_workers)
+        futures = [
+            self.executor.submit(
+                _evaluate_chunk,
+                wires.name,
+                len(wires),
+                gates.name,
+                num_gates,
+                start,
+                min(start + chunk_size, num_gates),
+                self.modulus
+            )
+            for start in range(0, num_gates, chunk_size)
+        ]
+        for future in futures:
+            future.result()
+
+
+def random_layer(num_gates: int, modulus: int) -> Tuple[List[int], List[Gate]]:
+    """
+    Generate random inputs and a random layer of local gates writing to fresh wires.
+    """
+    inputs = [random.randrange(modulus) for _ in range(num_gates)]
+    gates = []
+    for out in range(num_gates, 2 * num_gates):
+        opcode = random.choice((ADD, SUB, ADD_SCALAR, MUL_SCALAR))
+        left = random.randrange(num_gates)
+        if opcode in (ADD, SUB):
+            right = random.randrange(num_gates)
+        else:
+            right = random.randrange(modulus)
+        gates.append((opcode, out, left, right))
+    return inputs + [0] * num_gates, gates
+
+
+def evaluate_plain(values: List[int], gates: Sequence[Gate], modulus: int) -> None:
+    """
+    Evaluate in place a layer of gates over a list of wire values, without shared memory.
+    """
+    for opcode, out, left, right in gates:
+        if opcode == ADD:
+            values[out] = (values[left] + values[right]) % modulus
+        elif opcode == SUB:
+            values[out] = (values[left] - values[right]) % modulus
+        elif opcode == ADD_SCALAR:
+            values[out] = (values[left] + right) % modulus
+        elif opcode == MUL_SCALAR:
+            values[out] = (values[left] * right) % modulus
+        else:
+            raise ValueError(f"Unknown gate opcode {opcode}.")
+
+
+def benchmark(
+        num_gates: int,
+        worker_counts: Sequence[int],
+        modulus: int
+    ) -> Tuple[float, float, Dict[int, float]]:
+    """
+    Time the evaluation of a random layer in this process over a list, and over resident shared
+    vectors with different numbers of workers.
+
+    Returns the time in seconds to pack the layer (once per circuit), to evaluate it over a list,
+    and to evaluate it over the resident vectors for each number of workers.
+    """
+    values, gates = random_layer(num_gates, modulus)
+
+    expected = list(values)
+    start = time.perf_counter()
+    evaluate_plain(expected, gates, modulus)
+    plain = time.perf_counter() - start
+
+    timings = dict()
+    for num_workers in worker_counts:
+        with ParallelEvaluator(num_workers, modulus) as evaluator:
+            start = time.perf_counter()
+            with SharedVector.create(values) as wires, pack_gates(gates) as packed:
+                packing = time.perf_counter() - start
+                # A first layer attaches the workers to the vectors, as the first layer of a circuit.
+                evaluator.evaluate_layer(wires, packed)
+                wires.values[:] = array.array(WORD_FORMAT, values)
+
+                start = time.perf_counter()
+                evaluator.evaluate_layer(wires, packed)
+                timings[num_workers] = time.perf_counter() - start
+
+                if wires.to_list() != expected:
+                    raise RuntimeError(f"Evaluation with {num_workers} workers gave a different result.")
+    return packing, plain, timings
+
+
+def main(args: List[str]) -> None:
+    """
+    Report the speedup of parallel local evaluation per number of cores.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark parallel local share arithmetic.")
+    parser.add_argument("-g", "--gates", help="Number of gates in the layer.", type=int, default=1_000_000)
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="Number of workers to benchmark (repeatable).",
+        type=int,
+        action="append"
+    )
+    parser.add_argument("-m", "--modulus", help="Field size.", type=int, default=2 ** 61 - 1)
+    namespace = parser.parse_args(args)
+
+    worker_counts = namespace.workers or sorted({1, 2, 4, os.cpu_count() or 1})
+    packing, plain, timings = benchmark(namespace.gates, worker_counts, namespace.modulus)
+
+    print(f"cores: {os.cpu_count()}, packing (once per circuit): {packing:.3f} s")
+    print(f"{'workers':>8} {'time (s)':>10} {'speedup':>8} {'per core':>9}")
+    print(f"{'list':>8} {plain:>10.3f} {1:>8.2f} {'':>9}")
+    for num_workers, elapsed in timings.items():
+        speedup = plain / elapsed
+        print(f"{num_workers:>8} {elapsed:>10.3f} {speedup:>8.2f} {speedup / num_workers:>9.2f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
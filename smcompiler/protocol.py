@@ -1,14 +1,65 @@
+from typing import Optional
+
 from expression import Expression
 
 
+BACKENDS = ("additive", "shamir")
+RECONSTRUCTIONS = ("broadcast", "tree")
+
+
 class ProtocolSpec:
     """Specification of the SMC protocol.
 
     Attributes:
         participant_ids: List of IDs of the participating clients
         expr: Expression to be computed
+        backend: Secret sharing scheme, either "additive" (n-of-n, default) or "shamir"
+            (threshold sharing with king-based degree reduction, see `shamir.py`). `SMCParty`
+            only evaluates the additive backend, the Shamir one is for the cost estimates and the
+            building blocks of `shamir.py`
+        threshold: Degree of the Shamir sharings. Multiplications need 2 * threshold + 1 parties,
+            so up to n - 2 * threshold - 1 parties may straggle (default: (n - 1) // 3)
+        reconstruction: How the output is reconstructed, either "broadcast" (every party publishes
+            its share, default) or "tree" (shares are summed along a tree of parties, see
+            `reconstruction.py`)
+        fanout: Number of children of each party in the reconstruction tree
+        output_ids: IDs of the clients learning the output (default: all participants)
     """
 
-    def __init__(self, participant_ids: list, expr: Expression):
+    def __init__(
+            self,
+            participant_ids: list,
+            expr: Expression,
+            backend: str = "additive",
+            threshold: Optional[int] = None,
+            reconstruction: str = "broadcast",
+            fanout: int = 2,
+            output_ids: Optional[list] = None
+        ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown secret sharing backend {backend}.")
+        if backend == "shamir":
+            if threshold is None:
+                threshold = (len(participant_ids) - 1) // 3
+            if not 0 <= 2 * threshold < len(participant_ids):
+                raise ValueError("Shamir multiplications need more than 2 * threshold parties.")
+        if reconstruction not in RECONSTRUCTIONS:
+            raise ValueError(f"Unknown reconstruction {reconstruction}.")
+        if fanout < 1:
+            raise ValueError("The reconstruction tree needs a fanout of at least 1.")
+        if output_ids is not None:
+            if not output_ids or not set(output_ids) <= set(participant_ids):
+                raise ValueError("Output parties must be a non-empty subset of the participants.")
+
         self.participant_ids = participant_ids
         self.expr = expr
+        self.backend = backend
+        self.threshold = threshold
+        self.reconstruction = reconstruction
+        self.fanout = fanout
+        self.output_ids = output_ids
+
+    @property
+    def king_id(self) -> str:
+        """Participant in charge of the degree reduction of the Shamir backend."""
+        return self.participant_ids[0]
@@ -0,0 +1,95 @@
+"""
+Reconstruction of the output of an SMC protocol for large numbers of parties.
+
+With the default all-to-all reconstruction, every party publishes its final share and retrieves
+the n - 1 others, i.e. n^2 messages per output. Here, the additive shares are instead summed along
+a tree of parties rooted at an aggregator: each party sends a single partial sum to its parent, and
+the aggregator broadcasts the opened result once (or only sends it to the output parties). This
+costs O(n) messages per output.
+
+With a fanout of n - 1, the tree is a star, and the aggregator acts as a "king" party.
+"""
+
+import json
+from typing import List, Optional
+
+from communication import Communication
+from secret_sharing import reconstruct_secret, Share
+
+
+def tree_order(participant_ids: List[str], aggregator_id: str) -> List[str]:
+    """
+    Order of the parties in the tree: the aggregator is the root, then parties in the order of
+    the protocol specification.
+    """
+    return [aggregator_id] + [pid for pid in participant_ids if pid != aggregator_id]
+
+
+def tree_children(position: int, num_parties: int, fanout: int) -> List[int]:
+    """
+    Positions of the children of a party in the tree.
+    """
+    first = position * fanout + 1
+    return list(range(first, min(first + fanout, num_parties)))
+
+
+def tree_parent(position: int, fanout: int) -> int:
+    """
+    Position of the parent of a party in the tree.
+    """
+    return (position - 1) // fanout
+
+
+def reconstruct_tree(
+        comm: Communication,
+        participant_ids: List[str],
+        share: Share,
+        label: str,
+        fanout: int = 2,
+        output_ids: Optional[List[str]] = None
+    ) -> Optional[int]:
+    """
+    Reconstruct an additively shared value by summing the shares along a tree of parties.
+
+    Args:
+        comm: communication of this party
+        participant_ids: IDs of all parties
+        share: share of this party
+        label: label identifying the value to reconstruct
+        fanout: number of children of each party in the tree
+        output_ids: parties learning the result (default: all parties). The first output party is
+            the aggregator, so that no other party learns the result.
+
+    Returns:
+        the reconstructed value, or None if this party is not an output party.
+    """
+    aggregator_id = output_ids[0] if output_ids else participant_ids[0]
+    order = tree_order(participant_ids, aggregator_id)
+    position = order.index(comm.client_id)
+
+    partial_sum = share
+    for child in tree_children(position, len(order), fanout):
+        message = comm.retrieve_private_message(f"{label}-partial-{order[child]}")
+        partial_sum = partial_sum + Share.deserialize(json.loads(message))
+
+    if position != 0:
+        parent_id = order[tree_parent(position, fanout)]
+        comm.send_private_message(
+            parent_id,
+            f"{label}-partial-{comm.client_id}",
+            json.dumps(partial_sum.serialize())
+        )
+
+        if output_ids is None:
+            return int(comm.retrieve_public_message(aggregator_id, f"{label}-result"))
+        if comm.client_id in output_ids:
+            return int(comm.retrieve_private_message(f"{label}-result"))
+        return None
+
+    result = reconstruct_secret([partial_sum])
+    if output_ids is None:
+        comm.publish_message(f"{label}-result", str(result))
+    else:
+        for output_id in output_ids[1:]:
+            comm.send_private_message(output_id, f"{label}-result", str(result))
+    return result
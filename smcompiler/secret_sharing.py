@@ -4,7 +4,16 @@ Secret sharing scheme.
 
 from __future__ import annotations
 
-from typing import List
+import hashlib
+import secrets
+from typing import List, Tuple
+
+
+SEED_BYTES = 16
+
+# Number of extra PRG bytes drawn per field element, so that reducing them modulo the field size
+# introduces a statistically negligible bias.
+PRG_SECURITY_BYTES = 16
 
 
 class Share:
@@ -49,4 +58,58 @@ def reconstruct_secret(shares: List[Share]) -> int:
     raise NotImplementedError("You need to implement this method.")
 
 
+def gen_seed() -> bytes:
+    """Generate a fresh random seed for share expansion."""
+    return secrets.token_bytes(SEED_BYTES)
+
+
+def expand_seed(seed: bytes, length: int, modulus: int) -> List[int]:
+    """
+    Deterministically expand a seed into `length` pseudo-random field elements modulo `modulus`.
+
+    SHAKE-256 is used as the PRG, so that a party holding the seed derives the same values as the
+    owner of the secret without the values ever being transmitted.
+    """
+    if length < 0:
+        raise ValueError("Cannot expand a seed into a negative number of elements.")
+    element_bytes = (modulus.bit_length() + 7) // 8 + PRG_SECURITY_BYTES
+    stream = hashlib.shake_256(seed).digest(element_bytes * length)
+    return [
+        int.from_bytes(stream[i * element_bytes:(i + 1) * element_bytes], "big") % modulus
+        for i in range(length)
+    ]
+
+
+def share_secrets_seeded(
+        values: List[int],
+        num_shares: int,
+        modulus: int
+    ) -> Tuple[List[bytes], List[int]]:
+    """
+    Generate additive shares modulo `modulus` of a vector of secrets, in which all but one shares
+    are derived from a seed.
+
+    Returns the seeds of the shares 1 to num_shares - 1 (to expand with `expand_seeded_shares`),
+    and the explicit share 0 of each secret, which corrects the sum of the expanded shares so that
+    it matches the secrets. Only the seeds and a single vector of corrections need to be sent. The
+    shares are given by their values: wrap them in `Share` objects.
+    """
+    if num_shares < 1:
+        raise ValueError("Cannot share a secret between less than one party.")
+    seeds = [gen_seed() for _ in range(num_shares - 1)]
+    corrections = [value % modulus for value in values]
+    for seed in seeds:
+        for i, share in enumerate(expand_seeded_shares(seed, len(values), modulus)):
+            corrections[i] = (corrections[i] - share) % modulus
+    return seeds, corrections
+
+
+def expand_seeded_shares(seed: bytes, length: int, modulus: int) -> List[int]:
+    """
+    Restore the values of the vector of shares derived from a seed generated by
+    `share_secrets_seeded`.
+    """
+    return expand_seed(seed, length, modulus)
+
+
 # Feel free to add as many methods as you want.
@@ -3,12 +3,28 @@ Trusted server that should help SMC client to communicate.
 You should not need to change this file.
 """
 
+import base64
 import collections
+import json
+import socketserver
 import sys
-from typing import Dict, List, Optional, Tuple
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
-from flask import Flask, request, Response, jsonify
+from flask import Flask, g, request, Response, jsonify
 
+from compression import (
+    ACCEPT_HEADER,
+    BodyTooLarge,
+    CompressionStats,
+    decode_body,
+    encode_body,
+    negotiate,
+)
+from journal import Journal
+from metrics import Counter, Gauge, Histogram, Registry
+from multiplex import recv_frame, send_frame
 from ttp import TrustedParamGenerator
 
 
@@ -16,6 +32,70 @@ app: Flask = Flask("Trusted Third Party Server")
 store: Dict[str, Dict[Tuple[str, str], bytes]] = collections.defaultdict(dict)
 ttp: TrustedParamGenerator = TrustedParamGenerator()
 
+# Clients of the multiplexed endpoint waiting for a message which is not yet in the store.
+waiters: Dict[str, Dict[Tuple[str, str], List[Callable[[bytes], None]]]] = collections.defaultdict(
+    lambda: collections.defaultdict(list)
+)
+store_lock = threading.Lock()
+ttp_lock = threading.Lock()
+
+# Clients which were served the TTP payload of each channel of the "ttp" pool. Once all the
+# participants were served, the payloads are evicted from the store.
+ttp_payload_clients: Dict[str, Set[str]] = collections.defaultdict(set)
+
+# Durable copy of the store, if the server should survive restarts.
+journal: Optional[Journal] = None
+# Pool of the journal recording the state of the TTP: its participants and the values of each operation.
+TTP_STATE_POOL = "ttp-state"
+
+# Statistics of the bodies sent and received by the server.
+compression_stats = CompressionStats()
+decompression_stats = CompressionStats()
+
+# Total size of the messages in the store.
+store_bytes = 0
+
+
+def _store_entries() -> int:
+    with store_lock:
+        return sum(len(pool) for pool in store.values())
+
+
+def _pending_waiters() -> int:
+    with store_lock:
+        return sum(len(callbacks) for pool in waiters.values() for callbacks in pool.values())
+
+
+registry = Registry()
+requests_total = registry.register(Counter(
+    "smc_requests_total", "Requests handled by the server.", ("route", "method", "status")
+))
+request_duration = registry.register(Histogram(
+    "smc_request_duration_seconds", "Time spent handling a request.", ("route", "method")
+))
+registry.register(Gauge("smc_store_entries", "Messages in the store.", _store_entries))
+registry.register(Gauge("smc_store_bytes", "Total size of the messages in the store.", lambda: store_bytes))
+registry.register(Gauge(
+    "smc_pending_waiters", "Multiplexed retrievals waiting for a message.", _pending_waiters
+))
+ttp_generated = registry.register(Counter(
+    "smc_ttp_generated_total", "Correlated randomness payloads generated by the TTP.", ("kind",)
+))
+ttp_served = registry.register(Counter(
+    "smc_ttp_served_total", "Correlated randomness payloads served to clients.", ("kind",)
+))
+ttp_generation_duration = registry.register(Histogram(
+    "smc_ttp_generation_seconds", "Time spent generating the payloads of an operation.", ("kind",)
+))
+registry.register(Gauge(
+    "smc_compression_ratio", "Ratio of raw to sent size of the response bodies.",
+    lambda: compression_stats.ratio
+))
+registry.register(Gauge(
+    "smc_compression_cpu_seconds", "CPU time spent compressing response bodies.",
+    lambda: compression_stats.cpu_seconds
+))
+
 
 @app.route("/private/<sender_id>/<receiver_id>/<label>", methods=["POST"])
 def send_private_message(sender_id: str, receiver_id: str, label: str):
@@ -25,7 +105,7 @@ def send_private_message(sender_id: str, receiver_id: str, label: str):
     print(
         f"[ SEND     ] SENDER {sender_id} / LABEL {label} / RECEIVER {receiver_id}"
     )
-    _set_value("private", (receiver_id, label), request.get_data())
+    _set_value("private", (receiver_id, label), _request_body())
     return Response(status=200)
 
 
@@ -48,7 +128,7 @@ def publish_message(sender_id: str, label: str):
     The client publish a public message on the server.
     """
     print(f"[ PUBLISH  ] SENDER {sender_id} / LABEL {label}")
-    _set_value("public", (sender_id, label), request.get_data())
+    _set_value("public", (sender_id, label), _request_body())
     return Response(status=200)
 
 
@@ -71,32 +151,455 @@ def retrieve_share(client_id: str, op_id: str):
     """
     The client retrieve Beaver triplets generated by the server.
     """
-    shares = ttp.retrieve_share(client_id, op_id)
-    return jsonify([share.serialize() for share in shares]), 200
+    return jsonify(_triplet_payload(client_id, op_id)), 200
+
+
+@app.route("/shares/<client_id>/<op_id>/<int:length>", methods=["GET"])
+def retrieve_inner_product_shares(client_id: str, op_id: str, length: int):
+    """
+    The client retrieve correlated random vectors for an inner product generated by the server.
+    """
+    return jsonify(_inner_product_payload(client_id, op_id, length)), 200
+
+
+@app.route("/seeded-shares/<client_id>/<op_id>", methods=["GET"])
+def retrieve_seeded_share(client_id: str, op_id: str):
+    """
+    The client retrieve a seed-compressed Beaver triplet generated by the server.
+    """
+    return jsonify(_seeded_payload(client_id, op_id)), 200
+
+
+@app.route("/double-shares/<client_id>/<op_id>/<int:threshold>", methods=["GET"])
+def retrieve_double_share(client_id: str, op_id: str, threshold: int):
+    """
+    The client retrieve a double sharing of a random value generated by the server.
+    """
+    return jsonify(_double_payload(client_id, op_id, threshold)), 200
+
+
+@app.route("/metrics", methods=["GET"])
+def retrieve_metrics():
+    """
+    The metrics of the server, in the Prometheus text format.
+    """
+    return Response(registry.render(), status=200, mimetype="text/plain; version=0.0.4")
+
+
+@app.errorhandler(BodyTooLarge)
+def reject_large_body(err: BodyTooLarge):
+    """
+    Reject a compressed body which decompresses to more than the maximal size.
+    """
+    return str(err), 413
+
+
+@app.before_request
+def start_timer() -> None:
+    g.start_time = time.perf_counter()
+
+
+@app.after_request
+def record_request(response: Response) -> Response:
+    """
+    Record the count and the latency of a request.
+    """
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    requests_total.inc(route=route, method=request.method, status=str(response.status_code))
+    if "start_time" in g:
+        request_duration.observe(time.perf_counter() - g.start_time, route=route, method=request.method)
+    return response
+
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    """
+    Compress large response bodies with an encoding accepted by the client, if it opted in.
+    """
+    if response.status_code != 200 or response.direct_passthrough or "Content-Encoding" in response.headers:
+        return response
+
+    encoding = negotiate(request.headers.get(ACCEPT_HEADER))
+    body, used_encoding = encode_body(response.get_data(), encoding, compression_stats)
+    if used_encoding is not None:
+        response.set_data(body)
+        response.headers["Content-Encoding"] = used_encoding
+        response.vary.add(ACCEPT_HEADER)
+    return response
+
+
+def _request_body() -> bytes:
+    """
+    Body of the current request, decompressed if needed.
+    """
+    return decode_body(
+        request.get_data(), request.headers.get("Content-Encoding"), decompression_stats
+    )
+
+
+def _ttp_payload(kind: str, client_id: str, op_id: str, generate: Callable[[str], Any]) -> Any:
+    """
+    Payload generated by the TTP for a client.
+
+    Only the payload of the requesting client is generated, on its first request. It is kept in
+    the store, and therefore recorded in the journal, so that a retried or resumed request gets the
+    same payload. The values shared by the participants of an operation are kept by the TTP (see
+    `TrustedParamGenerator.values_for`), which persists them in the journal too. Once every
+    participant was served, the payloads of the operation are evicted, as the TTP evicts its values.
+    """
+    channel_key = f"{kind}/{op_id}"
+    metric_kind = kind.split("-")[0]
+    ttp_served.inc(kind=metric_kind)
+    with ttp_lock:
+        data = _get_value("ttp", (client_id, channel_key))
+        if data is None:
+            start = time.perf_counter()
+            data = json.dumps(generate(client_id)).encode("utf-8")
+            _set_value("ttp", (client_id, channel_key), data)
+            ttp_generation_duration.observe(time.perf_counter() - start, kind=metric_kind)
+            ttp_generated.inc(kind=metric_kind)
+
+        served = ttp_payload_clients[channel_key]
+        served.add(client_id)
+        if served >= ttp.participant_ids:
+            for participant in served:
+                _delete_value("ttp", (participant, channel_key))
+            del ttp_payload_clients[channel_key]
+    return json.loads(data)
+
+
+def _triplet_payload(client_id: str, op_id: str) -> List[Any]:
+    """
+    Serialized Beaver triplet shares of a client.
+    """
+    def generate(participant: str) -> List[Any]:
+        shares = ttp.retrieve_share(participant, op_id)
+        return [share.serialize() for share in shares]
+
+    return _ttp_payload("triplet", client_id, op_id, generate)
+
+
+def _inner_product_payload(client_id: str, op_id: str, length: int) -> List[Any]:
+    """
+    Values of the shares of correlated random vectors of a client.
+    """
+    def generate(participant: str) -> List[Any]:
+        a_shares, b_shares, c_share = ttp.retrieve_inner_product_shares(participant, op_id, length)
+        return [a_shares, b_shares, c_share]
+
+    return _ttp_payload(f"inner-product-{length}", client_id, op_id, generate)
+
+
+def _seeded_payload(client_id: str, op_id: str) -> Dict[str, Any]:
+    """
+    Serialized seed-compressed Beaver triplet of a client.
+    """
+    def generate(participant: str) -> Dict[str, Any]:
+        seed, correction = ttp.retrieve_seeded_share(participant, op_id)
+        return {
+            "seed": base64.b64encode(seed).decode("ASCII"),
+            "correction": correction,
+            "modulus": ttp.modulus,
+        }
+
+    return _ttp_payload("seeded", client_id, op_id, generate)
+
+
+def _double_payload(client_id: str, op_id: str, threshold: int) -> List[Any]:
+    """
+    Serialized double sharing of a random value of a client, for sharings of degree threshold.
+    """
+    def generate(participant: str) -> List[Any]:
+        shares = ttp.retrieve_double_share(participant, op_id, threshold)
+        return [share.serialize() for share in shares]
+
+    return _ttp_payload(f"double-{threshold}", client_id, op_id, generate)
 
 
 def _set_value(pool: str, channel: Tuple[str, str], data: bytes) -> None:
     """
     Push data to a channel in a given pool and send an event.
     """
-    store[pool][channel] = data
+    global store_bytes # pylint: disable=global-statement
+
+    with store_lock:
+        if journal is not None:
+            journal.append(pool, channel, data)
+        store_bytes += len(data) - len(store[pool].get(channel, b""))
+        store[pool][channel] = data
+        callbacks = waiters[pool].pop(channel, [])
+    for callback in callbacks:
+        callback(data)
+
+
+def _delete_value(pool: str, channel: Tuple[str, str]) -> None:
+    """
+    Remove the data of a channel in a given pool.
+    """
+    global store_bytes # pylint: disable=global-statement
+
+    with store_lock:
+        data = store[pool].pop(channel, None)
+        if data is not None:
+            store_bytes -= len(data)
+            if journal is not None:
+                journal.delete(pool, channel)
 
 
 def _get_value(pool: str, channel: Tuple[str, str]) -> Optional[bytes]:
     """
     Subscribe to a channel in a given pool and get it once ready.
     """
-    if channel not in store[pool]:
-        return None
-    return store[pool][channel]
+    with store_lock:
+        return store[pool].get(channel)
 
 
-def run(host: str, port: int, participants: List[str]) -> None:
+def _subscribe(pool: str, channel: Tuple[str, str], callback: Callable[[bytes], None]) -> bool:
     """
-    Register the participants, then run the server.
+    Call the callback with the data of a channel in a given pool as soon as it is available.
+
+    Return whether the callback was left waiting for the data.
+    """
+    with store_lock:
+        data = store[pool].get(channel)
+        if data is None:
+            waiters[pool][channel].append(callback)
+            return True
+    callback(data)
+    return False
+
+
+def _unsubscribe(pool: str, channel: Tuple[str, str], callback: Callable[[bytes], None]) -> None:
+    """
+    Stop waiting for the data of a channel, if the callback was not called yet.
     """
+    with store_lock:
+        callbacks = waiters[pool].get(channel)
+        if callbacks is not None and callback in callbacks:
+            callbacks.remove(callback)
+            if not callbacks:
+                del waiters[pool][channel]
+
+
+class MultiplexHandler(socketserver.BaseRequestHandler):
+    """
+    Serve the requests of a client over a persistent multiplexed connection.
+    """
+
+    def setup(self) -> None:
+        self.write_lock = threading.Lock()
+        # Retrievals of this client still waiting for a message.
+        self.subscriptions: Dict[int, Tuple[str, Tuple[str, str], Callable[[bytes], None]]] = dict()
+
+
+    def finish(self) -> None:
+        """
+        Forget the retrievals of the client when it disconnects, nobody would receive their answer.
+        """
+        with self.write_lock:
+            subscriptions = list(self.subscriptions.values())
+            self.subscriptions.clear()
+        for pool, channel, callback in subscriptions:
+            _unsubscribe(pool, channel, callback)
+
+
+    def subscribe(self, request_id: int, pool: str, channel: Tuple[str, str], accept: Optional[str]) -> None:
+        """
+        Answer a request with the data of a channel as soon as it is available.
+        """
+        def callback(data: bytes) -> None:
+            with self.write_lock:
+                self.subscriptions.pop(request_id, None)
+            self.answer(request_id, data, accept=accept)
+
+        with self.write_lock:
+            self.subscriptions[request_id] = (pool, channel, callback)
+        if not _subscribe(pool, channel, callback):
+            with self.write_lock:
+                self.subscriptions.pop(request_id, None)
+
+
+    def answer(
+            self,
+            request_id: int,
+            body: bytes = b"",
+            status: int = 200,
+            error: str = "",
+            accept: Optional[str] = None
+        ) -> None:
+        """
+        Send the answer to a request, compressed with one of the accepted encodings if large.
+        """
+        header: Dict[str, Any] = {"id": request_id, "status": status}
+        if error:
+            header["error"] = error
+        body, encoding = encode_body(body, negotiate(accept), compression_stats)
+        if encoding is not None:
+            header["encoding"] = encoding
+        try:
+            with self.write_lock:
+                send_frame(self.request, header, body)
+        except OSError:
+            # The client is gone, there is nobody to answer to.
+            pass
+
+
+    def handle(self) -> None:
+        while True:
+            try:
+                header, body = recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+
+            request_id = header["id"]
+            route = f"multiplex:{header.get('op')}"
+            start = time.perf_counter()
+            status = 200
+            try:
+                self.dispatch(request_id, header, body)
+            except BodyTooLarge as err:
+                status = 413
+                self.answer(request_id, status=status, error=str(err))
+            except Exception as err: # pylint: disable=broad-except
+                status = 500
+                self.answer(request_id, status=status, error=repr(err))
+            requests_total.inc(route=route, method="FRAME", status=str(status))
+            request_duration.observe(time.perf_counter() - start, route=route, method="FRAME")
+
+
+    def dispatch(self, request_id: int, header: Dict[str, Any], body: bytes) -> None:
+        """
+        Process a request, mirroring the HTTP routes.
+        """
+        operation = header["op"]
+        accept = header.get("accept")
+        body = decode_body(body, header.get("encoding"), decompression_stats)
+
+        if operation == "send":
+            print(
+                f"[ SEND     ] SENDER {header['sender']} / LABEL {header['label']} / RECEIVER {header['receiver']}"
+            )
+            _set_value("private", (header["receiver"], header["label"]), body)
+            self.answer(request_id)
+
+        elif operation == "publish":
+            print(f"[ PUBLISH  ] SENDER {header['sender']} / LABEL {header['label']}")
+            _set_value("public", (header["sender"], header["label"]), body)
+            self.answer(request_id)
+
+        elif operation == "retrieve_private":
+            self.subscribe(request_id, "private", (header["receiver"], header["label"]), accept)
+
+        elif operation == "retrieve_public":
+            self.subscribe(request_id, "public", (header["sender"], header["label"]), accept)
+
+        elif operation == "shares":
+            payload: Any = _triplet_payload(header["client"], header["op_id"])
+            self.answer(request_id, json.dumps(payload).encode("utf-8"), accept=accept)
+
+        elif operation == "inner_product_shares":
+            payload = _inner_product_payload(header["client"], header["op_id"], header["length"])
+            self.answer(request_id, json.dumps(payload).encode("utf-8"), accept=accept)
+
+        elif operation == "seeded_shares":
+            payload = _seeded_payload(header["client"], header["op_id"])
+            self.answer(request_id, json.dumps(payload).encode("utf-8"), accept=accept)
+
+        elif operation == "double_shares":
+            payload = _double_payload(header["client"], header["op_id"], header["threshold"])
+            self.answer(request_id, json.dumps(payload).encode("utf-8"), accept=accept)
+
+        else:
+            self.answer(request_id, status=400, error=f"Unknown operation {operation}.")
+
+
+class MultiplexServer(socketserver.ThreadingTCPServer):
+    """
+    Server accepting persistent multiplexed connections from the clients.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+    # Every client connects at the start of a protocol: with the default backlog of 5, connection
+    # attempts are dropped and only retried a second later.
+    request_queue_size = 128
+
+
+def _persist_ttp_values(op_id: str, data: bytes) -> None:
+    if journal is not None:
+        journal.append(TTP_STATE_POOL, ("values", op_id), data)
+
+
+def _forget_ttp_values(op_id: str) -> None:
+    if journal is not None:
+        journal.delete(TTP_STATE_POOL, ("values", op_id))
+
+
+def recover(journal_path: str, participants: List[str]) -> None:
+    """
+    Open the journal, and restore the store and the state of the TTP from the messages it recorded.
+
+    The participants of the TTP are recorded in the journal too: a restarted server must share the
+    correlated randomness between the same participants as before, so it refuses to resume with
+    different ones. With no participants given, the recorded ones are used.
+    """
+    global journal, store_bytes # pylint: disable=global-statement
+
+    journal = Journal(journal_path)
+    recorded: Optional[List[str]] = None
+    with store_lock:
+        for pool, channel, data in journal.replay():
+            if pool == TTP_STATE_POOL:
+                if channel == ("participants", ""):
+                    recorded = json.loads(data)
+                else:
+                    ttp.restore(channel[1], data)
+                continue
+            store[pool][channel] = data
+            store_bytes += len(data)
+            if pool == "ttp":
+                ttp_payload_clients[channel[1]].add(channel[0])
+
+    if recorded is not None:
+        if participants and sorted(participants) != sorted(recorded):
+            raise ValueError(
+                f"The journal was recorded with participants {sorted(recorded)}, not {sorted(participants)}."
+            )
+        participants = recorded
     for participant in participants:
         ttp.add_participant(participant)
+    journal.append(
+        TTP_STATE_POOL, ("participants", ""), json.dumps(sorted(ttp.participant_ids)).encode("utf-8")
+    )
+    ttp.persist = _persist_ttp_values
+    ttp.forget = _forget_ttp_values
+
+
+def run(
+        host: str,
+        port: int,
+        participants: List[str],
+        multiplex_port: Optional[int] = None,
+        journal_path: Optional[str] = None
+    ) -> None:
+    """
+    Register the participants, then run the server.
+
+    If `multiplex_port` is given, the server also accepts persistent multiplexed connections on
+    this port, in addition to the HTTP routes.
+
+    If `journal_path` is given, every stored message (including the correlated randomness of the
+    TTP) and the participants of the TTP are recorded in a journal at this path, and the store and
+    the TTP are restored from it on startup (see `recover`).
+    """
+    if journal_path is not None:
+        recover(journal_path, participants)
+    else:
+        for participant in participants:
+            ttp.add_participant(participant)
+    if multiplex_port is not None:
+        multiplex_server = MultiplexServer((host, multiplex_port), MultiplexHandler)
+        threading.Thread(target=multiplex_server.serve_forever, daemon=True).start()
     app.run(host, port, debug=True, threaded=False, processes=1, use_reloader=False)
 
 
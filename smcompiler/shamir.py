@@ -0,0 +1,305 @@
+"""
+Threshold (Shamir) secret sharing over a prime field.
+
+This is an alternative to the additive n-of-n scheme of `secret_sharing`, selected with
+`ProtocolSpec(..., backend="shamir", threshold=t)`. A secret is hidden in the constant term of a
+random polynomial of degree t, and any t + 1 shares reconstruct it, so that up to n - t - 1 slow
+parties can be ignored.
+
+Multiplying two shares yields a share of degree 2t, which is reduced back to degree t with the
+help of a designated "king" party and of a double sharing ([r]_t, [r]_2t) of a random value r:
+    1. each party sends [xy]_2t + [r]_2t to the king,
+    2. the king reconstructs e = xy + r from the first 2t + 1 shares it receives, and sends e back,
+    3. each party computes its share [xy]_t = e - [r]_t.
+This costs O(n) messages per multiplication instead of O(n^2).
+
+The shares of a party are the evaluations at its `evaluation_point`, given by its rank among the
+sorted participant IDs, so that the parties and the trusted server agree on them.
+
+Example:
+>>> shares = share_secret_shamir(42, 5, 2, PRIME)
+>>> reconstruct_secret_shamir(shares[2:], PRIME)
+42
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+
+# Field of the Shamir backend.
+PRIME = 2 ** 61 - 1
+
+
+class ShamirShare(NamedTuple):
+    """
+    A Shamir share: the evaluation y of the secret polynomial at a non-zero point x.
+
+    Unlike the additive `secret_sharing.Share`, the point x is part of the share, since the
+    reconstruction depends on which shares are combined.
+    """
+
+    x: int
+    y: int
+
+    def serialize(self) -> List[int]:
+        """Generate a representation suitable for passing in a message."""
+        return [self.x, self.y]
+
+    @staticmethod
+    def deserialize(serialized: Sequence[int]) -> ShamirShare:
+        """Restore object from its serialized representation."""
+        x, y = serialized
+        return ShamirShare(int(x), int(y))
+
+
+def evaluation_point(participant_ids: Sequence[str], participant_id: str) -> int:
+    """
+    Point at which the shares of a participant are evaluated: its rank among the sorted IDs, plus 1.
+    """
+    return sorted(participant_ids).index(participant_id) + 1
+
+
+def share_secret_shamir(secret: int, num_shares: int, threshold: int, prime: int) -> List[ShamirShare]:
+    """
+    Generate shares of a secret, any threshold + 1 of which reconstruct it.
+
+    Share i is the evaluation of the polynomial at x = i + 1.
+    """
+    if not 0 <= threshold < num_shares:
+        raise ValueError("The threshold must be smaller than the number of shares.")
+    if num_shares >= prime:
+        raise ValueError("The field is too small for this number of shares.")
+
+    coefficients = [secret % prime] + [secrets.randbelow(prime) for _ in range(threshold)]
+    return [ShamirShare(x, evaluate_polynomial(coefficients, x, prime)) for x in range(1, num_shares + 1)]
+
+
+def evaluate_polynomial(coefficients: Sequence[int], x: int, prime: int) -> int:
+    """
+    Evaluate a polynomial given by its coefficients (constant term first) with Horner's method.
+    """
+    result = 0
+    for coefficient in reversed(coefficients):
+        result = (result * x + coefficient) % prime
+    return result
+
+
+def lagrange_coefficients(xs: Sequence[int], prime: int) -> List[int]:
+    """
+    Lagrange coefficients interpolating the value at 0 of a polynomial from its values at xs.
+    """
+    if len(set(xs)) != len(xs):
+        raise ValueError("Interpolation points must be distinct.")
+
+    coefficients = []
+    for i, x_i in enumerate(xs):
+        numerator = 1
+        denominator = 1
+        for j, x_j in enumerate(xs):
+            if i != j:
+                numerator = numerator * x_j % prime
+                denominator = denominator * (x_j - x_i) % prime
+        coefficients.append(numerator * pow(denominator, -1, prime) % prime)
+    return coefficients
+
+
+def reconstruct_secret_shamir(shares: Sequence[Tuple[int, int]], prime: int) -> int:
+    """
+    Reconstruct a secret from shares. The number of shares must exceed the degree of the sharing.
+    """
+    coefficients = lagrange_coefficients([x for x, _ in shares], prime)
+    return sum(c * y for c, (_, y) in zip(coefficients, shares)) % prime
+
+
+def share_double_random(
+        num_shares: int,
+        threshold: int,
+        prime: int
+    ) -> Tuple[List[ShamirShare], List[ShamirShare]]:
+    """
+    Generate a double sharing ([r]_t, [r]_2t) of a random value r, used to reduce the degree of
+    the product of two sharings.
+    """
+    r = secrets.randbelow(prime)
+    return (
+        share_secret_shamir(r, num_shares, threshold, prime),
+        share_secret_shamir(r, num_shares, 2 * threshold, prime),
+    )
+
+
+def messages_per_multiplication(num_parties: int, backend: str) -> int:
+    """
+    Number of messages exchanged between parties for a multiplication.
+
+    The additive backend opens two masked values to every other party, while the king-based degree
+    reduction sends one share to the king and one value back.
+    """
+    if backend == "additive":
+        return 2 * num_parties * (num_parties - 1)
+    if backend == "shamir":
+        return 2 * (num_parties - 1)
+    raise ValueError(f"Unknown backend {backend}.")
+
+
+def _encode(values: List[int]) -> bytes:
+    return json.dumps(values).encode("utf-8")
+
+
+def _decode(message: bytes) -> List[int]:
+    return json.loads(message)
+
+
+def _shamir_party(comm: Any, participants: List[str], threshold: int, inputs: Dict[str, int]) -> int:
+    """
+    One party of a Shamir run computing the product of the inputs of the first two participants.
+    """
+    king = participants[0]
+    num_parties = len(participants)
+    for name, value in inputs.items():
+        for receiver, share in zip(participants, share_secret_shamir(value, num_parties, threshold, PRIME)):
+            comm.send_private_message(receiver, f"input-{name}", _encode(share.serialize()))
+    x = ShamirShare.deserialize(_decode(comm.retrieve_private_message("input-x")))
+    y = ShamirShare.deserialize(_decode(comm.retrieve_private_message("input-y")))
+
+    r_share, r2_share = comm.retrieve_double_shares("mult", threshold)
+    comm.send_private_message(king, f"mask-{comm.client_id}", _encode([x.x, (x.y * y.y + r2_share.y) % PRIME]))
+    if comm.client_id == king:
+        masked = comm.retrieve_first_private_messages([f"mask-{pid}" for pid in participants], 2 * threshold + 1)
+        e = reconstruct_secret_shamir([tuple(_decode(m)) for m in masked.values()], PRIME) # type: ignore
+        comm.publish_message("opened", _encode([e]))
+    e = _decode(comm.retrieve_public_message(king, "opened"))[0]
+
+    comm.publish_message("output", _encode([x.x, (e - r_share.y) % PRIME]))
+    outputs = [tuple(_decode(comm.retrieve_public_message(pid, "output"))) for pid in participants[:threshold + 1]]
+    return reconstruct_secret_shamir(outputs, PRIME) # type: ignore
+
+
+def _additive_party(comm: Any, participants: List[str], inputs: Dict[str, int]) -> int:
+    """
+    One party of an additive run computing the product of the inputs of the first two participants,
+    with a Beaver triplet sent by the benchmark acting as dealer.
+    """
+    num_parties = len(participants)
+    for name, value in inputs.items():
+        shares = [secrets.randbelow(PRIME) for _ in range(num_parties - 1)]
+        shares.append((value - sum(shares)) % PRIME)
+        for receiver, share in zip(participants, shares):
+            comm.send_private_message(receiver, f"input-{name}", _encode([share]))
+    x = _decode(comm.retrieve_private_message("input-x"))[0]
+    y = _decode(comm.retrieve_private_message("input-y"))[0]
+    a, b, c = _decode(comm.retrieve_private_message("triplet"))
+
+    comm.publish_message("masked", _encode([(x - a) % PRIME, (y - b) % PRIME]))
+    masked = [_decode(comm.retrieve_public_message(pid, "masked")) for pid in participants]
+    d = sum(m[0] for m in masked) % PRIME
+    e = sum(m[1] for m in masked) % PRIME
+    z = (c + x * e + y * d) % PRIME
+    if comm.client_id == participants[0]:
+        z = (z - d * e) % PRIME
+
+    comm.publish_message("output", _encode([z]))
+    return sum(_decode(comm.retrieve_public_message(pid, "output"))[0] for pid in participants) % PRIME
+
+
+def _deal_triplets(comm: Any, participants: List[str]) -> None:
+    a, b = secrets.randbelow(PRIME), secrets.randbelow(PRIME)
+    shares = []
+    for value in (a, b, a * b % PRIME):
+        split = [secrets.randbelow(PRIME) for _ in range(len(participants) - 1)]
+        split.append((value - sum(split)) % PRIME)
+        shares.append(split)
+    for receiver, triplet in zip(participants, zip(*shares)):
+        comm.send_private_message(receiver, "triplet", _encode(list(triplet)))
+
+
+def time_protocol_run(backend: str, num_parties: int, threshold: int, repetitions: int) -> float:
+    """
+    Average wall-clock time of a protocol run multiplying two secrets, in seconds.
+
+    The parties are threads talking to an in-process trusted server over the multiplexed
+    connection, so that the time includes the messages and the rounds of the protocol.
+    """
+    # Imported here, so that the sharing functions do not depend on the server.
+    import server
+    from communication import Communication
+
+    participants = [f"party{i:03d}" for i in range(num_parties)]
+    for participant in participants:
+        server.ttp.add_participant(participant)
+    mux = server.MultiplexServer(("localhost", 0), server.MultiplexHandler)
+    threading.Thread(target=mux.serve_forever, daemon=True).start()
+    host, port = str(mux.server_address[0]), int(mux.server_address[1])
+    host = str(host)
+
+    def party(run: int, pid: str, results: Dict[str, int]) -> None:
+        comm = Communication(host, 0, pid, label_prefix=f"{backend}{run}", multiplex_port=port)
+        inputs = {"x": 6} if pid == participants[0] else {"y": 7} if pid == participants[1] else {}
+        if backend == "shamir":
+            results[pid] = _shamir_party(comm, participants, threshold, inputs)
+        else:
+            results[pid] = _additive_party(comm, participants, inputs)
+        comm.multiplex.close() # type: ignore
+
+    start = time.perf_counter()
+    # Silence the log lines of the clients and of the server.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for run in range(repetitions):
+            results: Dict[str, int] = dict()
+            threads = [threading.Thread(target=party, args=(run, pid, results)) for pid in participants]
+            for thread in threads:
+                thread.start()
+            if backend == "additive":
+                dealer = Communication(host, 0, "dealer", label_prefix=f"{backend}{run}", multiplex_port=port)
+                _deal_triplets(dealer, participants)
+                dealer.multiplex.close() # type: ignore
+            for thread in threads:
+                thread.join()
+            if set(results.values()) != {42}:
+                raise RuntimeError(f"The {backend} run computed {results}.")
+    elapsed = (time.perf_counter() - start) / repetitions
+
+    mux.shutdown()
+    mux.server_close()
+    return elapsed
+
+
+def main(args: List[str]) -> None:
+    """
+    Compare the additive and threshold backends for a number of parties.
+    """
+    parser = argparse.ArgumentParser(description="Compare the additive and Shamir backends.")
+    parser.add_argument("-n", "--parties", help="Number of parties.", type=int, default=20)
+    parser.add_argument("-t", "--threshold", help="Degree of the sharings.", type=int, default=None)
+    parser.add_argument("-r", "--repetitions", help="Number of timed protocol runs.", type=int, default=10)
+    namespace = parser.parse_args(args)
+
+    num_parties = namespace.parties
+    threshold = namespace.threshold if namespace.threshold is not None else (num_parties - 1) // 3
+
+    times = {
+        backend: time_protocol_run(backend, num_parties, threshold, namespace.repetitions)
+        for backend in ("additive", "shamir")
+    }
+
+    print(f"{'backend':>10} {'msgs/mult':>10} {'stragglers':>11} {'run (ms)':>10}")
+    print(
+        f"{'additive':>10} {messages_per_multiplication(num_parties, 'additive'):>10}"
+        f" {0:>11} {times['additive'] * 1e3:>10.1f}"
+    )
+    print(
+        f"{'shamir':>10} {messages_per_multiplication(num_parties, 'shamir'):>10}"
+        f" {num_parties - 2 * threshold - 1:>11} {times['shamir'] * 1e3:>10.1f}"
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
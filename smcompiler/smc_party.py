@@ -6,9 +6,16 @@ MODIFY THIS FILE.
 # You might want to import more classes if needed.
 
 import collections
+import copy
 import json
+from concurrent.futures import ThreadPoolExecutor
 from typing import (
     Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
     Set,
     Tuple,
     Union
@@ -19,7 +26,9 @@ from expression import (
     Expression,
     Secret
 )
+from parallel import Gate, pack_gates, ParallelEvaluator, SharedVector
 from protocol import ProtocolSpec
+from reconstruction import reconstruct_tree
 from secret_sharing import(
     reconstruct_secret,
     share_secret,
@@ -38,8 +47,13 @@ class SMCParty:
         client_id: Identifier of this client
         server_host: hostname of the server
         server_port: port of the server
-        protocol_spec (ProtocolSpec): Protocol specification
+        protocol_spec (ProtocolSpec): Protocol specification, with the default "additive" backend
         value_dict (dict): Dictionary assigning values to secrets belonging to this client.
+        local_workers (int): Number of processes evaluating the local gates of each layer of the
+            circuit (see `prepare_local_layers`). With 1, gates are evaluated in this process.
+        multiplex_port: port of the multiplexed endpoint of the server, if messages should go
+            through a persistent connection instead of HTTP requests.
+        compression: encoding used to compress large messages (see `compression.py`), if any.
     """
 
     def __init__(
@@ -48,22 +62,174 @@ class SMCParty:
             server_host: str,
             server_port: int,
             protocol_spec: ProtocolSpec,
-            value_dict: Dict[Secret, int]
+            value_dict: Dict[Secret, int],
+            local_workers: int = 1,
+            multiplex_port: Optional[int] = None,
+            compression: Optional[str] = None
         ):
-        self.comm = Communication(server_host, server_port, client_id)
+        if protocol_spec.backend != "additive":
+            raise ValueError(
+                f"SMCParty only evaluates additive sharings, not the {protocol_spec.backend} backend:"
+                " use the building blocks of `shamir.py` instead."
+            )
+
+        self.comm = Communication(
+            server_host,
+            server_port,
+            client_id,
+            multiplex_port=multiplex_port,
+            compression=compression
+        )
 
         self.client_id = client_id
+        self.server_host = server_host
+        self.server_port = server_port
         self.protocol_spec = protocol_spec
         self.value_dict = value_dict
+        self.local_workers = local_workers
+        self.multiplex_port = multiplex_port
+        self.compression = compression
+        self.evaluator: Optional[ParallelEvaluator] = None
+        self.wires: Optional[SharedVector] = None
+        self.local_layers: List[SharedVector] = []
 
 
     def run(self) -> int:
         """
         The method the client use to do the SMC.
+
+        Reconstruct the output from the final share of this party with `reconstruct_output`, which
+        follows `protocol_spec.reconstruction` and returns None to parties outside of
+        `protocol_spec.output_ids`.
         """
         raise NotImplementedError("You need to implement this method.")
 
 
+    def reconstruct_output(self, share: Share, label: str = "output") -> Optional[int]:
+        """
+        Reconstruct the output of the protocol from the final share of this party.
+
+        With the "broadcast" reconstruction, every party sends its share to the output parties
+        (publicly if all parties learn the output). With the "tree" reconstruction, the shares are
+        summed along a tree of parties (see `reconstruction.reconstruct_tree`).
+
+        Returns the output, or None if this party is not an output party.
+        """
+        spec = self.protocol_spec
+        if spec.reconstruction == "tree":
+            return reconstruct_tree(
+                self.comm, spec.participant_ids, share, label, spec.fanout, spec.output_ids
+            )
+
+        message = json.dumps(share.serialize())
+        if spec.output_ids is None:
+            self.comm.publish_message(label, message)
+            messages = [self.comm.retrieve_public_message(pid, label) for pid in spec.participant_ids]
+        else:
+            for output_id in spec.output_ids:
+                self.comm.send_private_message(output_id, f"{label}-{self.client_id}", message)
+            if self.client_id not in spec.output_ids:
+                return None
+            messages = [
+                self.comm.retrieve_private_message(f"{label}-{pid}") for pid in spec.participant_ids
+            ]
+        return reconstruct_secret([Share.deserialize(json.loads(m)) for m in messages])
+
+
+    def run_stream(
+            self,
+            value_stream: Iterable[Dict[Secret, int]],
+            pipeline_depth: int = 2
+        ) -> Iterator[int]:
+        """
+        Execute the protocol once for each dictionary of values of the stream, and yield the
+        results in order.
+
+        Up to `pipeline_depth` executions are in flight at once, so that the inputs of the next
+        execution are shared while the current one is being evaluated. All parties must feed streams
+        of the same length.
+        """
+        with ThreadPoolExecutor(max_workers=pipeline_depth) as executor:
+            pending: collections.deque = collections.deque()
+            for index, value_dict in enumerate(value_stream):
+                pending.append(executor.submit(self._run_round, index, value_dict))
+                if len(pending) >= pipeline_depth:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+
+    def _run_round(
+            self,
+            index: int,
+            value_dict: Dict[Secret, int]
+        ) -> int:
+        """
+        Execute one round of a stream, with messages namespaced by the round index.
+
+        The round reuses the communication of this party, with its label prefix extended by the
+        round index, so that all rounds share one connection to the server.
+        """
+        party = copy.copy(self)
+        party.value_dict = value_dict
+        party.comm = self.comm.with_prefix(f"round{index}")
+        party.evaluator = None
+        party.wires = None
+        party.local_layers = []
+        try:
+            return party.run()
+        finally:
+            party.close()
+
+
+    def prepare_local_layers(
+            self,
+            num_wires: int,
+            layers: Sequence[Sequence[Gate]],
+            modulus: int
+        ) -> SharedVector:
+        """
+        Allocate the wire values of the circuit in shared memory, and pack its layers of local gates
+        (additions, subtractions and operations with scalars, see `parallel.py`) once.
+
+        Returns the vector of wire values, which stays resident until `close`: write the value of
+        each share to `wires.values[wire]` (reduced modulo `modulus`) as soon as it is known, and
+        read the outputs of a layer there after `evaluate_local_layer`. The layers are split between
+        `local_workers` processes, which only receive the indices of the gates to evaluate.
+        """
+        self.close()
+        self.evaluator = ParallelEvaluator(self.local_workers, modulus)
+        self.evaluator.start()
+        self.wires = SharedVector.zeros(num_wires)
+        self.local_layers = [pack_gates(gates, modulus) for gates in layers]
+        return self.wires
+
+
+    def evaluate_local_layer(self, layer: int) -> None:
+        """
+        Evaluate in place the local layer of the given index, prepared by `prepare_local_layers`.
+        Small layers are evaluated in this process.
+        """
+        if self.evaluator is None or self.wires is None:
+            raise RuntimeError("Prepare the local layers before evaluating them.")
+        self.evaluator.evaluate_layer(self.wires, self.local_layers[layer])
+
+
+    def close(self) -> None:
+        """
+        Stop the worker processes of the local evaluation, and free the wires and layers, if any.
+        """
+        if self.evaluator is not None:
+            self.evaluator.close()
+            self.evaluator = None
+        for vector in self.local_layers:
+            vector.close()
+        self.local_layers = []
+        if self.wires is not None:
+            self.wires.close()
+            self.wires = None
+
+
     # Suggestion: To process expressions, make use of the *visitor pattern* like so:
     def process_expression(
             self,
@@ -75,6 +241,15 @@ class SMCParty:
         # if expr is a multiplication operation:
         #     ...
 
+        # if expr is an inner product:
+        #     Retrieve the correlated vectors with `self.comm.retrieve_inner_product_shares` (the
+        #     values of the shares, to wrap in `Share`), and publish all masked values
+        #     (x_i - a_i, y_i - b_i) in a single message.
+
+        # Local operations of the same depth can be gathered in layers of gates, prepared once with
+        # `self.prepare_local_layers` and evaluated with `self.evaluate_local_layer` to use
+        # `self.local_workers` processes.
+
         # if expr is a secret:
         #     ...
 
@@ -0,0 +1,83 @@
+"""
+Unit tests for the compression of message bodies.
+"""
+
+import os
+import zlib
+
+import pytest
+
+from compression import (
+    BodyTooLarge,
+    COMPRESSION_THRESHOLD,
+    CompressionStats,
+    decode_body,
+    encode_body,
+    negotiate,
+)
+
+
+def test_negotiate():
+    assert negotiate("gzip, deflate") == "deflate"
+    assert negotiate("deflate;q=0.5") == "deflate"
+    assert negotiate("gzip") is None
+    assert negotiate(None) is None
+
+
+def test_small_bodies_are_not_compressed():
+    body = b"0" * (COMPRESSION_THRESHOLD - 1)
+    assert encode_body(body, "deflate") == (body, None)
+
+
+def test_incompressible_bodies_are_sent_as_is():
+    body = os.urandom(4 * COMPRESSION_THRESHOLD)
+    assert encode_body(body, "deflate") == (body, None)
+
+
+def test_round_trip_and_stats():
+    body = b"[123456789, 987654321]" * 1000
+    sent_stats = CompressionStats()
+    received_stats = CompressionStats()
+
+    wire, encoding = encode_body(body, "deflate", sent_stats)
+    assert encoding == "deflate"
+    assert len(wire) < len(body)
+    assert decode_body(wire, encoding, received_stats) == body
+
+    for stats in (sent_stats, received_stats):
+        summary = stats.to_dict()
+        assert summary["compressed_messages"] == 1
+        assert summary["raw_bytes"] == len(body)
+        assert summary["wire_bytes"] == len(wire)
+        assert summary["ratio"] > 1
+
+
+def test_decompressed_size_is_capped():
+    bomb = zlib.compress(b"\x00" * (1024 * 1024))
+    assert len(decode_body(bomb, "deflate", max_size=1024 * 1024)) == 1024 * 1024
+    with pytest.raises(BodyTooLarge):
+        decode_body(bomb, "deflate", max_size=1024 * 1024 - 1)
+    with pytest.raises(ValueError):
+        decode_body(bomb[:-8], "deflate")
+
+
+def test_responses_compressed_on_opt_in(monkeypatch):
+    import collections
+
+    import server
+    from compression import ACCEPT_HEADER
+
+    monkeypatch.setattr(server, "store", collections.defaultdict(dict))
+    monkeypatch.setattr(server, "store_bytes", 0)
+
+    body = b"compressible " * 1000
+    server._set_value("private", ("Alice", "opt-in"), body)
+    client = server.app.test_client()
+
+    plain = client.get("/private/Alice/opt-in", headers={"Accept-Encoding": "gzip, deflate"})
+    assert "Content-Encoding" not in plain.headers
+    assert plain.data == body
+
+    compressed = client.get("/private/Alice/opt-in", headers={ACCEPT_HEADER: "deflate"})
+    assert compressed.headers["Content-Encoding"] == "deflate"
+    assert decode_body(compressed.data, "deflate") == body
@@ -0,0 +1,78 @@
+"""
+Unit tests for the static cost estimator.
+"""
+
+from cost import estimate_cost
+from expression import Expression, InnerProduct, Scalar, Secret
+from protocol import ProtocolSpec
+
+
+class Addition(Expression):
+    def __init__(self, left, right):
+        self.left, self.right = left, right
+        super().__init__()
+
+
+class Multiplication(Expression):
+    def __init__(self, left, right):
+        self.left, self.right = left, right
+        super().__init__()
+
+
+def test_inner_product_cost():
+    left = [Secret() for _ in range(4)]
+    right = [Secret() for _ in range(3)] + [Scalar(2)]
+    spec = ProtocolSpec(["Alice", "Bob", "Charlie"], InnerProduct(left, right))
+
+    report = estimate_cost(spec)
+
+    assert report.secret_inputs == 7
+    assert report.inner_products == 1
+    # The product with the scalar is local.
+    assert report.inner_product_terms == 3
+    assert report.scalar_multiplications == 1
+    assert report.multiplicative_depth == 1
+    assert report.rounds == 3
+    assert report.bytes_ttp(share_bytes=10, message_overhead=0) == 3 * (2 * 3 + 1) * 10
+
+
+def test_secrets_counted_once():
+    secret = Secret()
+    spec = ProtocolSpec(["Alice", "Bob"], InnerProduct([secret, secret], [secret, secret]))
+    assert estimate_cost(spec).secret_inputs == 1
+
+
+def test_binary_operations():
+    a, b, c = Secret(), Secret(), Secret()
+    # (a * b + c * 3) * (a + 2)
+    expr = Multiplication(
+        Addition(Multiplication(a, b), Multiplication(c, Scalar(3))),
+        Addition(a, Scalar(2))
+    )
+    report = estimate_cost(ProtocolSpec(["Alice", "Bob"], expr))
+
+    assert report.secret_inputs == 3
+    assert report.additions == 2
+    assert report.scalar_multiplications == 1
+    assert report.beaver_multiplications == 2
+    assert report.multiplicative_depth == 2
+
+
+def test_local_inner_product():
+    secret = Secret()
+    spec = ProtocolSpec(["Alice", "Bob"], InnerProduct([secret, Scalar(1)], [Scalar(2), secret]))
+    report = estimate_cost(spec)
+
+    assert report.inner_products == 0
+    assert report.scalar_multiplications == 2
+    assert report.multiplicative_depth == 0
+
+
+def test_transport_options():
+    spec = ProtocolSpec(["Alice", "Bob", "Charlie"], InnerProduct([Secret(), Secret()], [Secret(), Secret()]))
+    report = estimate_cost(spec)
+
+    plain = report.bytes_per_party()
+    assert report.bytes_per_party(seeded_inputs=True) < plain
+    assert report.bytes_per_party(compression_ratio=2.0) < plain
+    assert report.bytes_per_party(multiplexed=True) < plain
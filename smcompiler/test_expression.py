@@ -5,7 +5,9 @@ Testing expressions is not obligatory.
 MODIFY THIS FILE.
 """
 
-from expression import Secret, Scalar
+import pytest
+
+from expression import InnerProduct, Secret, Scalar
 
 
 # Example test, you can adapt it to your needs.
@@ -17,5 +19,16 @@ def test_expr_construction():
     # assert repr(expr) == "((Secret(1) + Secret(2)) * Secret(3) * Scalar(4) + Scalar(3))"
 
 
+def test_inner_product_construction():
+    expr = InnerProduct([Scalar(1), Scalar(2)], [Scalar(3), Scalar(4)])
+    assert len(expr) == 2
+    assert repr(expr) == "InnerProduct(Scalar(1) * Scalar(3) + Scalar(2) * Scalar(4))"
+
+
+def test_inner_product_length_mismatch():
+    with pytest.raises(ValueError):
+        InnerProduct([Scalar(1)], [Scalar(2), Scalar(3)])
+
+
 def test():
     raise NotImplementedError("You can create some tests.")
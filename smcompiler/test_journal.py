@@ -0,0 +1,79 @@
+"""
+Unit tests for the journal of the server store.
+"""
+
+from journal import Journal
+
+
+def test_replay_after_reopen(tmp_path):
+    path = tmp_path / "store.db"
+
+    journal = Journal(path)
+    journal.append("private", ("Bob", "label1"), b"first")
+    journal.append("public", ("Alice", "final"), b"\x00\x01")
+    journal.append("private", ("Bob", "label1"), b"overwritten")
+    journal.close()
+
+    recovered = Journal(path)
+    entries = sorted(recovered.replay())
+    recovered.close()
+
+    assert entries == [
+        ("private", ("Bob", "label1"), b"overwritten"),
+        ("public", ("Alice", "final"), b"\x00\x01"),
+    ]
+
+
+def test_recover_ttp_state(tmp_path, monkeypatch):
+    import collections
+
+    import pytest
+
+    import server
+    from ttp import TrustedParamGenerator
+
+    path = tmp_path / "store.db"
+
+    def restart(participants):
+        if server.journal is not None:
+            server.journal.close()
+        monkeypatch.setattr(server, "ttp", TrustedParamGenerator())
+        monkeypatch.setattr(server, "store", collections.defaultdict(dict))
+        monkeypatch.setattr(server, "journal", None)
+        server.recover(str(path), participants)
+
+    restart(["Bob", "Alice"])
+    server.ttp.values_for("op1", lambda: {"Alice": 1, "Bob": 2})
+
+    restart([])
+    assert server.ttp.participant_ids == {"Alice", "Bob"}
+    assert server.ttp.values_for("op1", lambda: None) == {"Alice": 1, "Bob": 2}
+
+    with pytest.raises(ValueError):
+        restart(["Alice", "Charlie"])
+    server.journal.close()
+
+
+def test_evict_served_ttp_payloads(tmp_path, monkeypatch):
+    import collections
+
+    import server
+    from ttp import TrustedParamGenerator
+
+    monkeypatch.setattr(server, "ttp", TrustedParamGenerator())
+    monkeypatch.setattr(server, "store", collections.defaultdict(dict))
+    monkeypatch.setattr(server, "ttp_payload_clients", collections.defaultdict(set))
+    monkeypatch.setattr(server, "journal", None)
+    monkeypatch.setattr(server, "store_bytes", 0)
+    server.recover(str(tmp_path / "store.db"), ["Alice", "Bob"])
+
+    alice = server._double_payload("Alice", "op", 0)
+    assert server.store["ttp"] and server.ttp.op_values
+    # A retried request gets the same payload.
+    assert server._double_payload("Alice", "op", 0) == alice
+    server._double_payload("Bob", "op", 0)
+
+    assert not server.store["ttp"] and not server.ttp.op_values and not server.ttp.retrievals
+    assert server.store_bytes == 0
+    assert not [entry for entry in server.journal.replay() if entry[0] != server.TTP_STATE_POOL or entry[1][0] != "participants"]
+    server.journal.close()
@@ -0,0 +1,30 @@
+"""
+Unit tests for the metrics of the trusted server.
+"""
+
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value, route="/shares")
+
+    lines = histogram.render().splitlines()
+    assert 'latency_seconds_bucket{route="/shares",le="0.1"} 2.0' in lines
+    assert 'latency_seconds_bucket{route="/shares",le="1.0"} 3.0' in lines
+    assert 'latency_seconds_bucket{route="/shares",le="+Inf"} 4.0' in lines
+    assert 'latency_seconds_count{route="/shares"} 4.0' in lines
+    assert 'latency_seconds_sum{route="/shares"} 2.65' in lines
+
+
+def test_registry_render():
+    registry = Registry()
+    counter = registry.register(Counter("requests_total", "Requests.", ("route",)))
+    registry.register(Gauge("entries", "Entries.", lambda: 3))
+    counter.inc(route='/private/"x"')
+    counter.inc(2, route='/private/"x"')
+
+    rendered = registry.render()
+    assert 'requests_total{route="/private/\\"x\\""} 3.0' in rendered
+    assert "# TYPE entries gauge\nentries 3.0\n" in rendered
@@ -0,0 +1,108 @@
+"""
+Unit tests for the multiplexed connection framing.
+"""
+
+import socket
+import socketserver
+import threading
+import time
+
+import pytest
+
+from multiplex import MultiplexClient, MultiplexError, recv_frame, send_frame
+
+
+class DelayedEchoHandler(socketserver.BaseRequestHandler):
+    """Echo bodies back, answering requests with a "delay" after the following ones."""
+
+    def handle(self):
+        lock = threading.Lock()
+
+        def answer(header, body):
+            time.sleep(header.get("delay", 0))
+            with lock:
+                if header.get("unknown"):
+                    send_frame(self.request, {"id": -1, "status": 200}, b"stray")
+                if header.get("hangup"):
+                    self.request.shutdown(socket.SHUT_RDWR)
+                    return
+                try:
+                    if header.get("fail"):
+                        send_frame(self.request, {"id": header["id"], "status": 500, "error": "failed"})
+                    else:
+                        send_frame(self.request, {"id": header["id"], "status": 200}, body)
+                except OSError:
+                    pass
+
+        while True:
+            try:
+                header, body = recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+            threading.Thread(target=answer, args=(header, body), daemon=True).start()
+
+
+@pytest.fixture
+def echo_server():
+    server = socketserver.ThreadingTCPServer(("localhost", 0), DelayedEchoHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def test_answers_out_of_order(echo_server):
+    client = MultiplexClient(*echo_server)
+    slow = client.request({"delay": 0.2}, b"slow")
+    fast = client.request({}, b"fast" * 100_000)
+
+    assert fast.result(timeout=5) == b"fast" * 100_000
+    assert not slow.done()
+    assert slow.result(timeout=5) == b"slow"
+    client.close()
+
+
+def test_error_answer(echo_server):
+    client = MultiplexClient(*echo_server)
+    with pytest.raises(MultiplexError):
+        client.request({"fail": True}).result(timeout=5)
+    client.close()
+
+
+def test_unknown_answer_ignored(echo_server):
+    client = MultiplexClient(*echo_server)
+    assert client.request({"unknown": True}, b"body").result(timeout=5) == b"body"
+    client.close()
+
+
+def test_pending_failed_on_disconnect(echo_server):
+    client = MultiplexClient(*echo_server)
+    waiting = client.request({"delay": 0.5}, b"late")
+    with pytest.raises(ConnectionError):
+        client.request({"hangup": True}).result(timeout=5)
+    with pytest.raises(ConnectionError):
+        waiting.result(timeout=5)
+    client.close()
+
+
+def test_waiters_removed_on_disconnect():
+    import server
+
+    mux = server.MultiplexServer(("localhost", 0), server.MultiplexHandler)
+    threading.Thread(target=mux.serve_forever, daemon=True).start()
+    try:
+        client = MultiplexClient(*mux.server_address)
+        client.request({"op": "retrieve_private", "receiver": "Alice", "label": "never-sent"})
+        deadline = time.monotonic() + 5
+        while server._pending_waiters() == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert server._pending_waiters() == 1
+
+        client.close()
+        while server._pending_waiters() > 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert server._pending_waiters() == 0
+    finally:
+        mux.shutdown()
+        mux.server_close()
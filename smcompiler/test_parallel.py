@@ -0,0 +1,82 @@
+"""
+Unit tests for the parallel evaluation of local gates.
+"""
+
+import pytest
+
+from expression import Secret
+from parallel import (
+    ADD,
+    ADD_SCALAR,
+    MUL_SCALAR,
+    SUB,
+    pack_gates,
+    ParallelEvaluator,
+    random_layer,
+    SharedVector,
+)
+from protocol import ProtocolSpec
+from smc_party import SMCParty
+
+
+def test_layer_evaluation():
+    layer = [(ADD, 3, 0, 1), (SUB, 4, 0, 2), (ADD_SCALAR, 5, 1, 10), (MUL_SCALAR, 6, 2, 3)]
+    with SharedVector.create([5, 7, 9, 0, 0, 0, 0]) as wires, pack_gates(layer) as gates:
+        with ParallelEvaluator(1, 11) as evaluator:
+            evaluator.evaluate_layer(wires, gates)
+        assert wires.to_list() == [5, 7, 9, 1, 7, 6, 5]
+
+
+def test_parallel_matches_serial():
+    modulus = 2 ** 61 - 1
+    values, layer = random_layer(2000, modulus)
+
+    results = []
+    for num_workers in (1, 3):
+        with SharedVector.create(values) as wires, pack_gates(layer) as gates:
+            with ParallelEvaluator(num_workers, modulus, min_chunk=1) as evaluator:
+                evaluator.evaluate_layer(wires, gates)
+            results.append(wires.to_list())
+
+    assert results[0] == results[1]
+
+
+def test_out_of_range_values():
+    with pytest.raises(ValueError):
+        SharedVector.create([-1])
+    with pytest.raises(ValueError):
+        SharedVector.create([2 ** 64])
+
+    layer = [(ADD_SCALAR, 1, 0, -3), (MUL_SCALAR, 2, 0, 2 ** 70)]
+    with ParallelEvaluator(1, 11) as evaluator:
+        assert evaluator.evaluate([-1, 0, 0], layer) == [10, 7, 10 * 2 ** 70 % 11]
+
+
+def test_party_layers_stay_resident():
+    modulus = 2 ** 61 - 1
+    values, first = random_layer(3000, modulus)
+    # The second layer reads the outputs of the first one.
+    second = [(ADD, out - 3000, out, out) for out in range(3000, 6000)]
+    expected = list(values)
+    for layer in (first, second):
+        for opcode, out, left, right in layer:
+            if opcode == ADD:
+                expected[out] = (expected[left] + expected[right]) % modulus
+            elif opcode == SUB:
+                expected[out] = (expected[left] - expected[right]) % modulus
+            elif opcode == ADD_SCALAR:
+                expected[out] = (expected[left] + right) % modulus
+            else:
+                expected[out] = (expected[left] * right) % modulus
+
+    party = SMCParty("Alice", "localhost", 5000, ProtocolSpec(["Alice"], Secret()), {}, local_workers=2)
+    try:
+        wires = party.prepare_local_layers(len(values), [first, second], modulus)
+        for wire, value in enumerate(values):
+            wires.values[wire] = value
+        party.evaluate_local_layer(0)
+        party.evaluate_local_layer(1)
+        assert wires.to_list() == expected
+    finally:
+        party.close()
+    assert party.wires is None and party.evaluator is None
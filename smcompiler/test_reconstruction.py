@@ -0,0 +1,24 @@
+"""
+Unit tests for the tree-based output reconstruction.
+"""
+
+import pytest
+
+from reconstruction import tree_children, tree_order, tree_parent
+
+
+@pytest.mark.parametrize("num_parties,fanout", [(1, 2), (7, 2), (20, 3), (20, 19)])
+def test_tree_covers_all_parties(num_parties, fanout):
+    reached = {0}
+    pending = [0]
+    while pending:
+        position = pending.pop()
+        for child in tree_children(position, num_parties, fanout):
+            assert tree_parent(child, fanout) == position
+            reached.add(child)
+            pending.append(child)
+    assert reached == set(range(num_parties))
+
+
+def test_tree_order_starts_with_aggregator():
+    assert tree_order(["Alice", "Bob", "Charlie"], "Bob") == ["Bob", "Alice", "Charlie"]
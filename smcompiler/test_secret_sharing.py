@@ -5,6 +5,32 @@ Testing secret sharing is not obligatory.
 MODIFY THIS FILE.
 """
 
+from secret_sharing import expand_seed, expand_seeded_shares, gen_seed, share_secrets_seeded, SEED_BYTES
+
+
+def test_expand_seed_deterministic():
+    seed = gen_seed()
+    assert len(seed) == SEED_BYTES
+    assert expand_seed(seed, 10, 101) == expand_seed(seed, 10, 101)
+    assert expand_seed(seed, 5, 101) == expand_seed(seed, 10, 101)[:5]
+
+
+def test_expand_seed_range():
+    modulus = 2 ** 61 - 1
+    values = expand_seed(gen_seed(), 1000, modulus)
+    assert len(values) == 1000
+    assert all(0 <= value < modulus for value in values)
+    assert expand_seed(b"\x00" * SEED_BYTES, 8, modulus) != expand_seed(b"\x01" * SEED_BYTES, 8, modulus)
+
+
+def test_share_secrets_seeded():
+    modulus = 2 ** 61 - 1
+    values = [0, 1, 42, modulus - 1]
+    seeds, corrections = share_secrets_seeded(values, 4, modulus)
+    assert len(seeds) == 3
+    shares = [corrections] + [expand_seeded_shares(seed, len(values), modulus) for seed in seeds]
+    assert [sum(column) % modulus for column in zip(*shares)] == values
+
 
 def test():
     raise NotImplementedError("You can create some tests.")
@@ -0,0 +1,86 @@
+"""
+Unit tests for the threshold (Shamir) secret sharing backend.
+"""
+
+import random
+
+import pytest
+
+from expression import Secret
+from protocol import ProtocolSpec
+from smc_party import SMCParty
+from shamir import (
+    evaluation_point,
+    reconstruct_secret_shamir,
+    share_double_random,
+    share_secret_shamir,
+    ShamirShare,
+    PRIME,
+)
+from ttp import TrustedParamGenerator
+
+
+def test_any_subset_reconstructs():
+    shares = share_secret_shamir(1234, 7, 2, PRIME)
+    for _ in range(10):
+        subset = random.sample(shares, 3)
+        assert reconstruct_secret_shamir(subset, PRIME) == 1234
+
+
+def test_king_degree_reduction():
+    num_parties, threshold = 7, 3
+    x_shares = share_secret_shamir(6, num_parties, threshold, PRIME)
+    y_shares = share_secret_shamir(7, num_parties, threshold, PRIME)
+    r_shares, r2_shares = share_double_random(num_parties, threshold, PRIME)
+
+    # Parties send [xy]_2t + [r]_2t to the king, who opens e from the first 2t + 1 arrivals.
+    masked = [
+        (x, (xy * yy + r2) % PRIME)
+        for (x, xy), (_, yy), (_, r2) in zip(x_shares, y_shares, r2_shares)
+    ]
+    e = reconstruct_secret_shamir(random.sample(masked, 2 * threshold + 1), PRIME)
+
+    product_shares = [(x, (e - r) % PRIME) for x, r in r_shares]
+    assert reconstruct_secret_shamir(product_shares[-(threshold + 1):], PRIME) == 42
+
+
+def test_protocol_spec_threshold():
+    spec = ProtocolSpec(["A", "B", "C", "D"], Secret(), backend="shamir")
+    assert spec.threshold == 1
+    assert spec.king_id == "A"
+
+    with pytest.raises(ValueError):
+        ProtocolSpec(["A", "B", "C", "D"], Secret(), backend="shamir", threshold=2)
+    with pytest.raises(ValueError):
+        ProtocolSpec(["A", "B"], Secret(), backend="replicated")
+
+
+def test_party_rejects_shamir_backend():
+    spec = ProtocolSpec(["A", "B", "C", "D"], Secret(), backend="shamir")
+    with pytest.raises(ValueError):
+        SMCParty("A", "localhost", 5000, spec, {})
+
+
+def test_share_serialization():
+    share = share_secret_shamir(5, 3, 1, PRIME)[1]
+    assert share.x == 2
+    assert ShamirShare.deserialize(share.serialize()) == share
+
+
+def test_ttp_double_shares_threshold():
+    participants = ["Dave", "Alice", "Charlie", "Bob", "Eve"]
+    ttp = TrustedParamGenerator()
+    for participant in participants:
+        ttp.add_participant(participant)
+
+    for threshold in (1, 2):
+        shares = {pid: ttp.retrieve_double_share(pid, "op", threshold) for pid in participants}
+        assert all(r.x == evaluation_point(participants, pid) for pid, (r, _) in shares.items())
+
+        r_shares = [r for r, _ in shares.values()]
+        r2_shares = [r2 for _, r2 in shares.values()]
+        r = reconstruct_secret_shamir(r_shares[:threshold + 1], PRIME)
+        assert reconstruct_secret_shamir(r_shares[-(threshold + 1):], PRIME) == r
+        assert reconstruct_secret_shamir(r2_shares[:2 * threshold + 1], PRIME) == r
+        # A sharing of degree 2 * threshold is not determined by fewer shares.
+        assert reconstruct_secret_shamir(r2_shares[:2 * threshold], PRIME) != r
@@ -0,0 +1,117 @@
+"""
+Tests for the streaming execution of a protocol.
+"""
+
+import socket
+import threading
+import time
+from multiprocessing import Process, Queue
+
+import pytest
+
+from communication import Communication
+from expression import Secret
+from protocol import ProtocolSpec
+from server import run
+
+from smc_party import SMCParty
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("localhost", 0))
+        return sock.getsockname()[1]
+
+
+def test_stream_order_and_depth(monkeypatch):
+    """
+    Results are yielded in the order of the stream, with at most `pipeline_depth` rounds in flight.
+    """
+    lock = threading.Lock()
+    in_flight = []
+    peak = []
+
+    def fake_round(self, index, value_dict):
+        with lock:
+            in_flight.append(index)
+            peak.append(len(in_flight))
+        # Later rounds finish first, to check that the results are reordered.
+        time.sleep(0.05 / (index + 1))
+        with lock:
+            in_flight.remove(index)
+        return value_dict["x"]
+
+    monkeypatch.setattr(SMCParty, "_run_round", fake_round)
+    secret = Secret()
+    prot = ProtocolSpec(expr=secret, participant_ids=["Alice"])
+    cli = SMCParty("Alice", "localhost", free_port(), protocol_spec=prot, value_dict=dict())
+
+    stream = [{"x": value} for value in range(6)]
+    assert list(cli.run_stream(stream, pipeline_depth=3)) == list(range(6))
+    assert max(peak) <= 3
+
+
+def test_round_prefix():
+    """
+    The prefix of a round extends the prefix of the caller, and the round shares its connection.
+    """
+    comm = Communication("localhost", free_port(), "Alice", label_prefix="job", multiplex_port=free_port())
+    view = comm.with_prefix("round3")
+
+    assert view._prefixed("label") == "job-round3-label"
+    assert comm._prefixed("label") == "job-label"
+    assert view.multiplex is comm.multiplex
+
+    assert Communication("localhost", 0, "Alice").with_prefix("round0")._prefixed("x") == "round0-x"
+
+
+def smc_stream_client(client_id, port, prot, value_stream, queue):
+    cli = SMCParty(
+        client_id,
+        "localhost",
+        port,
+        protocol_spec=prot,
+        value_dict=dict()
+    )
+    queue.put((client_id, list(cli.run_stream(value_stream))))
+
+
+@pytest.mark.xfail(reason="requires SMCParty.run", strict=False)
+def test_stream_sum():
+    """
+    f(a, b) = a + b, evaluated over a stream of three pairs of inputs.
+    """
+    alice_secret = Secret()
+    bob_secret = Secret()
+
+    parties = {
+        "Alice": [{alice_secret: value} for value in (3, 10, 7)],
+        "Bob": [{bob_secret: value} for value in (14, 2, 0)],
+    }
+
+    prot = ProtocolSpec(expr=alice_secret + bob_secret, participant_ids=list(parties))
+
+    port = free_port()
+    queue = Queue()
+    server = Process(target=run, args=("localhost", port, list(parties)))
+    clients = [
+        Process(target=smc_stream_client, args=(name, port, prot, stream, queue))
+        for name, stream in parties.items()
+    ]
+
+    server.start()
+    try:
+        time.sleep(1)
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join(timeout=30)
+        results = dict(queue.get(timeout=1) for _ in clients)
+    finally:
+        for client in clients:
+            if client.is_alive():
+                client.terminate()
+        server.terminate()
+        server.join()
+
+    assert results == {"Alice": [17, 12, 7], "Bob": [17, 12, 7]}
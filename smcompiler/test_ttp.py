@@ -5,8 +5,59 @@ Testing ttp is not obligatory.
 MODIFY THIS FILE.
 """
 
+from secret_sharing import expand_seeded_shares
 from ttp import TrustedParamGenerator
 
 
+def test_correction_participant_is_stable():
+    ttp = TrustedParamGenerator()
+    for participant in ("Bob", "Alice", "Charlie"):
+        ttp.add_participant(participant)
+    assert ttp.correction_participant() == "Charlie"
+
+
+def test_inner_product_shares():
+    ttp = TrustedParamGenerator()
+    participants = ["Alice", "Bob", "Charlie"]
+    for participant in participants:
+        ttp.add_participant(participant)
+    shares = [ttp.retrieve_inner_product_shares(pid, "op", 4) for pid in participants[:2]]
+    # A retrieval of the same operation returns the same shares.
+    assert ttp.retrieve_inner_product_shares("Bob", "op", 4) == shares[1]
+    shares.append(ttp.retrieve_inner_product_shares("Charlie", "op", 4))
+    modulus = ttp.modulus
+    a = [sum(column) % modulus for column in zip(*(a_shares for a_shares, _, _ in shares))]
+    b = [sum(column) % modulus for column in zip(*(b_shares for _, b_shares, _ in shares))]
+    c = sum(c_share for _, _, c_share in shares) % modulus
+    assert len(a) == len(b) == 4
+    assert c == sum(a_i * b_i for a_i, b_i in zip(a, b)) % modulus
+
+
+def test_seeded_shares():
+    ttp = TrustedParamGenerator()
+    participants = ["Alice", "Bob", "Charlie"]
+    for participant in participants:
+        ttp.add_participant(participant)
+    modulus = ttp.modulus
+    triplets = []
+    for participant in participants:
+        seed, correction = ttp.retrieve_seeded_share(participant, "op")
+        assert (correction is not None) == (participant == ttp.correction_participant())
+        a, b, c = expand_seeded_shares(seed, 3, modulus)
+        triplets.append((a, b, c if correction is None else correction))
+    a, b, c = (sum(column) % modulus for column in zip(*triplets))
+    assert c == a * b % modulus
+
+
+def test_values_evicted_once_retrieved():
+    ttp = TrustedParamGenerator()
+    for participant in ("Alice", "Bob"):
+        ttp.add_participant(participant)
+    first = ttp.retrieve_double_share("Alice", "op", 0)
+    assert ttp.retrieve_double_share("Alice", "op", 0) == first
+    ttp.retrieve_double_share("Bob", "op", 0)
+    assert not ttp.op_values and not ttp.retrievals
+
+
 def test():
     raise NotImplementedError("You can create some tests.")
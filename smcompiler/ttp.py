@@ -5,17 +5,26 @@ MODIFY THIS FILE.
 """
 
 import collections
+import pickle
+import secrets
 from typing import (
+    Any,
+    Callable,
     Dict,
+    List,
+    Optional,
     Set,
     Tuple,
 )
 
 from communication import Communication
 from secret_sharing import(
+    expand_seeded_shares,
+    gen_seed,
     share_secret,
     Share,
 )
+from shamir import evaluation_point, share_double_random, ShamirShare, PRIME
 
 # Feel free to add as many imports as you want.
 
@@ -25,8 +34,18 @@ class TrustedParamGenerator:
     A trusted third party that generates random values for the Beaver triplet multiplication scheme.
     """
 
-    def __init__(self):
+    def __init__(self, modulus: int = PRIME):
+        # Field of the values of the correlated shares which are not `Share` objects.
+        self.modulus = modulus
         self.participant_ids: Set[str] = set()
+        # Correlated values of each operation, shared by the retrievals of all participants.
+        self.op_values: Dict[str, Any] = dict()
+        # Participants which retrieved the values of each operation.
+        self.retrievals: Dict[str, Set[str]] = collections.defaultdict(set)
+        # Called with the op_id and the pickled state of an operation when it changes, to make it
+        # durable, and with the op_id only when the operation is evicted.
+        self.persist: Optional[Callable[[str, bytes], None]] = None
+        self.forget: Optional[Callable[[str], None]] = None
 
 
     def add_participant(self, participant_id: str) -> None:
@@ -35,10 +54,147 @@ class TrustedParamGenerator:
         """
         self.participant_ids.add(participant_id)
 
+    def values_for(self, op_id: str, create: Callable[[], Any], client_id: Optional[str] = None) -> Any:
+        """
+        Correlated values of an operation (e.g. the shares of all participants), created by `create`
+        on the first retrieval of any participant and returned to the following ones.
+
+        Participants retrieve their shares one by one, on demand: the retrieve methods should keep
+        what must be consistent across participants here, and pass the client_id of the retrieving
+        participant. Once every participant retrieved them, the values are evicted.
+        """
+        values = self.op_values.get(op_id)
+        changed = values is None
+        if values is None:
+            values = create()
+            self.op_values[op_id] = values
+
+        if client_id is not None:
+            retrieved = self.retrievals[op_id]
+            changed = changed or client_id not in retrieved
+            retrieved.add(client_id)
+            if retrieved >= self.participant_ids:
+                self.evict(op_id)
+                return values
+
+        if changed and self.persist is not None:
+            self.persist(op_id, pickle.dumps((values, self.retrievals.get(op_id, set()))))
+        return values
+
+    def evict(self, op_id: str) -> None:
+        """
+        Forget the values of an operation, and who retrieved them.
+        """
+        self.op_values.pop(op_id, None)
+        self.retrievals.pop(op_id, None)
+        if self.forget is not None:
+            self.forget(op_id)
+
+    def restore(self, op_id: str, data: bytes) -> None:
+        """
+        Restore the correlated values of an operation persisted before a restart.
+        """
+        values, retrieved = pickle.loads(data)
+        self.op_values[op_id] = values
+        if retrieved:
+            self.retrievals[op_id] = set(retrieved)
+
     def retrieve_share(self, client_id: str, op_id: str) -> Tuple[Share, Share, Share]:
         """
         Retrieve a triplet of shares for a given client_id.
         """
         raise NotImplementedError("You need to implement this method.")
 
+    def retrieve_inner_product_shares(
+            self,
+            client_id: str,
+            op_id: str,
+            length: int
+        ) -> Tuple[List[int], List[int], int]:
+        """
+        Retrieve shares of random vectors a and b of the given length, and a share of their inner
+        product c = sum(a_i * b_i), for a given client_id.
+
+        The shares are additive shares modulo `self.modulus`, given by their values: the client
+        wraps them in its `Share` objects. All clients asking for the same op_id obtain shares of
+        the same vectors.
+        """
+        participants = sorted(self.participant_ids)
+
+        def create() -> Tuple[List[List[int]], List[List[int]], List[int]]:
+            a = [secrets.randbelow(self.modulus) for _ in range(length)]
+            b = [secrets.randbelow(self.modulus) for _ in range(length)]
+            c = sum(a_i * b_i for a_i, b_i in zip(a, b)) % self.modulus
+            return (
+                [self._additive_shares(a_i, len(participants)) for a_i in a],
+                [self._additive_shares(b_i, len(participants)) for b_i in b],
+                self._additive_shares(c, len(participants)),
+            )
+
+        a_shares, b_shares, c_shares = self.values_for(f"inner-product/{length}/{op_id}", create, client_id)
+        index = participants.index(client_id)
+        return [shares[index] for shares in a_shares], [shares[index] for shares in b_shares], c_shares[index]
+
+    def _additive_shares(self, value: int, num_shares: int) -> List[int]:
+        """
+        Random values modulo `self.modulus` summing to the given value.
+        """
+        shares = [secrets.randbelow(self.modulus) for _ in range(num_shares - 1)]
+        shares.append((value - sum(shares)) % self.modulus)
+        return shares
+
+    def correction_participant(self) -> str:
+        """
+        Participant receiving the explicit c-corrections of seed-compressed triplets.
+        """
+        return max(self.participant_ids)
+
+    def retrieve_seeded_share(self, client_id: str, op_id: str) -> Tuple[bytes, Optional[int]]:
+        """
+        Retrieve a seed-compressed triplet of shares for a given client_id.
+
+        The client expands the seed into the values of its shares (a, b, c) with
+        `expand_seeded_shares(seed, 3, self.modulus)`. Every client but the `correction_participant`
+        receives no correction. The correction participant receives the value of a share of c
+        replacing the expanded one, chosen so that the shares of c sum to the product of the sums
+        of the shares of a and b.
+        """
+        def create() -> Tuple[Dict[str, bytes], int]:
+            seeds = {participant: gen_seed() for participant in self.participant_ids}
+            expanded = {
+                participant: expand_seeded_shares(seed, 3, self.modulus)
+                for participant, seed in seeds.items()
+            }
+            a = sum(shares[0] for shares in expanded.values())
+            b = sum(shares[1] for shares in expanded.values())
+            others_c = sum(
+                shares[2] for participant, shares in expanded.items()
+                if participant != self.correction_participant()
+            )
+            return seeds, (a * b - others_c) % self.modulus
+
+        seeds, correction = self.values_for(f"seeded/{op_id}", create, client_id)
+        return seeds[client_id], correction if client_id == self.correction_participant() else None
+
+    def retrieve_double_share(
+            self,
+            client_id: str,
+            op_id: str,
+            threshold: int
+        ) -> Tuple[ShamirShare, ShamirShare]:
+        """
+        Retrieve shares of a random value r for the Shamir backend, for a given client_id: a share
+        of degree threshold, and a share of degree 2 * threshold (see `shamir.share_double_random`).
+
+        The shares of a client are evaluations at its `shamir.evaluation_point`.
+        """
+        participants = sorted(self.participant_ids)
+        r_shares, r2_shares = self.values_for(
+            f"double/{threshold}/{op_id}",
+            lambda: share_double_random(len(participants), threshold, PRIME),
+            client_id
+        )
+        index = evaluation_point(participants, client_id) - 1
+        return r_shares[index], r2_shares[index]
+
     # Feel free to add as many methods as you want.